@@ -1,6 +1,8 @@
 import React, { useState, useEffect } from 'react'
 
-const Heatmap = ({ data, isCorrelation = false }) => {
+// order: optional feature names in display order, e.g. the leaf order of a
+// hierarchical clustering (features[i] for i in column_dendrogram.order)
+const Heatmap = ({ data, isCorrelation = false, order = null }) => {
   const [heatmapData, setHeatmapData] = useState(null)
   const [selectedSamples, setSelectedSamples] = useState([])
   const [selectedGenes, setSelectedGenes] = useState([])
@@ -9,12 +11,12 @@ const Heatmap = ({ data, isCorrelation = false }) => {
     if (data) {
       generateHeatmapData()
     }
-  }, [data, isCorrelation])
+  }, [data, isCorrelation, order])
 
   const generateHeatmapData = () => {
     if (isCorrelation && typeof data === 'object') {
       // Handle correlation matrix data
-      const genes = Object.keys(data)
+      const genes = order ? order.filter(gene => gene in data) : Object.keys(data)
       const matrix = genes.map(gene1 => 
         genes.map(gene2 => data[gene1]?.[gene2] || 0)
       )
@@ -36,7 +38,7 @@ const Heatmap = ({ data, isCorrelation = false }) => {
       })
 
       const samples = data.rows.slice(0, 20).map(row => row[0] || 'Sample')
-      const genes = numericColumns.slice(0, 30)
+      const genes = (order ? order.filter(gene => numericColumns.includes(gene)) : numericColumns).slice(0, 30)
       
       const matrix = samples.map((_, sampleIndex) => 
         genes.map(gene => {
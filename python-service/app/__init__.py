@@ -14,10 +14,25 @@ def create_app():
     CORS(app, origins=cors_origins, supports_credentials=True)
     
     # Configuration
-    app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # Reduce to 50MB for cloud deployment
+    app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # Reduce to 50MB for cloud deployment (compressed bytes on the wire)
+    app.config['MAX_DECOMPRESSED_LENGTH'] = int(os.environ.get('MAX_DECOMPRESSED_MB', 1024)) * 1024 * 1024  # gzip/zstd bodies after decoding
     app.config['UPLOAD_FOLDER'] = 'temp_uploads'
     app.config['JSON_AS_ASCII'] = False
     
+    # Background analysis jobs; the pool and queue limits are per web process (gunicorn worker)
+    app.config['JOB_FOLDER'] = os.environ.get('JOB_FOLDER', os.path.join(app.config['UPLOAD_FOLDER'], 'jobs'))
+    app.config['JOB_MAX_WORKERS'] = int(os.environ.get('JOB_MAX_WORKERS', 2))
+    app.config['JOB_MAX_QUEUE'] = int(os.environ.get('JOB_MAX_QUEUE', 8))
+    app.config['JOB_TIMEOUT'] = int(os.environ.get('JOB_TIMEOUT', 600))  # seconds per job
+    app.config['JOB_RESULT_TTL'] = int(os.environ.get('JOB_RESULT_TTL', 3600))  # seconds results are kept
+    
+    # Request metrics; profiling is opt-in per request with ?profile=1 or an X-Profile: 1 header
+    app.config['PROFILING_ENABLED'] = os.environ.get('ENABLE_PROFILING', '0') == '1'
+    app.config['PROFILE_FOLDER'] = os.environ.get('PROFILE_FOLDER', os.path.join(app.config['UPLOAD_FOLDER'], 'profiles'))
+    
+    # Warm-up before reporting ready: 'off' (default), 'background', 'sync' or 'hook' (gunicorn.conf.py sets it and runs it)
+    app.config['WARMUP'] = os.environ.get('WARMUP', 'off')
+    
     # Create upload folder if it doesn't exist
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
     
@@ -26,8 +41,14 @@ def create_app():
     def before_request():
         request.environ.setdefault('wsgi.url_scheme', 'https')
     
+    from app import metrics
+    metrics.init_app(app)
+    
     # Register blueprints
     from app.routes import bp
     app.register_blueprint(bp, url_prefix='/api')
     
+    from app import warmup
+    warmup.init_app(app)
+    
     return app
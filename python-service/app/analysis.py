@@ -1,67 +1,277 @@
 import pandas as pd
 import numpy as np
-from scipy import stats
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler
-from sklearn.decomposition import PCA
-from io import StringIO
+# sklearn is imported inside the clustering methods: it takes longer to import
+# than everything else here and only clustering needs it (see app/warmup.py)
+from joblib import Parallel, delayed
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO, StringIO
 import os
+import time
+from collections import Counter
+
+from app.batch import BATCH_METHODS, SharedIntermediates, shared_value
+from app.cache import DatasetCache, ParsedDataset, dataset_cache
+from app.clustering import LINKAGE_METHODS, fit_k_chain, hierarchical_tree, split_chains
+from app.columnar import columnar_copy, columnar_format, columnar_path, record_columnar_copy, sparse_format, iter_columnar_batches, read_columnar, to_columnar_bytes, write_columnar
+from app.correlation import DEFAULT_BLOCK_SIZE, collect_condensed, collect_matrix, collect_pairs, collect_top_k, iter_correlation_tiles, iter_matrix_tiles
+from app.csv_loader import read_csv_typed, sniff_header
+from app.encoding import LAYOUTS
+from app.differential import CONTRAST_MODES, batched_anova, batched_kruskal, batched_ttest, benjamini_hochberg, contrast_design, contrast_ttests, group_moments, group_sums, permutation_ttest
+from app.lod import DEFAULT_DENSITY_BINS, DEFAULT_MAX_POINTS, LOD_MODES, MAX_PAGE_SIZE, density_grids, result_store, store_points, stratified_sample
+from app.metrics import phase, record_input
+from app.shared_store import shared_store
+from app.stats_engine import column_statistics
+from app.streaming import CorrelationAccumulator, streaming_column_statistics
+from app.uploads import SpooledBody, decoded_stream, split_compression
+from app.variants import DEFAULT_REGION_LIMIT, DEFAULT_WINDOWS, MAX_REGION_LIMIT, MAX_WINDOWS, VariantIndex, group_aggregates, window_counts
+
+# Rows per chunk when streaming datasets that may not fit in memory
+DEFAULT_CHUNK_SIZE = 100000
+
+# Row count from which clustering switches to its large-data path
+LARGE_DATA_ROWS = 50000
+
+# Most samples or features hierarchical clustering accepts: the condensed
+# float64 distances take n(n-1)/2 * 8 bytes (400MB at 10000), which linkage
+# uses without copying; the tree adds about an eighth of that
+HIERARCHICAL_MAX_LEAVES = 10000
 
 class AnalysisService:
-    def __init__(self):
-        self.scaler = StandardScaler()
-    
     def load_dataset_from_content(self, file_content, file_name):
         """Load dataset from file content string"""
+        return self.load_parsed_dataset(file_content, file_name).df
+    
+    def load_dataset(self, file_path):
+        """Load dataset from file path (kept for backward compatibility)"""
+        return self.load_parsed_dataset(file_path).df
+    
+    def load_parsed_dataset(self, file_content_or_path, file_name=None, columns=None, float_dtype='float64'):
+        """Load a dataset through the shared cache, returning a ParsedDataset
+        
+        Pass a file path alone, or file content together with its file name.
+        With columns, only those columns are parsed and they become the
+        numeric columns. Text files parse numeric fields as float_dtype
+        (float32 or float64). The returned entry is shared between requests
+        and must not be modified.
+        """
+        open_source, options, key = self._resolve_source(file_content_or_path, file_name)
+        columns = list(columns) if columns else None
+        
+        if columns or float_dtype != 'float64':
+            if columns and float_dtype == 'float64':
+                # Reuse a full parse of the same data if one is already cached
+                full = dataset_cache.peek(key)
+                if full is not None:
+                    dataset = ParsedDataset(full.df[columns], columns)
+                    record_input(len(dataset.df), len(columns), dataset.nbytes)
+                    return dataset
+            key = DatasetCache.make_key(key, usecols=columns, float_dtype=float_dtype)
+        
+        if file_name is None:
+            loader = lambda: self._parse_dataset(open_source(), options, columns, float_dtype)
+        else:
+            def loader():
+                try:
+                    return self._parse_dataset(open_source(), options, columns, float_dtype)
+                except Exception as e:
+                    raise ValueError(f"Error parsing file content: {str(e)}")
+        
+        if shared_store is not None and float_dtype == 'float64':
+            # Parsed once across worker processes and attached zero-copy
+            # (the store keeps the matrix in float64, so float32 parses stay local)
+            parse = loader
+            loader = lambda: shared_store.get_or_load(key, parse)
+        
+        with phase('parse'):
+            dataset = dataset_cache.get_or_load(key, loader)
+        record_input(len(dataset.df), len(dataset.df.columns), dataset.nbytes)
+        return dataset
+    
+    def load_sparse_dataset(self, file_content_or_path, file_name=None, transpose=False):
+        """Load a sparse (CSR) dataset through the shared cache, returning a SparseDataset
+        
+        Matrix Market (.mtx) files are read as a matrix and other text files
+        as (row, column, value) triplets, so memory scales with the nonzeros
+        rather than rows x columns. Rows are samples and columns features;
+        transpose swaps them (e.g. for genes x cells 10x matrices).
+        """
+        from app.sparse import read_sparse
+        
+        open_source, options, key = self._resolve_source(file_content_or_path, file_name)
+        key = DatasetCache.make_key(key, sparse=True, transpose=bool(transpose))
+        
+        def loader():
+            try:
+                return read_sparse(open_source(), options, transpose)
+            except Exception as e:
+                raise ValueError(f"Error parsing sparse file: {str(e)}")
+        
+        with phase('parse'):
+            dataset = dataset_cache.get_or_load(key, loader)
+        record_input(dataset.shape[0], dataset.shape[1], dataset.nbytes)
+        return dataset
+    
+    def _use_sparse(self, file_content_or_path, file_name, sparse):
+        """Whether an analysis runs in sparse mode: requested, or a Matrix Market file"""
+        if sparse:
+            return True
+        name = file_name if file_name is not None else file_content_or_path
+        return isinstance(name, str) and sparse_format(split_compression(name)[0]) is not None
+    
+    def stream_numeric_blocks(self, file_content_or_path, file_name=None, columns=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Read a dataset in chunks, returning (column_names, iterator of float64 blocks)
+        
+        Numeric columns are picked from the first chunk; only one chunk is
+        held in memory at a time. Bypasses the parsed-dataset cache.
+        """
+        open_source, options, _ = self._resolve_source(file_content_or_path, file_name)
+        columns = list(columns) if columns else None
+        try:
+            if 'format' in options:
+                reader = iter_columnar_batches(open_source(), options['format'], chunk_size)
+            else:
+                reader = pd.read_csv(open_source(), chunksize=chunk_size, sep=options['sep'], usecols=columns)
+            first_chunk = next(reader, None)
+        except Exception as e:
+            raise ValueError(f"Error parsing file content: {str(e)}")
+        
+        if first_chunk is None:
+            raise ValueError("No numeric data found for analysis")
+        
+        column_names = list(columns) if columns else self.get_numeric_columns(first_chunk)
+        
+        def blocks():
+            yield self._numeric_block(first_chunk, column_names)
+            for chunk in reader:
+                yield self._numeric_block(chunk, column_names)
+        
+        return column_names, blocks()
+    
+    def _numeric_block(self, chunk, column_names):
+        """Convert the selected columns of a chunk to a float64 array"""
+        subset = chunk[column_names]
         try:
-            # Create StringIO object from content
-            file_buffer = StringIO(file_content)
+            return subset.to_numpy(dtype=np.float64)
+        except (TypeError, ValueError):
+            # Later chunks can carry stray text in a numeric column
+            return subset.apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+    
+    def _resolve_source(self, file_content_or_path, file_name=None):
+        """Return (open_source, parse options, cache key) for a path or file content"""
+        if file_name is None:
+            file_path = file_content_or_path
+            if not os.path.exists(file_path):
+                raise FileNotFoundError(f"File not found: {file_path}")
             
-            # Determine file type from filename
-            if file_name.endswith('.csv'):
-                df = pd.read_csv(file_buffer)
-            elif file_name.endswith('.tsv'):
-                df = pd.read_csv(file_buffer, sep='\t')
-            elif file_name.endswith('.txt'):
-                # Try to detect delimiter from content
-                file_buffer.seek(0)
-                first_line = file_buffer.readline()
-                file_buffer.seek(0)
+            # Compressed text files (.csv.gz, .tsv.zst, ...) are decompressed by the parsers
+            base_path, compression = split_compression(file_path)
+            fmt = columnar_format(file_path) or sparse_format(base_path)
+            if fmt is None:
+                if not base_path.endswith(('.csv', '.tsv', '.txt')):
+                    raise ValueError("Unsupported file format. Use CSV, TSV, TXT (optionally .gz/.zst), Parquet, Arrow or Matrix Market files.")
                 
-                if '\t' in first_line:
-                    df = pd.read_csv(file_buffer, sep='\t')
-                else:
-                    df = pd.read_csv(file_buffer)
-            else:
-                # Try comma-separated by default
-                df = pd.read_csv(file_buffer)
+                # Prefer a columnar copy convert_to_columnar recorded for the file as it is now
+                copy = columnar_copy(file_path)
+                if copy is not None:
+                    file_path, fmt = copy
             
-            return df
+            if fmt is not None:
+                options = {'format': fmt}
+            elif compression is not None:
+                with open(file_path, 'rb') as f:
+                    first_line = decoded_stream(f, None, [compression]).readline()
+                options = self._parse_options(base_path, first_line.decode('utf-8', 'replace'))
+            else:
+                with open(file_path, 'r') as f:
+                    options = self._parse_options(file_path, f.readline())
+            key = DatasetCache.make_path_key(file_path, **options)
+            return (lambda: file_path), options, key
+        
+        fmt = columnar_format(file_name)
+        if fmt is not None:
+            if isinstance(file_content_or_path, str):
+                raise ValueError("Parquet/Arrow content must be sent as a binary body")
+            options = {'format': fmt}
+            if isinstance(file_content_or_path, SpooledBody):
+                return file_content_or_path.rewind, options, file_content_or_path.cache_key(**options)
+            key = DatasetCache.make_key(file_content_or_path, **options)
+            return (lambda: file_content_or_path), options, key
+        
+        if isinstance(file_content_or_path, SpooledBody):
+            # An upload streamed to a temp file: parse straight from the file
+            body = file_content_or_path
+            options = {'format': 'mtx'} if sparse_format(file_name) else self._parse_options(file_name, body.first_line())
+            return body.rewind, options, body.cache_key(**options)
+        
+        try:
+            if isinstance(file_content_or_path, str):
+                newline = file_content_or_path.find('\n')
+                first_line = file_content_or_path[:newline] if newline >= 0 else file_content_or_path
+                open_source = lambda: StringIO(file_content_or_path)
+            else:
+                newline = file_content_or_path.find(b'\n')
+                first_line = bytes(file_content_or_path[:newline] if newline >= 0 else file_content_or_path).decode('utf-8', 'replace')
+                open_source = lambda: BytesIO(file_content_or_path)
+            options = {'format': 'mtx'} if sparse_format(file_name) else self._parse_options(file_name, first_line)
         except Exception as e:
             raise ValueError(f"Error parsing file content: {str(e)}")
+        key = DatasetCache.make_key(file_content_or_path, **options)
+        return open_source, options, key
     
-    def load_dataset(self, file_path):
-        """Load dataset from file path (kept for backward compatibility)"""
-        if not os.path.exists(file_path):
-            raise FileNotFoundError(f"File not found: {file_path}")
-        
-        # Determine file type and load accordingly
-        if file_path.endswith('.csv'):
-            df = pd.read_csv(file_path)
-        elif file_path.endswith('.tsv'):
-            df = pd.read_csv(file_path, sep='\t')
-        elif file_path.endswith('.txt'):
-            # Try to detect delimiter
-            with open(file_path, 'r') as f:
-                first_line = f.readline()
-                if '\t' in first_line:
-                    df = pd.read_csv(file_path, sep='\t')
-                else:
-                    df = pd.read_csv(file_path)
+    def _parse_options(self, file_name, first_line):
+        """Sniff the delimiter and column names from the file extension and header line"""
+        sep, header = sniff_header(first_line, file_name)
+        return {'sep': sep, 'header': header}
+    
+    def _parse_dataset(self, source, options, columns=None, float_dtype='float64'):
+        """Parse a CSV or columnar source and derive its numeric matrix"""
+        if options.get('format') == 'mtx':
+            raise ValueError("Matrix Market files are only supported in sparse mode (stats, correlation and clustering)")
+        if 'format' in options:
+            # Columnar files are already typed; only the column selection applies
+            df = read_columnar(source, options['format'], columns)
         else:
-            raise ValueError("Unsupported file format. Use CSV, TSV, or TXT files.")
+            df = read_csv_typed(source, options['sep'], options['header'], columns, float_dtype)
+        return ParsedDataset(df, columns if columns else self.get_numeric_columns(df))
+    
+    def _is_file_path(self, value):
+        """Check whether an argument looks like a file path rather than file content"""
+        return isinstance(value, str) and (value.startswith('/') or value.startswith('C:') or os.path.exists(value))
+    
+    def _batch_dataset(self, file_content_or_path, file_name, shared, columns=None):
+        """The batch's dataset when running inside run_batch, otherwise a cached load"""
+        if shared is None:
+            return self.load_parsed_dataset(file_content_or_path, file_name, columns)
+        if columns:
+            columns = list(columns)
+            return ParsedDataset(shared.dataset.df[columns], columns)
+        return shared.dataset
+    
+    def convert_to_columnar(self, file_content_or_path, file_name=None, fmt='arrow', dest=None):
+        """Write a columnar (Arrow IPC or Parquet) copy of a dataset once
         
-        return df
+        For a file path the copy is written next to it by default, with a
+        sidecar recording the text file's size and mtime, and later loads
+        of that path read the copy instead of re-tokenizing the text while
+        the file is unchanged. With file content and no dest, the encoded
+        bytes are returned.
+        """
+        # Stat before parsing: a file changed meanwhile won't match the record
+        source_stat = os.stat(file_content_or_path) if file_name is None else None
+        df = self.load_parsed_dataset(file_content_or_path, file_name).df
+        if dest is None and file_name is None:
+            dest = columnar_path(file_content_or_path, fmt)
+        
+        if dest is None:
+            return to_columnar_bytes(df, fmt)
+        
+        # Write to a temporary name first so readers never see a partial file
+        tmp_path = f"{dest}.{os.getpid()}.tmp"
+        write_columnar(df, tmp_path, fmt)
+        os.replace(tmp_path, dest)
+        if source_stat is not None and dest == columnar_path(file_content_or_path, fmt):
+            record_columnar_copy(dest, file_content_or_path, source_stat)
+        return dest
     
     def get_numeric_columns(self, df):
         """Get numeric columns from dataframe"""
@@ -73,112 +283,276 @@ class AnalysisService:
             return numeric_cols[1:]  # Skip first column if it's numeric but likely an ID
         return numeric_cols
     
-    def calculate_basic_stats(self, file_content_or_path, file_name_or_columns=None, columns=None):
-        """Calculate basic statistics for dataset - handles both content and file path"""
+    def calculate_basic_stats(self, file_content_or_path, file_name_or_columns=None, columns=None, streaming=False, chunk_size=DEFAULT_CHUNK_SIZE, sketch_size=256, shared=None, sparse=False, transpose=False, layout='nested'):
+        """Calculate basic statistics for dataset - handles both content and file path
+        
+        With streaming=True the file is read in chunks of chunk_size rows and
+        median/q25/q75 come from a quantile sketch; each column then also
+        reports quantile_rank_error, the worst-case rank error as a fraction
+        of its count.
+        
+        With sparse=True (implied for .mtx files) the data is loaded as a
+        sparse matrix (see load_sparse_dataset) and zeros count as values.
+        
+        layout='compact' returns {'features': [...], 'statistics': {stat:
+        array}} with one array per statistic instead of a dict per column.
+        """
         # Determine if we're using file content or file path
-        if isinstance(file_content_or_path, str) and (file_content_or_path.startswith('/') or file_content_or_path.startswith('C:') or os.path.exists(file_content_or_path)):
+        if self._is_file_path(file_content_or_path):
             # This looks like a file path
-            df = self.load_dataset(file_content_or_path)
+            file_name = None
             columns = file_name_or_columns if file_name_or_columns else columns
         else:
             # This is file content
-            df = self.load_dataset_from_content(file_content_or_path, file_name_or_columns)
+            file_name = file_name_or_columns
+        self._check_layout(layout)
         
-        if columns:
-            # Use specified columns
-            numeric_df = df[columns]
-        else:
-            # Use all numeric columns
-            numeric_cols = self.get_numeric_columns(df)
-            numeric_df = df[numeric_cols]
+        if self._use_sparse(file_content_or_path, file_name, sparse):
+            from app.sparse import sparse_column_statistics
+            
+            dataset = self.load_sparse_dataset(file_content_or_path, file_name, transpose)
+            csc = dataset.csc
+            column_names = dataset.numeric_cols
+            if columns:
+                positions = {name: i for i, name in enumerate(column_names)}
+                missing = [column for column in columns if column not in positions]
+                if missing:
+                    raise ValueError(f"Columns not found: {', '.join(map(str, missing))}")
+                csc = csc[:, [positions[column] for column in columns]]
+                column_names = list(columns)
+            if csc.shape[0] == 0 or csc.shape[1] == 0:
+                raise ValueError("No numeric data found for analysis")
+            return self._format_column_stats(column_names, sparse_column_statistics(csc), layout)
+        
+        if streaming:
+            column_names, blocks = self.stream_numeric_blocks(file_content_or_path, file_name, columns, chunk_size)
+            if not column_names:
+                raise ValueError("No numeric data found for analysis")
+            column_stats = streaming_column_statistics(blocks, len(column_names), sketch_size=sketch_size)
+            return self._format_column_stats(column_names, column_stats, layout)
         
-        if numeric_df.empty:
+        # Only the specified columns are parsed when given, otherwise all numeric columns are used
+        dataset = self._batch_dataset(file_content_or_path, file_name, shared, columns)
+        column_names = dataset.numeric_cols
+        values = dataset.numeric_values
+        
+        if values.size == 0:
             raise ValueError("No numeric data found for analysis")
         
+        moments = None
+        if shared is not None and not columns:
+            # In a batch the column means/variances are shared with correlation
+            moments = shared.get('column_moments', lambda: group_moments(values))
+        
+        # All statistics for all columns in one vectorized pass
+        return self._format_column_stats(column_names, column_statistics(values, moments=moments), layout)
+    
+    def _check_layout(self, layout):
+        if layout not in LAYOUTS:
+            raise ValueError("Unsupported layout. Use 'nested' or 'compact'")
+    
+    def _format_column_stats(self, column_names, column_stats, layout='nested'):
+        """Turn per-column stat arrays into the {column: {stat: value}} response"""
+        names = ['mean', 'median', 'std', 'min', 'max', 'count', 'missing', 'q25', 'q75', 'skewness', 'kurtosis']
+        if 'quantile_rank_error' in column_stats:
+            names.append('quantile_rank_error')
+        
+        if layout == 'compact':
+            # Columns without values are dropped, as in the nested layout
+            keep = np.asarray(column_stats['count']) > 0
+            return {
+                'features': [column for column, kept in zip(column_names, keep) if kept],
+                'statistics': {name: np.asarray(column_stats[name])[keep] for name in names}
+            }
+        
+        column_stats = {name: array.tolist() for name, array in column_stats.items()}
+        
         results = {}
         
-        for column in numeric_df.columns:
-            col_data = numeric_df[column].dropna()
-            if len(col_data) == 0:
+        for i, column in enumerate(column_names):
+            if column_stats['count'][i] == 0:
                 continue
-                
-            results[column] = {
-                'mean': float(col_data.mean()),
-                'median': float(col_data.median()),
-                'std': float(col_data.std()),
-                'min': float(col_data.min()),
-                'max': float(col_data.max()),
-                'count': int(len(col_data)),
-                'missing': int(numeric_df[column].isna().sum()),
-                'q25': float(col_data.quantile(0.25)),
-                'q75': float(col_data.quantile(0.75)),
-                'skewness': float(stats.skew(col_data)),
-                'kurtosis': float(stats.kurtosis(col_data))
-            }
+            
+            results[column] = {name: column_stats[name][i] for name in names}
         
         return results
     
-    def calculate_correlation(self, file_content_or_path, file_name_or_method=None, method='pearson'):
-        """Calculate correlation matrix - handles both content and file path"""
+    def calculate_correlation(self, file_content_or_path, file_name_or_method=None, method='pearson', streaming=False, chunk_size=DEFAULT_CHUNK_SIZE, threshold=None, top_k=None, dtype='float64', block_size=DEFAULT_BLOCK_SIZE, shared=None, sparse=False, transpose=False, layout='nested'):
+        """Calculate correlation matrix - handles both content and file path
+        
+        The matrix is computed tile by tile in float32 or float64 (dtype).
+        By default the full matrix is returned as {col1: {col2: r}}; with a
+        threshold only pairs with |r| >= threshold are returned, and with
+        top_k only the k strongest partners of each column.
+        
+        With streaming=True the file is read in chunks and Pearson correlation
+        is built from running XᵀX and column sums (spearman needs global
+        ranks and is not available in streaming mode).
+        
+        With sparse=True (implied for .mtx files) the tiles are sparse
+        products corrected for the column means, so the data is never
+        densified; Spearman ranks keep zeros at rank 0 to stay sparse.
+        
+        layout='compact' returns the features once with the matrix as an
+        array, pairs as parallel source/target index and r arrays, and
+        neighbors as n x k index and r arrays (index -1 pads short rows).
+        """
         # Determine if we're using file content or file path
-        if isinstance(file_content_or_path, str) and (file_content_or_path.startswith('/') or file_content_or_path.startswith('C:') or os.path.exists(file_content_or_path)):
+        if self._is_file_path(file_content_or_path):
             # This looks like a file path
-            df = self.load_dataset(file_content_or_path)
+            file_name = None
             method = file_name_or_method if file_name_or_method else method
         else:
             # This is file content
-            df = self.load_dataset_from_content(file_content_or_path, file_name_or_method)
+            file_name = file_name_or_method
         
-        numeric_cols = self.get_numeric_columns(df)
+        if method not in ('pearson', 'spearman'):
+            raise ValueError("Unsupported correlation method. Use 'pearson' or 'spearman'")
+        if dtype not in ('float32', 'float64'):
+            raise ValueError("Unsupported dtype. Use 'float32' or 'float64'")
+        self._check_layout(layout)
+        dtype = np.dtype(dtype)
         
-        if len(numeric_cols) < 2:
-            raise ValueError("At least 2 numeric columns required for correlation analysis")
+        numeric_cols, tiles = self._correlation_tiles(
+            file_content_or_path, file_name, method, dtype, block_size, streaming, chunk_size, shared, sparse, transpose
+        )
         
-        numeric_df = df[numeric_cols]
+        if threshold is not None:
+            source, target, values = collect_pairs(tiles, threshold)
+            if layout == 'compact':
+                return {
+                    'method': method,
+                    'threshold': threshold,
+                    'features': numeric_cols,
+                    'pairs': {'source': source, 'target': target, 'r': values}
+                }
+            return {
+                'method': method,
+                'threshold': threshold,
+                'features': numeric_cols,
+                'pairs': [
+                    {'source': numeric_cols[i], 'target': numeric_cols[j], 'r': r}
+                    for i, j, r in zip(source.tolist(), target.tolist(), values.tolist())
+                ]
+            }
         
-        # Calculate correlation matrix
-        if method == 'pearson':
-            corr_matrix = numeric_df.corr(method='pearson')
-        elif method == 'spearman':
-            corr_matrix = numeric_df.corr(method='spearman')
-        else:
-            raise ValueError("Unsupported correlation method. Use 'pearson' or 'spearman'")
+        if top_k is not None:
+            partners, values = collect_top_k(tiles, len(numeric_cols), top_k)
+            if layout == 'compact':
+                return {
+                    'method': method,
+                    'top_k': top_k,
+                    'features': numeric_cols,
+                    'neighbors': {'index': partners, 'r': values}
+                }
+            return {
+                'method': method,
+                'top_k': top_k,
+                'features': numeric_cols,
+                'neighbors': {
+                    column: [
+                        {'target': numeric_cols[j], 'r': r}
+                        for j, r in zip(row_partners, row_values) if j >= 0
+                    ]
+                    for column, row_partners, row_values in zip(numeric_cols, partners.tolist(), values.tolist())
+                }
+            }
         
-        # Convert to dictionary format
-        results = {}
-        for col1 in corr_matrix.columns:
-            results[col1] = {}
-            for col2 in corr_matrix.columns:
-                corr_val = corr_matrix.loc[col1, col2]
-                results[col1][col2] = float(corr_val) if not pd.isna(corr_val) else 0.0
+        corr_matrix = collect_matrix(tiles, len(numeric_cols), dtype)
         
-        return results
+        if layout == 'compact':
+            return {
+                'method': method,
+                'features': numeric_cols,
+                'matrix': np.nan_to_num(corr_matrix, nan=0.0)
+            }
+        
+        # Convert to dictionary format
+        corr_matrix = np.nan_to_num(corr_matrix.astype(np.float64), nan=0.0)
+        return {col1: dict(zip(numeric_cols, row)) for col1, row in zip(numeric_cols, corr_matrix.tolist())}
     
-    def differential_analysis(self, file_content_or_path, file_name_or_condition1=None, condition1_or_condition2=None, condition2_or_threshold=None, p_value_threshold=0.05):
-        """Perform differential expression analysis - handles both content and file path"""
+    def _correlation_tiles(self, file_content_or_path, file_name, method, dtype, block_size, streaming=False, chunk_size=DEFAULT_CHUNK_SIZE, shared=None, sparse=False, transpose=False):
+        """Return (numeric columns, upper-triangle correlation tiles) for calculate_correlation and hierarchical clustering"""
+        if self._use_sparse(file_content_or_path, file_name, sparse):
+            from app.sparse import iter_sparse_correlation_tiles
+            
+            dataset = self.load_sparse_dataset(file_content_or_path, file_name, transpose)
+            numeric_cols = dataset.numeric_cols
+            if len(numeric_cols) < 2:
+                raise ValueError("At least 2 numeric columns required for correlation analysis")
+            tiles = iter_sparse_correlation_tiles(dataset.csc, method, dtype, block_size)
+        elif streaming:
+            if method != 'pearson':
+                raise ValueError("Streaming correlation only supports the 'pearson' method")
+            numeric_cols, blocks = self.stream_numeric_blocks(file_content_or_path, file_name, chunk_size=chunk_size)
+            if len(numeric_cols) < 2:
+                raise ValueError("At least 2 numeric columns required for correlation analysis")
+            
+            accumulator = CorrelationAccumulator(len(numeric_cols))
+            for block in blocks:
+                accumulator.update(block)
+            tiles = iter_matrix_tiles(accumulator.correlation().astype(dtype), block_size)
+        else:
+            dataset = self._batch_dataset(file_content_or_path, file_name, shared)
+            numeric_cols = dataset.numeric_cols
+            
+            if len(numeric_cols) < 2:
+                raise ValueError("At least 2 numeric columns required for correlation analysis")
+            
+            moments = None
+            if shared is not None and method == 'pearson':
+                moments = shared.get('column_moments', lambda: group_moments(dataset.numeric_values))
+            
+            # Calculate correlation matrix block by block
+            tiles = iter_correlation_tiles(dataset.numeric_values, method, dtype, block_size, moments)
+            key = self._tiles_key(method, dtype, block_size)
+            if shared is not None and key in shared.shared_tiles:
+                # Several analyses of the batch read them (correlation and hierarchical clustering)
+                tiles = shared.get(key, lambda: list(tiles))
+        return numeric_cols, tiles
+    
+    def differential_analysis(self, file_content_or_path, file_name_or_condition1=None, condition1_or_condition2=None, condition2_or_threshold=None, p_value_threshold=0.05, equal_var=True, top_n=50, permutation=False, max_permutations=10000, seed=0, n_jobs=None, shared=None, condition_column=None, groups=None, contrasts='all_pairs', layout='nested'):
+        """Perform differential expression analysis - handles both content and file path
+        
+        With permutation=True the p-values come from a permutation test of
+        the same t statistic (exact when the groups allow at most
+        max_permutations relabelings, otherwise sampled with early stopping
+        and reproducible for a given seed), spread over n_jobs processes.
+        
+        Without condition1 and condition2, or with a list of groups, it
+        compares several groups at once instead: see
+        _perform_multigroup_analysis. condition_column names the column
+        holding the groups (by default the first one whose name mentions
+        condition, group or treatment).
+        """
         # Determine if we're using file content or file path
-        if isinstance(file_content_or_path, str) and (file_content_or_path.startswith('/') or file_content_or_path.startswith('C:') or os.path.exists(file_content_or_path)):
+        if self._is_file_path(file_content_or_path):
             # This looks like a file path
-            df = self.load_dataset(file_content_or_path)
+            dataset = self._batch_dataset(file_content_or_path, None, shared)
             condition1 = file_name_or_condition1
             condition2 = condition1_or_condition2
             p_value_threshold = condition2_or_threshold if condition2_or_threshold else p_value_threshold
         else:
             # This is file content
-            df = self.load_dataset_from_content(file_content_or_path, file_name_or_condition1)
+            dataset = self._batch_dataset(file_content_or_path, file_name_or_condition1, shared)
             condition1 = condition1_or_condition2
             condition2 = condition2_or_threshold
         
-        # Check if condition column exists
-        condition_col = None
-        for col in df.columns:
-            if 'condition' in col.lower() or 'group' in col.lower() or 'treatment' in col.lower():
-                condition_col = col
-                break
+        df = dataset.df
+        condition_col = self._condition_column(df, condition_column)
+        
+        if groups is not None or (condition1 is None and condition2 is None):
+            self._check_layout(layout)
+            if condition_col is None:
+                raise ValueError("Multi-group analysis needs a condition column")
+            return self._perform_multigroup_analysis(
+                dataset, condition_col, groups, contrasts, p_value_threshold,
+                equal_var=equal_var, top_n=top_n, shared=shared, layout=layout
+            )
         
         if condition_col is None:
             # If no condition column found, create mock analysis
-            numeric_cols = self.get_numeric_columns(df)
+            numeric_cols = dataset.numeric_cols
             if len(numeric_cols) < 2:
                 raise ValueError("Insufficient data for differential analysis")
             
@@ -186,10 +560,26 @@ class AnalysisService:
             results = self._simulate_differential_analysis(df, numeric_cols, condition1, condition2, p_value_threshold)
         else:
             # Perform actual differential analysis
-            results = self._perform_differential_analysis(df, condition_col, condition1, condition2, p_value_threshold)
+            results = self._perform_differential_analysis(
+                dataset, condition_col, condition1, condition2, p_value_threshold,
+                equal_var=equal_var, top_n=top_n, shared=shared,
+                permutation=permutation, max_permutations=max_permutations, seed=seed, n_jobs=n_jobs
+            )
         
         return results
     
+    def _condition_column(self, df, condition_column=None):
+        """The column holding the sample groups: condition_column, else the first one named like one"""
+        if condition_column is not None:
+            if condition_column not in df.columns:
+                raise ValueError(f"Condition column not found: {condition_column}")
+            return condition_column
+        
+        for col in df.columns:
+            if 'condition' in col.lower() or 'group' in col.lower() or 'treatment' in col.lower():
+                return col
+        return None
+    
     def _simulate_differential_analysis(self, df, numeric_cols, condition1, condition2, p_value_threshold):
         """Simulate differential analysis when no condition column exists"""
         results = {
@@ -230,132 +620,876 @@ class AnalysisService:
         
         return results
     
-    def _perform_differential_analysis(self, df, condition_col, condition1, condition2, p_value_threshold):
+    def _perform_differential_analysis(self, dataset, condition_col, condition1, condition2, p_value_threshold, equal_var=True, top_n=50, shared=None, permutation=False, max_permutations=10000, seed=0, n_jobs=None):
         """Perform actual differential analysis with condition column"""
-        # Filter data for the two conditions
-        group1_data = df[df[condition_col] == condition1]
-        group2_data = df[df[condition_col] == condition2]
+        group1, group2 = shared_value(
+            shared, ('groups', condition_col, condition1, condition2),
+            lambda: self._split_groups(dataset, condition_col, condition1, condition2)
+        )
         
-        if len(group1_data) == 0 or len(group2_data) == 0:
-            raise ValueError(f"No data found for conditions: {condition1} or {condition2}")
-        
-        numeric_cols = self.get_numeric_columns(df)
+        numeric_cols = dataset.numeric_cols
         results = {
             'condition1': condition1,
             'condition2': condition2,
             'p_value_threshold': p_value_threshold,
+            'test': 'student' if equal_var else 'welch',
             'total_genes': len(numeric_cols),
+            'tested_genes': 0,
             'significant_genes': 0,
+            'significant_genes_adjusted': 0,
             'upregulated': 0,
             'downregulated': 0,
             'top_genes': []
         }
         
-        top_genes = []
+        # t-test for every gene at once; genes with < 2 observations per group are masked
+        test = batched_ttest(group1, group2, equal_var=equal_var)
+        valid = test['valid']
+        pvalues = test['pvalue']
+        log2fc = test['log2fc']
         
-        for gene in numeric_cols:
-            try:
-                group1_values = group1_data[gene].dropna()
-                group2_values = group2_data[gene].dropna()
-                
-                if len(group1_values) < 2 or len(group2_values) < 2:
-                    continue
-                
-                # Perform t-test
-                t_stat, p_value = stats.ttest_ind(group1_values, group2_values)
-                
-                # Calculate log2 fold change
-                mean1 = group1_values.mean()
-                mean2 = group2_values.mean()
-                
-                if mean1 > 0 and mean2 > 0:
-                    log2fc = np.log2(mean2 / mean1)
-                else:
-                    log2fc = mean2 - mean1  # Simple difference if means are too small
-                
-                if p_value < p_value_threshold:
-                    results['significant_genes'] += 1
-                    if log2fc > 0:
-                        results['upregulated'] += 1
-                    else:
-                        results['downregulated'] += 1
-                
-                top_genes.append({
-                    'gene': gene,
-                    'log2fc': float(log2fc),
-                    'pvalue': float(p_value),
-                    'significant': p_value < p_value_threshold
-                })
-                
-            except Exception as e:
-                print(f"Error analyzing gene {gene}: {str(e)}")
-                continue
+        if permutation:
+            perm = permutation_ttest(
+                group1, group2, equal_var=equal_var, max_permutations=int(max_permutations),
+                seed=seed, n_jobs=n_jobs or os.cpu_count() or 1
+            )
+            pvalues = perm['pvalue']
+            results['p_value_method'] = 'permutation'
+            results['permutations'] = {
+                'max': int(max_permutations),
+                'exact': perm['exact'],
+                'seed': seed,
+                'mean_used': float(perm['permutations'][valid].mean()) if valid.any() else 0.0
+            }
+        else:
+            results['p_value_method'] = 'parametric'
+
+        padj = benjamini_hochberg(pvalues)
         
-        # Sort by p-value and return top results
-        top_genes.sort(key=lambda x: x['pvalue'])
-        results['top_genes'] = top_genes[:50]  # Return top 50 genes
+        significant = valid & (pvalues < p_value_threshold)
+        results['tested_genes'] = int(valid.sum())
+        results['significant_genes'] = int(significant.sum())
+        results['significant_genes_adjusted'] = int((valid & (padj < p_value_threshold)).sum())
+        results['upregulated'] = int((significant & (log2fc > 0)).sum())
+        results['downregulated'] = int((significant & ~(log2fc > 0)).sum())
+        
+        # Sort by p-value (untestable NaN p-values last) and return top results
+        tested = np.flatnonzero(valid)
+        order = tested[np.argsort(pvalues[tested], kind='stable')]
+        if top_n is not None:
+            order = order[:top_n]
+        
+        results['top_genes'] = [
+            {
+                'gene': numeric_cols[i],
+                'log2fc': float(log2fc[i]),
+                'pvalue': float(pvalues[i]),
+                'padj': float(padj[i]),
+                'significant': bool(significant[i])
+            }
+            for i in order
+        ]
+        
+        if permutation:
+            for gene, i in zip(results['top_genes'], order):
+                gene['permutations'] = int(perm['permutations'][i])
+        
+        return results
+    
+    def _split_groups(self, dataset, condition_col, condition1, condition2):
+        """Split the numeric matrix into the rows of the two condition groups"""
+        conditions = dataset.df[condition_col].to_numpy()
+        group1_mask = conditions == condition1
+        group2_mask = conditions == condition2
+        
+        if not group1_mask.any() or not group2_mask.any():
+            raise ValueError(f"No data found for conditions: {condition1} or {condition2}")
+        
+        values = dataset.numeric_values
+        return values[group1_mask], values[group2_mask]
+    
+    def _perform_multigroup_analysis(self, dataset, condition_col, groups, contrasts, p_value_threshold, equal_var=True, top_n=50, shared=None, layout='nested'):
+        """Compare several groups at once: ANOVA, Kruskal-Wallis and pairwise contrasts for every gene
+        
+        All tests come from one pass over the data: per-group counts, sums
+        and sums of squares give the one-way ANOVA and every contrast's
+        t-test, and one ranking of each gene gives Kruskal-Wallis. groups
+        selects and orders the groups compared (all of them by default).
+        contrasts is 'all_pairs', 'one_vs_rest' or None for the omnibus
+        tests only. p-values are Benjamini-Hochberg adjusted per test and
+        per contrast; the contrasts come back as a genes x contrasts table.
+        """
+        if contrasts is not None and contrasts not in CONTRAST_MODES:
+            raise ValueError("Unsupported contrasts. Use 'all_pairs' or 'one_vs_rest'")
+        
+        levels, codes, values, sums = shared_value(
+            shared, ('group_sums', condition_col, tuple(groups) if groups is not None else None),
+            lambda: self._multigroup_sums(dataset, condition_col, groups)
+        )
+        count, total, total_sq, center = sums
+        numeric_cols = dataset.numeric_cols
+        
+        f_stat, anova_p, anova_valid = batched_anova(count, total, total_sq)
+        h_stat, kruskal_p, kruskal_valid = batched_kruskal(values, codes, len(levels))
+        anova_padj = benjamini_hochberg(anova_p)
+        kruskal_padj = benjamini_hochberg(kruskal_p)
+        significant = anova_valid & (anova_p < p_value_threshold)
+        
+        results = {
+            'mode': 'multigroup',
+            'condition_column': condition_col,
+            'groups': levels,
+            'group_sizes': [int(size) for size in np.bincount(codes, minlength=len(levels))],
+            'p_value_threshold': p_value_threshold,
+            'total_genes': len(numeric_cols),
+            'tested_genes': int(anova_valid.sum()),
+            'anova': self._test_summary(anova_valid, anova_p, anova_padj, p_value_threshold),
+            'kruskal': self._test_summary(kruskal_valid, kruskal_p, kruskal_padj, p_value_threshold)
+        }
+        
+        # Sort by ANOVA p-value (untestable genes last) and return top results
+        tested = np.flatnonzero(anova_valid)
+        order = tested[np.argsort(anova_p[tested], kind='stable')]
+        if top_n is not None:
+            order = order[:top_n]
+        results['top_genes'] = [
+            {
+                'gene': numeric_cols[i],
+                'f': float(f_stat[i]),
+                'anova_pvalue': float(anova_p[i]),
+                'anova_padj': float(anova_padj[i]),
+                'h': float(h_stat[i]),
+                'kruskal_pvalue': float(kruskal_p[i]),
+                'kruskal_padj': float(kruskal_padj[i]),
+                'significant': bool(significant[i])
+            }
+            for i in order
+        ]
+        
+        if contrasts is None:
+            return results
         
+        pairs, first, second = contrast_design(len(levels), contrasts)
+        test = contrast_ttests(count, total, total_sq, center, first, second, equal_var=equal_var)
+        padj = np.vstack([benjamini_hochberg(p) for p in test['pvalue']])
+        results['test'] = 'student' if equal_var else 'welch'
+        results['contrast_mode'] = contrasts
+        results['contrasts'] = []
+        for c, (i, j) in enumerate(pairs):
+            valid = test['valid'][c]
+            contrast_significant = valid & (test['pvalue'][c] < p_value_threshold)
+            up = contrast_significant & (test['log2fc'][c] > 0)
+            results['contrasts'].append({
+                'label': f"{levels[j]} vs {levels[i] if i >= 0 else 'rest'}",
+                'condition1': levels[i] if i >= 0 else None,
+                'condition2': levels[j],
+                **self._test_summary(valid, test['pvalue'][c], padj[c], p_value_threshold),
+                'upregulated': int(up.sum()),
+                'downregulated': int((contrast_significant & ~up).sum())
+            })
+        
+        # genes x contrasts, so a row is one gene across all contrasts
+        table = {name: test[name].T for name in ('log2fc', 't', 'pvalue')}
+        table['padj'] = padj.T
+        if layout == 'compact':
+            results['table'] = {'genes': numeric_cols, **{name: np.ascontiguousarray(array) for name, array in table.items()}}
+        else:
+            results['table'] = {'genes': numeric_cols, **{name: array.tolist() for name, array in table.items()}}
         return results
     
-    def clustering_analysis(self, file_content_or_path, file_name_or_clusters=None, n_clusters_or_method=3, method='kmeans'):
-        """Perform clustering analysis - handles both content and file path"""
+    def _multigroup_sums(self, dataset, condition_col, groups=None):
+        """(groups, row group codes, row values, group_sums) of the rows in the compared groups"""
+        conditions = dataset.df[condition_col]
+        if groups is None:
+            levels = sorted(conditions.dropna().unique().tolist(), key=str)
+        else:
+            levels = list(groups)
+            missing = [level for level in levels if not (conditions == level).any()]
+            if missing:
+                raise ValueError(f"No data found for conditions: {', '.join(map(str, missing))}")
+        if len(levels) < 2 or len(set(levels)) != len(levels):
+            raise ValueError("Multi-group analysis needs at least two distinct groups")
+        
+        codes = pd.Index(levels).get_indexer(conditions)
+        rows = codes >= 0
+        codes = codes[rows]
+        values = dataset.numeric_values[rows]
+        return levels, codes, values, group_sums(values, codes, len(levels))
+    
+    def _test_summary(self, valid, pvalues, padj, p_value_threshold):
+        return {
+            'tested_genes': int(valid.sum()),
+            'significant_genes': int((valid & (pvalues < p_value_threshold)).sum()),
+            'significant_genes_adjusted': int((valid & (padj < p_value_threshold)).sum())
+        }
+    
+    def clustering_analysis(self, file_content_or_path, file_name_or_clusters=None, n_clusters_or_method=3, method='kmeans', algorithm='auto', batch_size=1024, pca_solver='auto', large_data_threshold=LARGE_DATA_ROWS, shared=None, sparse=False, transpose=False, layout='nested', linkage='average', correlation_method='pearson', lod=None, max_points=DEFAULT_MAX_POINTS, density_bins=DEFAULT_DENSITY_BINS):
+        """Perform clustering analysis - handles both content and file path
+        
+        algorithm is 'full' (KMeans), 'minibatch' (MiniBatchKMeans) or 'auto',
+        which switches to MiniBatchKMeans once the row count reaches
+        large_data_threshold. pca_solver is 'full', 'randomized',
+        'incremental' or 'auto' (randomized for large data). With
+        sparse=True (implied for .mtx files) see _sparse_clustering.
+        
+        method='hierarchical' builds linkage trees of the samples and the
+        features instead (see _hierarchical_clustering); linkage is
+        'average', 'complete', 'single' or 'weighted' and the distance is
+        1 - r with r from correlation_method.
+        
+        lod bounds the per-sample part of the result for large datasets
+        (see _clustering_points): 'sample' returns at most max_points
+        points, 'density' per-cluster density_bins x density_bins grids.
+        
+        layout='compact' keeps labels, centers and the PCA projection as
+        arrays and reports cluster_statistics as {'sizes', 'means'} arrays
+        (means is n_clusters x features).
+        """
         # Determine if we're using file content or file path
-        if isinstance(file_content_or_path, str) and (file_content_or_path.startswith('/') or file_content_or_path.startswith('C:') or os.path.exists(file_content_or_path)):
+        if self._is_file_path(file_content_or_path):
             # This looks like a file path
-            df = self.load_dataset(file_content_or_path)
+            file_name = None
             n_clusters = file_name_or_clusters if file_name_or_clusters else n_clusters_or_method
             method = n_clusters_or_method if isinstance(n_clusters_or_method, str) else method
         else:
             # This is file content
-            df = self.load_dataset_from_content(file_content_or_path, file_name_or_clusters)
+            file_name = file_name_or_clusters
             n_clusters = n_clusters_or_method
+        self._check_layout(layout)
+        if lod is not None and lod not in LOD_MODES:
+            raise ValueError("Unsupported lod. Use 'sample' or 'density'")
+        points_options = (lod, max_points, density_bins)
+        
+        if self._use_sparse(file_content_or_path, file_name, sparse):
+            return self._sparse_clustering(file_content_or_path, file_name, int(n_clusters), method, algorithm, batch_size, transpose, layout, points_options)
         
-        numeric_cols = self.get_numeric_columns(df)
+        dataset = self._batch_dataset(file_content_or_path, file_name, shared)
+        n_clusters = int(n_clusters)
+        numeric_cols = dataset.numeric_cols
         
         if len(numeric_cols) < 2:
             raise ValueError("At least 2 numeric columns required for clustering")
         
-        numeric_df = df[numeric_cols].fillna(0)  # Fill NaN with 0
+        if method == 'hierarchical':
+            return self._hierarchical_clustering(
+                file_content_or_path, file_name, dataset, n_clusters, linkage, correlation_method,
+                pca_solver, batch_size, large_data_threshold, shared, layout, points_options
+            )
+        if method != 'kmeans':
+            raise ValueError("Unsupported clustering method. Use 'kmeans' or 'hierarchical'")
+        
+        # Standardize with a per-request scaler so concurrent requests can't interfere
+        # (in a batch the standardized matrix is shared with the sweep)
+        values, scaler, scaled_data = shared_value(shared, 'standardized', lambda: self._prepare_clustering_data(dataset))
+        large_data = len(values) >= large_data_threshold
+        
+        if algorithm == 'auto':
+            algorithm = 'minibatch' if large_data else 'full'
         
-        # Standardize the data
-        scaled_data = self.scaler.fit_transform(numeric_df)
+        from sklearn.cluster import KMeans, MiniBatchKMeans
         
-        if method == 'kmeans':
+        if algorithm == 'full':
             # Perform K-means clustering
             kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
-            cluster_labels = kmeans.fit_predict(scaled_data)
-            
-            # Calculate cluster centers in original space
-            cluster_centers = self.scaler.inverse_transform(kmeans.cluster_centers_)
-            
+        elif algorithm == 'minibatch':
+            kmeans = MiniBatchKMeans(n_clusters=n_clusters, random_state=42, n_init=3, batch_size=batch_size)
         else:
-            raise ValueError("Unsupported clustering method. Use 'kmeans'")
+            raise ValueError("Unsupported clustering algorithm. Use 'auto', 'full' or 'minibatch'")
+        
+        cluster_labels = kmeans.fit_predict(scaled_data)
+        
+        # Calculate cluster centers in original space
+        cluster_centers = scaler.inverse_transform(kmeans.cluster_centers_)
         
         # Perform PCA for visualization
-        pca = PCA(n_components=2)
-        pca_data = pca.fit_transform(scaled_data)
+        if pca_solver == 'auto':
+            pca_solver = 'randomized' if large_data else 'full'
+        pca, pca_data = shared_value(shared, ('pca', pca_solver, batch_size), lambda: self._fit_pca(scaled_data, pca_solver, batch_size))
         
         results = {
             'method': method,
+            'algorithm': 'minibatch_kmeans' if algorithm == 'minibatch' else 'kmeans',
+            'pca_solver': pca_solver,
             'n_clusters': n_clusters,
-            'cluster_labels': cluster_labels.tolist(),
+            'features': numeric_cols
+        }
+        
+        results.update(self._clustering_points(cluster_labels, pca_data, n_clusters, layout, *points_options))
+        if layout == 'compact':
+            sizes, means = self._cluster_means(values, cluster_labels, n_clusters)
+            results.update(self._compact_clustering(cluster_centers, pca.explained_variance_ratio_, sizes, means))
+            return results
+        
+        results.update({
             'cluster_centers': cluster_centers.tolist(),
-            'pca_data': pca_data.tolist(),
-            'pca_variance_ratio': pca.explained_variance_ratio_.tolist(),
+            'pca_variance_ratio': pca.explained_variance_ratio_.tolist()
+        })
+        results['cluster_statistics'] = self._cluster_statistics(values, numeric_cols, cluster_labels, n_clusters)
+        
+        return results
+    
+    def _hierarchical_clustering(self, file_content_or_path, file_name, dataset, n_clusters, linkage, correlation_method, pca_solver, batch_size, large_data_threshold, shared, layout, points_options=(None, DEFAULT_MAX_POINTS, DEFAULT_DENSITY_BINS)):
+        """Agglomerative clustering of the samples and the features on 1 - r
+        
+        The feature distances come from the same correlation tiles as
+        calculate_correlation and the sample distances from those tiles on
+        the transposed matrix. Either way the tiles are written straight
+        into a condensed float64 vector, n(n-1)/2 values, and the full
+        matrix is never built. In a batch that also computes the
+        correlation the feature tiles are computed once for both. Both trees come with a leaf order for
+        heatmaps (exact optimal ordering up to 1000 leaves, greedy beyond,
+        see app.clustering). cluster_labels cut the sample tree into
+        n_clusters; centers are the cluster means.
+        """
+        from scipy.cluster.hierarchy import fcluster
+        
+        numeric_cols = dataset.numeric_cols
+        n_rows = len(dataset.numeric_values)
+        if max(n_rows, len(numeric_cols)) > HIERARCHICAL_MAX_LEAVES:
+            raise ValueError(f"Hierarchical clustering supports at most {HIERARCHICAL_MAX_LEAVES} samples and features. Use 'kmeans'")
+        if n_rows < 2:
+            raise ValueError("At least 2 samples required for hierarchical clustering")
+        if linkage not in LINKAGE_METHODS:
+            raise ValueError(f"Unsupported linkage. Use {', '.join(repr(m) for m in LINKAGE_METHODS)}")
+        if correlation_method not in ('pearson', 'spearman'):
+            raise ValueError("Unsupported correlation method. Use 'pearson' or 'spearman'")
+        
+        _, tiles = self._correlation_tiles(file_content_or_path, file_name, correlation_method, 'float64', DEFAULT_BLOCK_SIZE, shared=shared)
+        column_tree = hierarchical_tree(collect_condensed(tiles, len(numeric_cols)), linkage)
+        row_tiles = iter_correlation_tiles(dataset.numeric_values.T, correlation_method, np.float64)
+        row_tree = hierarchical_tree(collect_condensed(row_tiles, n_rows), linkage)
+        
+        cluster_labels = fcluster(row_tree[0], n_clusters, criterion='maxclust') - 1
+        values, scaler, scaled_data = shared_value(shared, 'standardized', lambda: self._prepare_clustering_data(dataset))
+        sizes, means = self._cluster_means(values, cluster_labels, n_clusters)
+        
+        if pca_solver == 'auto':
+            pca_solver = 'randomized' if n_rows >= large_data_threshold else 'full'
+        pca, pca_data = shared_value(shared, ('pca', pca_solver, batch_size), lambda: self._fit_pca(scaled_data, pca_solver, batch_size))
+        
+        results = {
+            'method': 'hierarchical',
+            'algorithm': 'agglomerative',
+            'linkage': linkage,
+            'correlation_method': correlation_method,
+            'pca_solver': pca_solver,
+            'n_clusters': n_clusters,
             'features': numeric_cols
         }
+        for name, (linkage_matrix, order, ordering) in (('row_dendrogram', row_tree), ('column_dendrogram', column_tree)):
+            # scipy linkage rows: [left child, right child, height, leaf count]
+            if layout == 'compact':
+                results[name] = {'linkage': linkage_matrix, 'order': order.astype(np.int32), 'leaf_ordering': ordering}
+            else:
+                results[name] = {'linkage': linkage_matrix.tolist(), 'order': order.tolist(), 'leaf_ordering': ordering}
         
-        # Add cluster statistics
-        cluster_stats = {}
-        for i in range(n_clusters):
-            cluster_mask = cluster_labels == i
-            cluster_data = numeric_df[cluster_mask]
-            
-            cluster_stats[f'cluster_{i}'] = {
-                'size': int(cluster_mask.sum()),
-                'mean_values': cluster_data.mean().to_dict()
+        results.update(self._clustering_points(cluster_labels, pca_data, n_clusters, layout, *points_options))
+        if layout == 'compact':
+            results.update(self._compact_clustering(means, pca.explained_variance_ratio_, sizes, means))
+            return results
+        
+        results.update({
+            'cluster_centers': means.tolist(),
+            'pca_variance_ratio': pca.explained_variance_ratio_.tolist()
+        })
+        results['cluster_statistics'] = self._cluster_statistics(values, numeric_cols, cluster_labels, n_clusters)
+        return results
+    
+    def _compact_clustering(self, cluster_centers, variance_ratio, sizes, means):
+        """The per-cluster part of a clustering result in the compact layout"""
+        return {
+            'cluster_centers': cluster_centers,
+            'pca_variance_ratio': variance_ratio,
+            'cluster_statistics': {'sizes': sizes, 'means': means}
+        }
+    
+    def _clustering_points(self, cluster_labels, pca_data, n_clusters, layout, lod=None, max_points=DEFAULT_MAX_POINTS, density_bins=DEFAULT_DENSITY_BINS):
+        """The per-sample part of a clustering result: cluster_labels and pca_data
+        
+        With lod=None every sample is returned. lod='sample' keeps a
+        stratified sample of at most max_points samples (every cluster
+        keeps some, see app.lod.sample_quotas) and adds their row numbers
+        as sample_indices. lod='density' replaces the points with
+        per-cluster 2-D histograms of the PCA projection. Either way the
+        full-resolution points stay in the result store (readable from
+        every process) for clustering_points_page, under lod['result_id'].
+        """
+        cluster_labels = cluster_labels.astype(np.int32, copy=False)
+        total = len(cluster_labels)
+        if lod is None or (lod == 'sample' and total <= max_points):
+            points = {'cluster_labels': cluster_labels, 'pca_data': pca_data}
+            if lod is not None:
+                points['lod'] = {'mode': lod, 'total': total, 'points': total, 'result_id': None}
+        elif lod == 'sample':
+            indices = stratified_sample(cluster_labels, n_clusters, max_points)
+            points = {
+                'cluster_labels': cluster_labels[indices],
+                'pca_data': pca_data[indices],
+                'sample_indices': indices,
+                'lod': {'mode': lod, 'total': total, 'points': len(indices), 'result_id': store_points(cluster_labels, pca_data)}
             }
+        else:
+            x_edges, y_edges, counts = density_grids(pca_data, cluster_labels, n_clusters, int(density_bins))
+            points = {
+                'density': {'x_edges': x_edges, 'y_edges': y_edges, 'counts': counts},
+                'lod': {'mode': lod, 'total': total, 'bins': int(density_bins), 'result_id': store_points(cluster_labels, pca_data)}
+            }
+        
+        if layout == 'nested':
+            for key in ('cluster_labels', 'pca_data', 'sample_indices'):
+                if key in points:
+                    points[key] = points[key].tolist()
+            if 'density' in points:
+                points['density'] = {key: array.tolist() for key, array in points['density'].items()}
+        return points
+    
+    def clustering_points_page(self, result_id, offset=0, limit=MAX_PAGE_SIZE, layout='nested'):
+        """Rows offset..offset+limit of the full-resolution labels and PCA points of a lod result
         
-        results['cluster_statistics'] = cluster_stats
+        Returns None when the result is unknown or was evicted.
+        """
+        self._check_layout(layout)
+        offset, limit = int(offset), int(limit)
+        if offset < 0 or limit < 1:
+            raise ValueError("offset must be >= 0 and limit >= 1")
+        limit = min(limit, MAX_PAGE_SIZE)
         
+        entry = result_store.get(result_id)
+        if entry is None:
+            return None
+        labels, pca_data = entry.page(offset, limit)
+        if layout == 'nested':
+            labels, pca_data = labels.tolist(), pca_data.tolist()
+        return {
+            'result_id': result_id,
+            'offset': offset,
+            'limit': limit,
+            'total': len(entry.labels),
+            'cluster_labels': labels,
+            'pca_data': pca_data
+        }
+    
+    def _sparse_clustering(self, file_content_or_path, file_name, n_clusters, method='kmeans', algorithm='auto', batch_size=1024, transpose=False, layout='nested', points_options=(None, DEFAULT_MAX_POINTS, DEFAULT_DENSITY_BINS)):
+        """k-means and a PCA projection of a sparse dataset without densifying it
+        
+        k-means runs on the columns divided by their standard deviation but
+        not centered: a shift doesn't change distances, so the clusters are
+        those of the standardized data while the matrix stays sparse. PCA
+        centers implicitly through a LinearOperator (app.sparse.sparse_pca).
+        'auto' uses MiniBatchKMeans.
+        """
+        from sklearn.cluster import KMeans, MiniBatchKMeans
+        from app.sparse import column_scale, scale_columns, sparse_cluster_means, sparse_pca
+        
+        dataset = self.load_sparse_dataset(file_content_or_path, file_name, transpose)
+        numeric_cols = dataset.numeric_cols
+        
+        if len(numeric_cols) < 2:
+            raise ValueError("At least 2 numeric columns required for clustering")
+        if method != 'kmeans':
+            raise ValueError("Only 'kmeans' clustering is available in sparse mode")
+        
+        if algorithm in ('auto', 'minibatch'):
+            algorithm = 'minibatch'
+            kmeans = MiniBatchKMeans(n_clusters=n_clusters, random_state=42, n_init=3, batch_size=batch_size)
+        elif algorithm == 'full':
+            kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
+        else:
+            raise ValueError("Unsupported clustering algorithm. Use 'auto', 'full' or 'minibatch'")
+        
+        mean, scale = column_scale(dataset.csc)
+        cluster_labels = kmeans.fit_predict(scale_columns(dataset.matrix, scale))
+        # Centers back in original units (the data was only scaled)
+        cluster_centers = kmeans.cluster_centers_ * scale
+        
+        pca_data, variance_ratio = sparse_pca(dataset.matrix, mean, scale)
+        sizes, means = sparse_cluster_means(dataset.matrix, cluster_labels, n_clusters)
+        
+        n_rows, n_cols = dataset.shape
+        results = {
+            'method': method,
+            'algorithm': 'minibatch_kmeans' if algorithm == 'minibatch' else 'kmeans',
+            'pca_solver': 'sparse_svds',
+            'sparse': True,
+            'density': dataset.matrix.nnz / max(n_rows * n_cols, 1),
+            'n_clusters': n_clusters,
+            'features': numeric_cols,
+            'samples': dataset.row_names
+        }
+        results.update(self._clustering_points(cluster_labels, pca_data, n_clusters, layout, *points_options))
+        if layout == 'compact':
+            results.update(self._compact_clustering(cluster_centers, variance_ratio, sizes, means))
+            return results
+        
+        results.update({
+            'cluster_centers': cluster_centers.tolist(),
+            'pca_variance_ratio': variance_ratio.tolist(),
+            'cluster_statistics': {
+                f'cluster_{i}': {
+                    'size': int(sizes[i]),
+                    'mean_values': dict(zip(numeric_cols, means[i].tolist()))
+                }
+                for i in range(n_clusters)
+            }
+        })
         return results
+    
+    def clustering_sweep(self, file_content_or_path, file_name=None, k_min=2, k_max=10, algorithm='auto', batch_size=1024, silhouette_sample_size=5000, n_jobs=None, large_data_threshold=LARGE_DATA_ROWS, shared=None, layout='nested'):
+        """Fit k-means for every k in [k_min, k_max] to help choose the number of clusters
+        
+        The data is standardized and projected with PCA once. The k range is
+        split into contiguous runs fitted in parallel worker processes; within
+        a run each k warm-starts from the previous k's centers. Returns
+        inertia and silhouette per k plus the labels of the best k
+        (kept as arrays with layout='compact').
+        """
+        self._check_layout(layout)
+        dataset = self._batch_dataset(file_content_or_path, file_name, shared)
+        numeric_cols = dataset.numeric_cols
+        
+        if len(numeric_cols) < 2:
+            raise ValueError("At least 2 numeric columns required for clustering")
+        
+        values, scaler, scaled_data = shared_value(shared, 'standardized', lambda: self._prepare_clustering_data(dataset))
+        large_data = len(values) >= large_data_threshold
+        
+        # Silhouette needs 2 <= k <= n_samples - 1
+        k_values = list(range(max(int(k_min), 2), min(int(k_max), len(values) - 1) + 1))
+        if not k_values:
+            raise ValueError("No valid k in the requested range for this dataset")
+        
+        if algorithm == 'auto':
+            algorithm = 'minibatch' if large_data else 'full'
+        if algorithm not in ('full', 'minibatch'):
+            raise ValueError("Unsupported clustering algorithm. Use 'auto', 'full' or 'minibatch'")
+        
+        n_jobs = n_jobs or os.cpu_count() or 1
+        chains = split_chains(k_values, n_jobs)
+        if len(chains) > 1:
+            chain_results = Parallel(n_jobs=len(chains))(
+                delayed(fit_k_chain)(scaled_data, chain, algorithm, batch_size, silhouette_sample_size)
+                for chain in chains
+            )
+        else:
+            chain_results = [fit_k_chain(scaled_data, chains[0], algorithm, batch_size, silhouette_sample_size)]
+        fits = [fit for chain in chain_results for fit in chain]
+        
+        silhouettes = np.array([fit['silhouette'] for fit in fits])
+        best = fits[int(np.nanargmax(silhouettes))] if not np.isnan(silhouettes).all() else fits[0]
+        from sklearn.metrics import pairwise_distances_argmin
+        best_labels = pairwise_distances_argmin(scaled_data, best['centers'])
+        
+        pca_solver = 'randomized' if large_data else 'full'
+        pca, pca_data = shared_value(shared, ('pca', pca_solver, batch_size), lambda: self._fit_pca(scaled_data, pca_solver, batch_size))
+        
+        cluster_centers = scaler.inverse_transform(best['centers'])
+        if layout == 'compact':
+            labels, pca_data, variance_ratio = best_labels.astype(np.int32), pca_data, pca.explained_variance_ratio_
+        else:
+            labels, cluster_centers = best_labels.tolist(), cluster_centers.tolist()
+            pca_data, variance_ratio = pca_data.tolist(), pca.explained_variance_ratio_.tolist()
+        
+        return {
+            'method': 'kmeans',
+            'algorithm': 'minibatch_kmeans' if algorithm == 'minibatch' else 'kmeans',
+            'k_values': [fit['k'] for fit in fits],
+            'inertia': [fit['inertia'] for fit in fits],
+            'silhouette': [fit['silhouette'] for fit in fits],
+            'silhouette_sample_size': min(silhouette_sample_size, len(values)),
+            'best_k': best['k'],
+            'cluster_labels': labels,
+            'cluster_centers': cluster_centers,
+            'pca_data': pca_data,
+            'pca_variance_ratio': variance_ratio,
+            'features': numeric_cols
+        }
+    
+    def load_variant_index(self, file_content_or_path, file_name=None):
+        """Load the interval index of a variant table (see app/variants.py)
+        
+        The index is built once per dataset and cached on its own, so
+        region, density and aggregation requests on the same table only pay
+        for their lookups, even when the parsed table is too large to stay
+        in the dataset cache.
+        """
+        _, _, key = self._resolve_source(file_content_or_path, file_name)
+        
+        def loader():
+            dataset = self.load_parsed_dataset(file_content_or_path, file_name)
+            return VariantIndex(dataset.df, dataset.numeric_cols)
+        
+        with phase('parse'):
+            return dataset_cache.get_or_load(DatasetCache.make_key(key, variant_index=True), loader)
+    
+    def _variant_region(self, index, chromosome, start, end):
+        """(indexed chromosome name, start, end) of a region request, validated"""
+        if chromosome is None:
+            raise ValueError("chromosome is required")
+        name = index.resolve(chromosome)
+        start = int(start) if start is not None else None
+        end = int(end) if end is not None else None
+        if start is not None and end is not None and start > end:
+            raise ValueError("start must not be greater than end")
+        return name, start, end
+    
+    def variant_region(self, file_content_or_path, file_name=None, chromosome=None, start=None, end=None, offset=0, limit=DEFAULT_REGION_LIMIT, layout='nested'):
+        """Variants overlapping chromosome:start-end (1-based, inclusive), in start order, a page at a time
+        
+        total counts every overlapping variant; offset and limit select the
+        page returned. The compact layout returns one array per column.
+        """
+        self._check_layout(layout)
+        offset, limit = int(offset), int(limit)
+        if offset < 0 or not 0 < limit <= MAX_REGION_LIMIT:
+            raise ValueError(f"offset must be >= 0 and limit between 1 and {MAX_REGION_LIMIT}")
+        
+        index = self.load_variant_index(file_content_or_path, file_name)
+        name, start, end = self._variant_region(index, chromosome, start, end)
+        positions = index.overlapping(name, start, end)
+        variants = index.variants(positions[offset:offset + limit])
+        
+        results = {
+            'chromosome': name,
+            'start': start,
+            'end': end,
+            'total': len(positions),
+            'offset': offset,
+            'limit': limit
+        }
+        if layout == 'compact':
+            results['columns'] = variants.column_names
+            results['variants'] = {
+                column: variants.column(column).to_numpy() if column in index.numeric_cols else variants.column(column).to_pylist()
+                for column in variants.column_names
+            }
+        else:
+            results['variants'] = variants.to_pylist()
+        return results
+    
+    def variant_density(self, file_content_or_path, file_name=None, chromosome=None, start=None, end=None, windows=DEFAULT_WINDOWS, group_by=None, layout='nested'):
+        """Variants overlapping each of equal-width windows of a region, optionally per group
+        
+        The region defaults to the chromosome's variant span. Windows are
+        whole bases, so short regions get fewer of them. With group_by
+        (e.g. clinical_significance) the counts are also split by that
+        column's values.
+        """
+        self._check_layout(layout)
+        windows = int(windows)
+        if not 0 < windows <= MAX_WINDOWS:
+            raise ValueError(f"windows must be between 1 and {MAX_WINDOWS}")
+        
+        index = self.load_variant_index(file_content_or_path, file_name)
+        name, start, end = self._variant_region(index, chromosome, start, end)
+        first, last = index.span(name)
+        start = first if start is None else start
+        end = max(last if end is None else end, start)
+        width = -(-(end - start + 1) // windows)
+        windows = -(-(end - start + 1) // width)
+        
+        positions = index.overlapping(name, start, end)
+        starts = index.starts[positions]
+        ends = index.ends[positions]
+        counts = window_counts(starts, ends, start, width, windows)[0]
+        window_starts = start + width * np.arange(windows)
+        
+        results = {
+            'chromosome': name,
+            'start': start,
+            'end': end,
+            'window_size': int(width),
+            'total': len(positions)
+        }
+        if group_by is not None:
+            codes, labels = index.group_codes(group_by, positions)
+            group_counts = window_counts(starts, ends, start, width, windows, codes, len(labels))
+            present = np.flatnonzero(group_counts.any(axis=1))
+            results['group_by'] = group_by
+            results['groups'] = [labels[g] for g in present]
+            group_counts = group_counts[present]
+        
+        if layout == 'compact':
+            results['window_starts'] = window_starts
+            results['counts'] = counts
+            if group_by is not None:
+                results['group_counts'] = group_counts
+        else:
+            results['window_starts'] = window_starts.tolist()
+            results['counts'] = counts.tolist()
+            if group_by is not None:
+                results['group_counts'] = {str(label): row.tolist() for label, row in zip(results['groups'], group_counts)}
+        return results
+    
+    def variant_aggregate(self, file_content_or_path, file_name=None, group_by='gene_name', chromosome=None, start=None, end=None, split_by=None, top_n=None, layout='nested'):
+        """Per-group variant counts and mean numeric annotations, genome-wide or in a region
+        
+        Groups are the values of group_by (e.g. gene_name or
+        clinical_significance), largest first. split_by breaks each
+        group's count down by a second column, e.g. the clinical
+        significance of every gene's variants.
+        """
+        self._check_layout(layout)
+        index = self.load_variant_index(file_content_or_path, file_name)
+        if chromosome is None:
+            if start is not None or end is not None:
+                raise ValueError("start and end need a chromosome")
+            positions = np.arange(len(index.rows))
+            name = None
+        else:
+            name, start, end = self._variant_region(index, chromosome, start, end)
+            positions = index.overlapping(name, start, end)
+        
+        codes, labels = index.group_codes(group_by, positions)
+        columns = index.numeric_cols
+        counts, means = group_aggregates(codes, len(labels), index.annotations(positions))
+        
+        # Largest groups first; groups without variants in the region are left out
+        order = np.argsort(-counts, kind='stable')
+        order = order[counts[order] > 0]
+        if top_n is not None:
+            order = order[:int(top_n)]
+        
+        results = {
+            'group_by': group_by,
+            'chromosome': name,
+            'start': start,
+            'end': end,
+            'total': len(positions),
+            'columns': columns
+        }
+        if split_by is not None:
+            split_codes, split_labels = index.group_codes(split_by, positions)
+            split = np.bincount(
+                codes.astype(np.int64) * len(split_labels) + split_codes, minlength=len(labels) * len(split_labels)
+            ).reshape(len(labels), len(split_labels))[order]
+            results['split_by'] = split_by
+            results['split_labels'] = split_labels
+        
+        if layout == 'compact':
+            results['groups'] = [labels[g] for g in order]
+            results['counts'] = counts[order]
+            results['means'] = np.ascontiguousarray(means[order])
+            if split_by is not None:
+                results['split_counts'] = split
+        else:
+            results['groups'] = []
+            for row, g in enumerate(order):
+                group = {
+                    'group': labels[g],
+                    'count': int(counts[g]),
+                    'means': {col: float(means[g, j]) for j, col in enumerate(columns)}
+                }
+                if split_by is not None:
+                    group['split'] = {str(label): int(n) for label, n in zip(split_labels, split[row]) if n}
+                results['groups'].append(group)
+        return results
+    
+    def run_batch(self, file_content_or_path, file_name=None, analyses=(), max_workers=None):
+        """Run several analyses on one dataset, parsing it once and sharing intermediates
+        
+        analyses is a list of (id, method name, args, kwargs) with the same
+        arguments the individual methods take after the content/file name.
+        The analyses run concurrently in threads and share one parsed
+        dataset, the column moments (stats and correlation), the
+        standardized matrix and PCA projection (clustering and sweep) and
+        the condition group splits (differential), and the correlation
+        tiles when both correlation and hierarchical clustering read them.
+        One analysis failing does not fail the others.
+        """
+        for _, method_name, _, _ in analyses:
+            if method_name not in BATCH_METHODS:
+                raise ValueError(f"Unsupported batch analysis: {method_name}")
+        
+        start = time.perf_counter()
+        if any(kwargs.get('sparse') for _, _, _, kwargs in analyses) or self._use_sparse(file_content_or_path, file_name, False):
+            # Sparse analyses share the cached matrix rather than dense intermediates
+            transpose = any(kwargs.get('transpose') for _, _, _, kwargs in analyses)
+            self.load_sparse_dataset(file_content_or_path, file_name, transpose)
+            shared = None
+        else:
+            tile_keys = Counter(self._correlation_tiles_key(method_name, args, kwargs) for _, method_name, args, kwargs in analyses)
+            shared_tiles = {key for key, n in tile_keys.items() if key is not None and n > 1}
+            shared = SharedIntermediates(self.load_parsed_dataset(file_content_or_path, file_name), shared_tiles)
+        parse_seconds = time.perf_counter() - start
+        
+        def run(method_name, args, kwargs):
+            started = time.perf_counter()
+            call_args = (file_content_or_path,) if file_name is None else (file_content_or_path, file_name)
+            try:
+                data = getattr(self, method_name)(*call_args, *args, shared=shared, **kwargs)
+                result = {'success': True, 'data': data}
+            except Exception as e:
+                result = {'success': False, 'message': str(e)}
+            result['seconds'] = time.perf_counter() - started
+            return result
+        
+        max_workers = max_workers or min(len(analyses), os.cpu_count() or 1) or 1
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                (analysis_id, executor.submit(run, method_name, args, kwargs))
+                for analysis_id, method_name, args, kwargs in analyses
+            ]
+            results = {analysis_id: future.result() for analysis_id, future in futures}
+        
+        return {
+            'results': results,
+            'timings': {
+                'parse': parse_seconds,
+                'analyses': {analysis_id: result['seconds'] for analysis_id, result in results.items()},
+                'shared': dict(shared.timings) if shared is not None else {},
+                'total': time.perf_counter() - start
+            }
+        }
+    
+    def _tiles_key(self, method, dtype, block_size):
+        return ('correlation_tiles', method, np.dtype(dtype).name, block_size)
+    
+    def _correlation_tiles_key(self, method_name, args, kwargs):
+        """Shared key of the dense correlation tiles a batch analysis reads, None when it reads none"""
+        if method_name == 'calculate_correlation' and not kwargs.get('streaming'):
+            method = args[0] if args else kwargs.get('method', 'pearson')
+            return self._tiles_key(method, kwargs.get('dtype', 'float64'), kwargs.get('block_size', DEFAULT_BLOCK_SIZE))
+        if method_name == 'clustering_analysis':
+            method = args[1] if len(args) > 1 else kwargs.get('method')
+            if method == 'hierarchical':
+                return self._tiles_key(kwargs.get('correlation_method', 'pearson'), 'float64', DEFAULT_BLOCK_SIZE)
+        return None
+    
+    def _prepare_clustering_data(self, dataset):
+        """Return (NaN-filled values, fitted scaler, standardized values) for clustering"""
+        from sklearn.preprocessing import StandardScaler
+        
+        values = np.nan_to_num(dataset.numeric_values, nan=0.0)  # Fill NaN with 0
+        scaler = StandardScaler()
+        scaled_data = scaler.fit_transform(values)
+        return values, scaler, scaled_data
+    
+    def _fit_pca(self, scaled_data, solver, batch_size=1024):
+        """Project standardized data onto 2 principal components"""
+        from sklearn.decomposition import PCA, IncrementalPCA
+        
+        if solver == 'incremental':
+            pca = IncrementalPCA(n_components=2, batch_size=max(batch_size, 2))
+        elif solver in ('full', 'randomized'):
+            pca = PCA(n_components=2, svd_solver=solver, random_state=42)
+        else:
+            raise ValueError("Unsupported PCA solver. Use 'auto', 'full', 'randomized' or 'incremental'")
+        return pca, pca.fit_transform(scaled_data)
+    
+    def _cluster_means(self, values, cluster_labels, n_clusters):
+        """(sizes, n_clusters x features means) from one grouped aggregation; empty clusters get NaN"""
+        sizes = np.bincount(cluster_labels, minlength=n_clusters)
+        means = pd.DataFrame(values).groupby(cluster_labels).mean().reindex(range(n_clusters))
+        return sizes, means.to_numpy()
+    
+    def _cluster_statistics(self, values, numeric_cols, cluster_labels, n_clusters):
+        """Size and per-feature means of every cluster"""
+        sizes, means = self._cluster_means(values, cluster_labels, n_clusters)
+        
+        cluster_stats = {}
+        for i in range(n_clusters):
+            cluster_stats[f'cluster_{i}'] = {
+                'size': int(sizes[i]),
+                'mean_values': dict(zip(numeric_cols, means[i].tolist()))
+            }
+        return cluster_stats
@@ -0,0 +1,57 @@
+import threading
+import time
+
+
+# AnalysisService methods that can run inside a batch
+BATCH_METHODS = ('calculate_basic_stats', 'calculate_correlation', 'differential_analysis', 'clustering_analysis', 'clustering_sweep')
+
+
+class SharedIntermediates:
+    """Intermediate results shared by the analyses of one batch.
+
+    Holds the batch's parsed dataset plus values derived from it (column
+    moments, the standardized matrix, PCA projections, condition group
+    splits), each computed once on first use. Analyses running in
+    different threads that need the same value wait for one computation.
+    Correlation tiles take n^2/2 values, so only those whose keys are in
+    shared_tiles (read by several analyses) are kept.
+    """
+
+    def __init__(self, dataset, shared_tiles=()):
+        self.dataset = dataset
+        self.shared_tiles = frozenset(shared_tiles)
+        self.timings = {}
+        self._values = {}
+        self._lock = threading.Lock()
+        self._loading = {}
+
+    def get(self, key, compute):
+        """Return the value for key, calling compute() once if it is missing"""
+        with self._lock:
+            if key in self._values:
+                return self._values[key]
+            key_lock = self._loading.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                if key in self._values:
+                    return self._values[key]
+            start = time.perf_counter()
+            value = compute()
+            with self._lock:
+                self._values[key] = value
+                self.timings[_key_name(key)] = time.perf_counter() - start
+        return value
+
+
+def _key_name(key):
+    if isinstance(key, tuple):
+        return ':'.join(str(part) for part in key)
+    return str(key)
+
+
+def shared_value(shared, key, compute):
+    """compute() outside a batch, otherwise the batch's shared value for key"""
+    if shared is None:
+        return compute()
+    return shared.get(key, compute)
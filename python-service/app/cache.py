@@ -0,0 +1,169 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class ParsedDataset:
+    """Parsed dataset plus the numeric matrix derived from it.
+
+    Entries are shared between requests, so callers must treat ``df`` and
+    ``numeric_values`` as read-only (select/copy before modifying).
+    """
+
+    def __init__(self, df, numeric_cols, numeric_values=None):
+        self.df = df
+        self.numeric_cols = list(numeric_cols)
+        if numeric_values is None:
+            # Contiguous float64 copy of the numeric columns, shared read-only
+            numeric_values = np.ascontiguousarray(
+                df[self.numeric_cols].to_numpy(dtype=np.float64)
+            )
+            numeric_values.setflags(write=False)
+        # Otherwise e.g. a read-only memory map the numeric columns of df are views into
+        self.numeric_values = numeric_values
+        self.nbytes = int(df.memory_usage(deep=True).sum()) + int(self.numeric_values.nbytes)
+
+
+class _Loading:
+    """A key being loaded: its lock, the threads using it and the loaded entry"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.users = 0
+        self.entry = None
+
+
+class DatasetCache:
+    """Thread-safe LRU cache of parsed datasets bounded by total byte size"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = int(max_bytes)
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # One _Loading per key being loaded so concurrent requests for the
+        # same dataset parse it once instead of racing each other
+        self._loading = {}
+
+    @staticmethod
+    def content_digest():
+        """A new digest of the kind used for keys, to feed content into incrementally"""
+        return hashlib.blake2b(digest_size=20)
+
+    @staticmethod
+    def make_key(content, **options):
+        """Build a cache key from file content (str or bytes) and parse options"""
+        digest = DatasetCache.content_digest()
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        digest.update(content)
+        return DatasetCache.finish_key(digest, **options)
+
+    @staticmethod
+    def finish_key(digest, **options):
+        """Build a cache key from a content digest (e.g. fed while streaming) and parse options"""
+        digest = digest.copy()
+        for name in sorted(options):
+            digest.update(f'\0{name}={options[name]!r}'.encode('utf-8'))
+        return digest.hexdigest()
+
+    @staticmethod
+    def make_path_key(file_path, **options):
+        """Build a cache key for a file on disk from its path, size and mtime"""
+        stat = os.stat(file_path)
+        return DatasetCache.make_key(
+            os.path.abspath(file_path), size=stat.st_size, mtime=stat.st_mtime_ns, **options
+        )
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def peek(self, key):
+        """The cached entry for key or None, without counting a hit or miss or refreshing it"""
+        with self._lock:
+            return self._entries.get(key)
+
+    def put(self, key, entry):
+        with self._lock:
+            if entry.nbytes > self.max_bytes:
+                # Too big to ever fit, serve it uncached
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old.nbytes
+            self._entries[key] = entry
+            self.current_bytes += entry.nbytes
+            while self.current_bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= evicted.nbytes
+                self.evictions += 1
+
+    def get_or_load(self, key, loader):
+        """Return the cached entry for key, calling loader() once on a miss"""
+        entry = self.get(key)
+        if entry is not None:
+            return entry
+
+        with self._lock:
+            loading = self._loading.get(key)
+            if loading is None:
+                loading = self._loading[key] = _Loading()
+            loading.users += 1
+
+        try:
+            with loading.lock:
+                # Another thread may have finished loading while we waited; an
+                # entry too big to cache is handed over through loading.entry
+                with self._lock:
+                    entry = self._entries.get(key)
+                    if entry is not None:
+                        self._entries.move_to_end(key)
+                if entry is None:
+                    entry = loading.entry
+                if entry is None:
+                    entry = loader()
+                    loading.entry = entry
+                    self.put(key, entry)
+        finally:
+            # The last user removes it, also when loader() raised: removing it
+            # while others still wait would let a newcomer load in parallel
+            with self._lock:
+                loading.users -= 1
+                if loading.users == 0:
+                    del self._loading[key]
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+
+# Process-wide cache shared by every AnalysisService instance
+dataset_cache = DatasetCache(
+    max_bytes=int(os.environ.get('DATASET_CACHE_MAX_MB', 512)) * 1024 * 1024
+)
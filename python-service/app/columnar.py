@@ -0,0 +1,154 @@
+import io
+import json
+import os
+
+from app.uploads import split_compression
+
+
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+ARROW_EXTENSIONS = ('.arrow', '.feather', '.ipc')
+# Sparse matrix files, read by app.sparse
+SPARSE_EXTENSIONS = ('.mtx',)
+
+# Request Content-Types accepted as binary columnar bodies
+COLUMNAR_MIMETYPES = {
+    'application/vnd.apache.parquet': 'parquet',
+    'application/x-parquet': 'parquet',
+    'application/vnd.apache.arrow.file': 'arrow',
+    'application/vnd.apache.arrow.stream': 'arrow',
+}
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        return pyarrow
+    except ImportError:
+        raise ValueError("Parquet/Arrow support requires the 'pyarrow' package")
+
+
+def columnar_format(file_name):
+    """Return 'parquet', 'arrow' or None based on the file extension"""
+    name = file_name.lower()
+    if name.endswith(PARQUET_EXTENSIONS):
+        return 'parquet'
+    if name.endswith(ARROW_EXTENSIONS):
+        return 'arrow'
+    return None
+
+
+def sparse_format(file_name):
+    """Return 'mtx' for Matrix Market files, otherwise None"""
+    if file_name and file_name.lower().endswith(SPARSE_EXTENSIONS):
+        return 'mtx'
+    return None
+
+
+def read_columnar_table(source, fmt, columns=None):
+    """Read a Parquet or Arrow IPC source into a pyarrow Table.
+
+    ``source`` is a file path, which is memory-mapped, a bytes-like body,
+    which is wrapped without copying, or a seekable binary file object.
+    Arrow IPC accepts both the file and
+    the stream layout. ``columns`` restricts the table to those columns
+    (Parquet skips reading the others entirely).
+    """
+    pa = _require_pyarrow()
+
+    if isinstance(source, str):
+        buffer = pa.memory_map(source, 'r')
+    elif hasattr(source, 'read'):
+        buffer = pa.PythonFile(source, mode='r')
+    else:
+        buffer = pa.BufferReader(pa.py_buffer(source))
+
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        return pq.read_table(buffer, columns=columns)
+
+    try:
+        table = pa.ipc.open_file(buffer).read_all()
+    except pa.ArrowInvalid:
+        buffer.seek(0)
+        table = pa.ipc.open_stream(buffer).read_all()
+    return table.select(columns) if columns else table
+
+
+def read_columnar(source, fmt, columns=None):
+    """Read a Parquet or Arrow IPC source (optionally only some columns) into a DataFrame"""
+    table = read_columnar_table(source, fmt, columns)
+    # split_blocks keeps one block per column so null-free numeric columns
+    # are handed to pandas without consolidation copies
+    return table.to_pandas(split_blocks=True)
+
+
+def iter_columnar_batches(source, fmt, batch_size):
+    """Yield DataFrames of at most batch_size rows from a Parquet or Arrow IPC source"""
+    table = read_columnar_table(source, fmt)
+    for batch in table.to_batches(max_chunksize=batch_size):
+        yield batch.to_pandas(split_blocks=True)
+
+
+def write_columnar(df, dest, fmt='arrow'):
+    """Write a DataFrame as Parquet or Arrow IPC (file layout) to a path or file object"""
+    pa = _require_pyarrow()
+    table = pa.Table.from_pandas(df, preserve_index=False)
+
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        pq.write_table(table, dest)
+    elif fmt == 'arrow':
+        with pa.ipc.new_file(dest, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        raise ValueError("Unsupported columnar format. Use 'parquet' or 'arrow'")
+
+
+def to_columnar_bytes(df, fmt='arrow'):
+    """Serialize a DataFrame to Parquet or Arrow IPC bytes"""
+    sink = io.BytesIO()
+    write_columnar(df, sink, fmt)
+    return sink.getvalue()
+
+
+def columnar_path(file_path, fmt='arrow'):
+    """Path of the columnar copy that sits next to a text dataset"""
+    base, _ = os.path.splitext(split_compression(file_path)[0])
+    return base + ('.parquet' if fmt == 'parquet' else '.arrow')
+
+
+def _source_record(file_path, stat):
+    return {'source': os.path.abspath(file_path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def record_columnar_copy(copy_path, file_path, stat):
+    """Write the sidecar saying copy_path was converted from file_path as it was at stat"""
+    sidecar = copy_path + '.source.json'
+    tmp_path = f"{sidecar}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(_source_record(file_path, stat), f)
+    os.replace(tmp_path, sidecar)
+
+
+def columnar_copy(file_path):
+    """(path, format) of a columnar copy converted from file_path as it is now, or None
+
+    Only copies with a sidecar from record_columnar_copy count, and only
+    while the text file keeps the size and mtime it had when converted:
+    an unrelated or stale .arrow/.parquet next to it is never read.
+    """
+    try:
+        current = _source_record(file_path, os.stat(file_path))
+    except OSError:
+        return None
+    for fmt in ('arrow', 'parquet'):
+        copy_path = columnar_path(file_path, fmt)
+        try:
+            with open(copy_path + '.source.json') as f:
+                recorded = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if recorded == current and os.path.exists(copy_path):
+            return copy_path, fmt
+    return None
+
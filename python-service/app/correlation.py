@@ -0,0 +1,170 @@
+import numpy as np
+import pandas as pd
+
+
+DEFAULT_BLOCK_SIZE = 1024
+
+
+def rank_columns(values):
+    """Average ranks of every column (NaNs stay NaN), computed once for Spearman"""
+    return pd.DataFrame(values).rank(axis=0, method='average').to_numpy(dtype=np.float64)
+
+
+def iter_correlation_tiles(values, method='pearson', dtype=np.float64, block_size=DEFAULT_BLOCK_SIZE, moments=None):
+    """Yield (row_start, col_start, tile) for the upper block triangle of the correlation matrix.
+
+    Columns are centered and scaled once, then every tile is a single
+    matrix product in ``dtype``. Spearman reuses the same path on column
+    ranks. Columns with missing values fall back to pairwise-complete
+    sums (six products per tile) so results match ``DataFrame.corr``;
+    for Spearman with missing values the ranks are taken once over each
+    column rather than re-ranked per pair. For Pearson, ``moments`` is an
+    optional precomputed (count, mean, var) triple of the columns.
+    """
+    if method == 'spearman':
+        values = rank_columns(values)
+        # Moments of the raw values don't apply to ranks
+        moments = None
+    elif method != 'pearson':
+        raise ValueError("Unsupported correlation method. Use 'pearson' or 'spearman'")
+
+    values = np.asarray(values, dtype=np.float64)
+    n_cols = values.shape[1]
+    present = ~np.isnan(values)
+
+    if moments is None:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(present, values, 0.0).sum(axis=0) / present.sum(axis=0)
+    else:
+        count, mean, var = moments
+    centered = np.where(present, values - np.nan_to_num(mean), 0.0)
+
+    if present.all():
+        if moments is None:
+            norms = np.sqrt((centered * centered).sum(axis=0))
+        else:
+            norms = np.sqrt(var * (count - 1))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            scaled = (centered / norms).astype(dtype)
+        for i0 in range(0, n_cols, block_size):
+            left = scaled[:, i0:i0 + block_size]
+            for j0 in range(i0, n_cols, block_size):
+                tile = left.T @ scaled[:, j0:j0 + block_size]
+                yield i0, j0, np.clip(tile, -1.0, 1.0, out=tile)
+        return
+
+    centered = centered.astype(dtype)
+    squared = centered * centered
+    mask = present.astype(dtype)
+    for i0 in range(0, n_cols, block_size):
+        rows = slice(i0, i0 + block_size)
+        for j0 in range(i0, n_cols, block_size):
+            cols = slice(j0, j0 + block_size)
+            count = mask[:, rows].T @ mask[:, cols]
+            sum_x = centered[:, rows].T @ mask[:, cols]
+            sum_y = mask[:, rows].T @ centered[:, cols]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                var_x = squared[:, rows].T @ mask[:, cols] - sum_x * sum_x / count
+                var_y = mask[:, rows].T @ squared[:, cols] - sum_y * sum_y / count
+                tile = (centered[:, rows].T @ centered[:, cols] - sum_x * sum_y / count) / np.sqrt(var_x * var_y)
+            tile[(var_x <= 0) | (var_y <= 0)] = np.nan
+            yield i0, j0, np.clip(tile, -1.0, 1.0, out=tile)
+
+
+def iter_matrix_tiles(corr, block_size=DEFAULT_BLOCK_SIZE):
+    """Tile an already computed correlation matrix the same way as iter_correlation_tiles"""
+    n_cols = corr.shape[0]
+    for i0 in range(0, n_cols, block_size):
+        for j0 in range(i0, n_cols, block_size):
+            yield i0, j0, corr[i0:i0 + block_size, j0:j0 + block_size]
+
+
+def collect_matrix(tiles, n_cols, dtype=np.float64):
+    """Assemble the full symmetric matrix from upper-triangle tiles"""
+    corr = np.empty((n_cols, n_cols), dtype=dtype)
+    for i0, j0, tile in tiles:
+        rows, cols = tile.shape
+        corr[i0:i0 + rows, j0:j0 + cols] = tile
+        corr[j0:j0 + cols, i0:i0 + rows] = tile.T
+    return corr
+
+
+def collect_condensed(tiles, n_cols):
+    """Assemble the condensed 1 - r distance vector (scipy's pdist layout) in float64.
+
+    Only the strict upper triangle is stored, n(n-1)/2 values, and each
+    tile is written straight into it, so the full matrix never exists.
+    float64 is what scipy's linkage works on: it would copy any other
+    dtype. Pairs without a correlation (NaN) get distance 1, as if
+    uncorrelated.
+    """
+    condensed = np.empty(n_cols * (n_cols - 1) // 2, dtype=np.float64)
+    for i0, j0, tile in tiles:
+        rows, cols = tile.shape
+        for i in range(i0, i0 + rows):
+            # Row i of the triangle holds columns i+1..n-1 contiguously
+            start = max(j0, i + 1)
+            if start >= j0 + cols:
+                continue
+            offset = i * n_cols - i * (i + 1) // 2 - i - 1
+            condensed[offset + start:offset + j0 + cols] = 1.0 - tile[i - i0, start - j0:]
+    np.nan_to_num(condensed, copy=False, nan=1.0)
+    return condensed
+
+
+def collect_pairs(tiles, threshold):
+    """Return (i, j, r) arrays for every pair i < j with |r| >= threshold"""
+    found_i, found_j, found_r = [], [], []
+    for i0, j0, tile in tiles:
+        with np.errstate(invalid='ignore'):
+            hits = np.abs(tile) >= threshold
+        if i0 == j0:
+            # Diagonal tile: keep the strict upper triangle only
+            hits &= np.triu(np.ones(tile.shape, dtype=bool), k=1)
+        ii, jj = np.nonzero(hits)
+        found_i.append(ii + i0)
+        found_j.append(jj + j0)
+        found_r.append(tile[ii, jj].astype(np.float64))
+
+    if not found_i:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+    return np.concatenate(found_i), np.concatenate(found_j), np.concatenate(found_r)
+
+
+def collect_top_k(tiles, n_cols, k):
+    """Return (indices, values), each (n_cols x k), of the k strongest |r| partners per column"""
+    k = min(k, n_cols - 1)
+    best_idx = np.full((n_cols, k), -1, dtype=np.int64)
+    best_val = np.full((n_cols, k), np.nan)
+    best_abs = np.full((n_cols, k), -np.inf)
+
+    def update(row_start, col_start, tile):
+        rows, cols = tile.shape
+        scores = np.abs(tile).astype(np.float64)
+        scores[np.isnan(scores)] = -np.inf
+        candidates = np.broadcast_to(np.arange(col_start, col_start + cols), (rows, cols))
+        # Never pick a column as its own partner
+        own = np.arange(row_start, row_start + rows)[:, None] == candidates
+        scores[own] = -np.inf
+
+        block = slice(row_start, row_start + rows)
+        merged_abs = np.concatenate([best_abs[block], scores], axis=1)
+        merged_idx = np.concatenate([best_idx[block], candidates], axis=1)
+        merged_val = np.concatenate([best_val[block], tile.astype(np.float64)], axis=1)
+        keep = np.argpartition(-merged_abs, k - 1, axis=1)[:, :k]
+        best_abs[block] = np.take_along_axis(merged_abs, keep, axis=1)
+        best_idx[block] = np.take_along_axis(merged_idx, keep, axis=1)
+        best_val[block] = np.take_along_axis(merged_val, keep, axis=1)
+
+    if k > 0:
+        for i0, j0, tile in tiles:
+            update(i0, j0, tile)
+            if i0 != j0:
+                update(j0, i0, tile.T)
+
+    # Order each row strongest first and drop empty slots
+    order = np.argsort(-best_abs, axis=1, kind='stable')
+    best_idx = np.take_along_axis(best_idx, order, axis=1)
+    best_val = np.take_along_axis(best_val, order, axis=1)
+    best_idx[~np.isfinite(np.take_along_axis(best_abs, order, axis=1))] = -1
+    return best_idx, best_val
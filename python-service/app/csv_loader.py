@@ -0,0 +1,161 @@
+import csv
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+# pyarrow's CSV reader tokenizes on several threads and takes declared column
+# types; fall back to the pandas C parser without it
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    CSV_ENGINE = 'pyarrow'
+except ImportError:
+    CSV_ENGINE = 'c'
+
+DELIMITERS = (',', '\t', ';', '|')
+FLOAT_DTYPES = ('float32', 'float64')
+
+# pandas' default na_values, so both parsers agree on what is missing
+NA_VALUES = ['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+             '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null']
+
+
+def sniff_header(first_line, file_name):
+    """Return (delimiter, column names) from a file's header line"""
+    first_line = first_line.rstrip('\r\n')
+    if file_name.endswith('.tsv'):
+        sep = '\t'
+    elif file_name.endswith('.csv') and ',' in first_line:
+        sep = ','
+    else:
+        # Most frequent candidate in the header, comma when there is none
+        counts = {candidate: first_line.count(candidate) for candidate in DELIMITERS}
+        best = max(DELIMITERS, key=lambda candidate: counts[candidate])
+        sep = best if counts[best] > 0 else ','
+    header = next(csv.reader([first_line], delimiter=sep), [])
+    return sep, tuple(header)
+
+
+class SchemaCache:
+    """Remembers which columns of a (delimiter, header) schema parsed as integers or floats.
+
+    Repeated uploads of the same layout then declare those types up front
+    instead of having the parser infer every column again.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, sep, header):
+        with self._lock:
+            entry = self._entries.get((sep, header))
+            if entry is not None:
+                self._entries.move_to_end((sep, header))
+                return dict(entry)
+            return {}
+
+    def update(self, sep, header, kind_by_column):
+        """Record each column's kind: 'int', 'float' or None for anything else"""
+        with self._lock:
+            entry = self._entries.pop((sep, header), {})
+            entry.update(kind_by_column)
+            self._entries[(sep, header)] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+schema_cache = SchemaCache()
+
+
+def _read_c(source, sep, usecols):
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    return pd.read_csv(source, sep=sep, usecols=usecols)
+
+
+def _read_arrow(source, sep, usecols, column_kinds, float_dtype):
+    if isinstance(source, str) or not hasattr(source, 'getvalue'):
+        # Paths (compressed ones too) and real files are read by pyarrow itself
+        data = source
+    else:
+        content = source.getvalue()
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        data = pa.BufferReader(pa.py_buffer(content))
+
+    float_type = pa.float32() if float_dtype == 'float32' else pa.float64()
+    column_types = {
+        column: pa.int64() if kind == 'int' else float_type
+        for column, kind in column_kinds.items()
+    }
+    table = pa_csv.read_csv(
+        data,
+        parse_options=pa_csv.ParseOptions(delimiter=sep),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=usecols,
+            column_types=column_types,
+            null_values=NA_VALUES,
+            strings_can_be_null=True,
+            # Keep date-like text as strings, like the C parser does
+            timestamp_parsers=[]
+        )
+    )
+    return table.to_pandas(split_blocks=True)
+
+
+def read_csv_typed(source, sep, header, usecols=None, float_dtype='float64', schemas=schema_cache):
+    """Parse delimited text into a DataFrame whose float columns are float_dtype.
+
+    Integer columns stay int64. Only ``usecols`` are parsed when given.
+    With pyarrow, columns already known to be integers or floats for this
+    header are declared as int64 or float_dtype so the reader skips type
+    inference for them; what a parse learns is stored back in
+    ``schemas``. (The C parser infers instead: a dtype map makes it
+    slower, not faster.)
+    """
+    if float_dtype not in FLOAT_DTYPES:
+        raise ValueError(f"Unsupported float dtype: {float_dtype}. Use float32 or float64")
+
+    # The C parser renames duplicate and empty column names; keep those files on it
+    use_arrow = CSV_ENGINE == 'pyarrow' and len(set(header)) == len(header) and all(header)
+
+    df = None
+    if use_arrow:
+        known = schemas.get(sep, header)
+        column_kinds = {column: known[column] for column in (usecols or header) if known.get(column)}
+        try:
+            df = _read_arrow(source, sep, list(usecols) if usecols else None, column_kinds, float_dtype)
+        except Exception:
+            # Text or decimals turned up in a previously numeric or integer column, or the input is
+            # something the pyarrow reader rejects: let the C parser infer
+            # everything (it also raises the usual error for malformed files)
+            df = None
+    if df is None:
+        df = _read_c(source, sep, usecols)
+
+    # Only float columns take float_dtype; integer columns (positions,
+    # counts) keep their type and the numeric matrix is cast separately
+    kinds = {column: _column_kind(df[column].dtype) for column in df.columns}
+    to_cast = [column for column, kind in kinds.items() if kind == 'float' and df[column].dtype != float_dtype]
+    if to_cast:
+        df[to_cast] = df[to_cast].astype(float_dtype)
+
+    schemas.update(sep, header, kinds)
+    return df
+
+
+def _column_kind(dtype):
+    if dtype.kind in 'iu':
+        return 'int'
+    if dtype.kind == 'f':
+        return 'float'
+    return None
@@ -0,0 +1,397 @@
+from itertools import combinations
+from math import comb
+
+import numpy as np
+from joblib import Parallel, delayed
+from scipy.special import chdtrc, fdtrc, stdtr
+
+
+# Contrasts a multi-group comparison can test besides the ANOVA / Kruskal-Wallis tests
+CONTRAST_MODES = ('all_pairs', 'one_vs_rest')
+
+
+def group_moments(values):
+    """NaN-aware per-column count, mean and sample variance (ddof=1)"""
+    present = ~np.isnan(values)
+    count = present.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(present, values, 0.0).sum(axis=0) / count
+        centered = np.where(present, values - mean, 0.0)
+        var = (centered * centered).sum(axis=0) / (count - 1)
+    return count, mean, var
+
+
+def log2_fold_change(mean1, mean2):
+    """log2(mean2 / mean1), falling back to the plain difference when a mean is not positive"""
+    positive = (mean1 > 0) & (mean2 > 0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ratio = np.log2(np.where(positive, mean2, 1.0) / np.where(positive, mean1, 1.0))
+    return np.where(positive, ratio, mean2 - mean1)
+
+
+def batched_ttest(group1, group2, equal_var=True, min_observations=2):
+    """Two-sample t-test for every column of two (samples x genes) matrices at once.
+
+    Uses the pooled variance when ``equal_var`` is true (like
+    ``scipy.stats.ttest_ind``), otherwise Welch's unequal-variance test.
+    Genes with fewer than ``min_observations`` non-missing values in either
+    group are masked out (``valid`` is False and their t/p are NaN).
+    """
+    group1 = np.asarray(group1, dtype=np.float64)
+    group2 = np.asarray(group2, dtype=np.float64)
+
+    n1, mean1, var1 = group_moments(group1)
+    n2, mean2, var2 = group_moments(group2)
+    t_stat, pvalue, valid = _ttest_from_moments(n1, mean1, var1, n2, mean2, var2, equal_var, min_observations)
+
+    return {
+        'n1': n1,
+        'n2': n2,
+        'mean1': mean1,
+        'mean2': mean2,
+        'var1': var1,
+        'var2': var2,
+        't': t_stat,
+        'pvalue': pvalue,
+        'log2fc': log2_fold_change(mean1, mean2),
+        'valid': valid
+    }
+
+
+def _ttest_from_moments(n1, mean1, var1, n2, mean2, var2, equal_var, min_observations):
+    """(t, two-sided p, valid) from group counts, means and variances (any matching shapes)"""
+    valid = (n1 >= min_observations) & (n2 >= min_observations)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if equal_var:
+            dof = np.asarray(n1 + n2 - 2, dtype=np.float64)
+            pooled = ((n1 - 1) * var1 + (n2 - 1) * var2) / dof
+            se = np.sqrt(pooled * (1.0 / n1 + 1.0 / n2))
+        else:
+            vn1 = var1 / n1
+            vn2 = var2 / n2
+            dof = (vn1 + vn2) ** 2 / (vn1 ** 2 / (n1 - 1) + vn2 ** 2 / (n2 - 1))
+            se = np.sqrt(vn1 + vn2)
+        t_stat = (mean1 - mean2) / se
+
+    t_stat = np.where(valid, t_stat, np.nan)
+    pvalue = np.full(t_stat.shape, np.nan)
+    # stdtr(df, -|t|) is scipy.stats.t.sf(|t|, df) without importing scipy.stats
+    pvalue[valid] = 2.0 * stdtr(dof[valid], -np.abs(t_stat[valid]))
+    return t_stat, pvalue, valid
+
+
+def group_sums(values, codes, n_groups):
+    """Per-group count, sum and sum of squares of every column, each (n_groups x genes).
+
+    ``codes`` gives each row's group (0..n_groups-1). The columns are
+    centered on their mean first so the sums stay small; the center is
+    returned too. Three matrix products with a one-hot group indicator.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    present = ~np.isnan(values)
+    with np.errstate(invalid='ignore'):
+        center = np.nanmean(values, axis=0) if len(values) else np.zeros(values.shape[1])
+    center = np.nan_to_num(center)
+    centered = np.where(present, values - center, 0.0)
+
+    indicator = np.zeros((n_groups, len(values)))
+    indicator[codes, np.arange(len(values))] = 1.0
+    count = indicator @ present.astype(np.float64)
+    return count, indicator @ centered, indicator @ (centered * centered), center
+
+
+def batched_anova(count, sums, sumsq, min_observations=2):
+    """One-way ANOVA F test for every gene from per-group sufficient statistics (see group_sums).
+
+    Groups without values for a gene don't count towards its degrees of
+    freedom; a gene needs two groups with values and at least
+    ``min_observations`` values overall. Returns (F, p, valid).
+    """
+    total = count.sum(axis=0)
+    k = (count > 0).sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        explained = np.where(count > 0, sums * sums / count, 0.0).sum(axis=0)
+        between = explained - sums.sum(axis=0) ** 2 / total
+        within = sumsq.sum(axis=0) - explained
+        df_between = k - 1
+        df_within = total - k
+        f_stat = (between / df_between) / (within / df_within)
+
+    valid = (k >= 2) & (df_within > 0) & (total >= min_observations)
+    f_stat = np.where(valid, f_stat, np.nan)
+    pvalue = np.full(f_stat.shape, np.nan)
+    pvalue[valid] = fdtrc(df_between[valid], df_within[valid], f_stat[valid])
+    return f_stat, pvalue, valid
+
+
+def batched_kruskal(values, codes, n_groups):
+    """Kruskal-Wallis H test for every gene at once, with the tie correction of scipy.stats.kruskal.
+
+    Every column is sorted once (NaNs ignored) and tied runs are found
+    with running max/min of their boundaries, which gives the average
+    ranks and tie sizes without a per-gene loop; the rank sums per
+    group are then one matrix product. Returns (H, p, valid).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    order = np.argsort(values, axis=0)
+    ordered = np.take_along_axis(values, order, axis=0)
+    present_sorted = ~np.isnan(ordered)
+    position = np.arange(n)[:, None]
+    # A run of equal values spans [start, end]; NaNs sort last and never tie
+    boundary = np.ones(ordered.shape, dtype=bool)
+    boundary[1:] = ordered[1:] != ordered[:-1]
+    start = np.maximum.accumulate(np.where(boundary, position, 0), axis=0)
+    last = np.ones(ordered.shape, dtype=bool)
+    last[:-1] = boundary[1:]
+    end = np.minimum.accumulate(np.where(last, position, n)[::-1], axis=0)[::-1]
+
+    average = np.empty_like(ordered)
+    np.put_along_axis(average, order, np.where(present_sorted, (start + end) / 2.0 + 1.0, 0.0), axis=0)
+    # Every member of a tie of size t contributes t^2 - 1, so these sum to sum(t^3 - t) over ties
+    ties = np.where(present_sorted, (end - start + 1.0) ** 2 - 1.0, 0.0).sum(axis=0)
+
+    indicator = np.zeros((n_groups, n))
+    indicator[codes, np.arange(n)] = 1.0
+    count = indicator @ (~np.isnan(values)).astype(np.float64)
+    rank_sums = indicator @ average
+    total = count.sum(axis=0)
+    k = (count > 0).sum(axis=0)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        h_stat = 12.0 / (total * (total + 1)) * np.where(count > 0, rank_sums ** 2 / count, 0.0).sum(axis=0) - 3.0 * (total + 1)
+        correction = 1.0 - ties / (total ** 3 - total)
+        h_stat = h_stat / correction
+
+    valid = (k >= 2) & (correction > 0)
+    h_stat = np.where(valid, h_stat, np.nan)
+    pvalue = np.full(h_stat.shape, np.nan)
+    pvalue[valid] = chdtrc(k[valid] - 1, h_stat[valid])
+    return h_stat, pvalue, valid
+
+
+def contrast_design(n_groups, mode='all_pairs'):
+    """Group pairs and side matrices of the contrasts of a multi-group comparison.
+
+    'all_pairs' compares every group with every later one; 'one_vs_rest'
+    compares every group with all the others pooled. Returns (pairs,
+    first, second), pairs holding each contrast's (first, second) group
+    index with -1 standing for the rest, and the side matrices as
+    contrast_ttests takes them.
+    """
+    if mode not in CONTRAST_MODES:
+        raise ValueError("Unsupported contrasts. Use 'all_pairs' or 'one_vs_rest'")
+    identity = np.eye(n_groups)
+    if mode == 'all_pairs':
+        pairs = [(i, j) for i in range(n_groups) for j in range(i + 1, n_groups)]
+        first = identity[[i for i, _ in pairs]]
+        second = identity[[j for _, j in pairs]]
+    else:
+        pairs = [(-1, i) for i in range(n_groups)]
+        first = 1.0 - identity
+        second = identity
+    return pairs, first.reshape(len(pairs), n_groups), second.reshape(len(pairs), n_groups)
+
+
+def contrast_ttests(count, sums, sumsq, center, first, second, equal_var=True, min_observations=2):
+    """Two-sample t-tests of many contrasts for every gene, from per-group sufficient statistics.
+
+    ``first`` and ``second`` are (contrasts x groups) 0/1 matrices of the
+    groups pooled on each side (e.g. one group against one other for
+    all pairs, or the remaining groups against one for one-vs-rest), so
+    the per-side statistics are matrix products too. Returns a dict of
+    (contrasts x genes) arrays like batched_ttest.
+    """
+    sides = []
+    for side in (first, second):
+        n = side @ count
+        s = side @ sums
+        q = side @ sumsq
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = s / n
+            var = (q - s * mean) / (n - 1)
+        sides.append((n, mean, var))
+    (n1, mean1, var1), (n2, mean2, var2) = sides
+
+    t_stat, pvalue, valid = _ttest_from_moments(n1, mean1, var1, n2, mean2, var2, equal_var, min_observations)
+    # Fold changes need the uncentered means
+    mean1 = mean1 + center
+    mean2 = mean2 + center
+    return {
+        'n1': n1,
+        'n2': n2,
+        'mean1': mean1,
+        'mean2': mean2,
+        't': t_stat,
+        'pvalue': pvalue,
+        'log2fc': log2_fold_change(mean1, mean2),
+        'valid': valid
+    }
+
+
+def benjamini_hochberg(pvalues):
+    """Benjamini-Hochberg adjusted p-values; NaN p-values are ignored and stay NaN"""
+    pvalues = np.asarray(pvalues, dtype=np.float64)
+    adjusted = np.full(pvalues.shape, np.nan)
+    tested = ~np.isnan(pvalues)
+    p = pvalues[tested]
+    m = len(p)
+    if m == 0:
+        return adjusted
+
+    order = np.argsort(p)
+    scaled = p[order] * m / np.arange(1, m + 1)
+    # Enforce monotonicity from the largest p-value down
+    scaled = np.minimum.accumulate(scaled[::-1])[::-1]
+    ranked = np.empty(m)
+    ranked[order] = np.minimum(scaled, 1.0)
+    adjusted[tested] = ranked
+    return adjusted
+
+
+def _t_from_sums(n1, s1, q1, n2, s2, q2, equal_var, min_observations):
+    """t statistics from per-group counts, sums and sums of squares (any matching shapes)"""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean1 = s1 / n1
+        mean2 = s2 / n2
+        var1 = (q1 - s1 * mean1) / (n1 - 1)
+        var2 = (q2 - s2 * mean2) / (n2 - 1)
+        if equal_var:
+            pooled = ((n1 - 1) * var1 + (n2 - 1) * var2) / (n1 + n2 - 2)
+            se = np.sqrt(pooled * (1.0 / n1 + 1.0 / n2))
+        else:
+            se = np.sqrt(var1 / n1 + var2 / n2)
+        t_stat = (mean1 - mean2) / se
+    return np.where((n1 >= min_observations) & (n2 >= min_observations), t_stat, np.nan)
+
+
+def permutation_batches(labels, max_permutations, batch_size, seed=0):
+    """Yield (batch, n_labels) boolean matrices of permuted group-1 labels.
+
+    When the number of distinct relabelings is within max_permutations all
+    of them are enumerated (an exact test, including the observed one).
+    Otherwise batch r is drawn from its own child of SeedSequence(seed),
+    so every process regenerates exactly the same permutations.
+    """
+    labels = np.asarray(labels, dtype=bool)
+    n, n1 = len(labels), int(labels.sum())
+
+    if comb(n, n1) <= max_permutations:
+        members = combinations(range(n), n1)
+        while True:
+            chunk = [m for _, m in zip(range(batch_size), members)]
+            if not chunk:
+                return
+            batch = np.zeros((len(chunk), n), dtype=bool)
+            batch[np.repeat(np.arange(len(chunk)), n1), np.concatenate(chunk)] = True
+            yield batch
+        return
+
+    n_batches = -(-max_permutations // batch_size)
+    for r, child in enumerate(np.random.SeedSequence(seed).spawn(n_batches)):
+        size = min(batch_size, max_permutations - r * batch_size)
+        rng = np.random.default_rng(child)
+        yield rng.permuted(np.broadcast_to(labels, (size, n)), axis=1)
+
+
+def permutation_counts(values, labels, equal_var=True, max_permutations=10000, batch_size=256,
+                       min_exceedances=10, seed=0, min_observations=2):
+    """Count, per column, permutations whose |t| reaches the observed |t|.
+
+    ``values`` is the (samples x genes) matrix of both groups and ``labels``
+    marks the group-1 rows. Each batch of permutations is applied to all
+    still-active genes with three matrix products (group-1 counts, sums and
+    sums of squares). In sampled mode a gene stops once it has
+    ``min_exceedances`` exceedances (Besag-Clifford), as its p-value is
+    then clearly not small. Returns (observed t, exceedances, permutations
+    used, exact).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    labels = np.asarray(labels, dtype=bool)
+    present = ~np.isnan(values)
+
+    # Center each column first; t is shift invariant and the sums stay small
+    with np.errstate(invalid='ignore'):
+        center = np.nanmean(values, axis=0) if values.size else np.zeros(values.shape[1])
+    centered = np.where(present, values - np.nan_to_num(center), 0.0)
+    squared = centered * centered
+    mask = present.astype(np.float64)
+    complete = present.all()
+
+    totals = (mask.sum(axis=0), centered.sum(axis=0), squared.sum(axis=0))
+
+    def t_for(indicators, cols):
+        n1 = np.broadcast_to(indicators.sum(axis=1)[:, None], (len(indicators), len(cols))) if complete \
+            else indicators @ mask[:, cols]
+        s1 = indicators @ centered[:, cols]
+        q1 = indicators @ squared[:, cols]
+        n, s, q = (total[cols] for total in totals)
+        return _t_from_sums(n1, s1, q1, n - n1, s - s1, q - q1, equal_var, min_observations)
+
+    all_cols = np.arange(values.shape[1])
+    observed = t_for(labels[None, :].astype(np.float64), all_cols)[0]
+    # Relative tolerance so relabelings equivalent to the observed one count as ties
+    threshold = np.abs(observed) * (1 - 1e-9)
+
+    exceed = np.zeros(values.shape[1], dtype=np.int64)
+    used = np.zeros(values.shape[1], dtype=np.int64)
+    active = ~np.isnan(observed)
+    exact = comb(len(labels), int(labels.sum())) <= max_permutations
+
+    for batch in permutation_batches(labels, max_permutations, batch_size, seed):
+        cols = np.flatnonzero(active)
+        if len(cols) == 0:
+            break
+        t_stat = t_for(batch.astype(np.float64), cols)
+        exceed[cols] += (np.abs(t_stat) >= threshold[cols]).sum(axis=0)
+        used[cols] += len(batch)
+        if not exact and min_exceedances:
+            active[cols[exceed[cols] >= min_exceedances]] = False
+
+    return observed, exceed, used, exact
+
+
+def permutation_ttest(group1, group2, equal_var=True, max_permutations=10000, batch_size=256,
+                      min_exceedances=10, seed=0, n_jobs=1, min_observations=2):
+    """Permutation p-values of the two-sample t statistic for every column.
+
+    Genes are split into blocks processed in parallel; every block sees
+    the same permutations (see ``permutation_batches``), so results do not
+    depend on n_jobs. Exact tests use p = exceedances / relabelings;
+    sampled tests use (exceedances + 1) / (permutations + 1).
+    """
+    group1 = np.asarray(group1, dtype=np.float64)
+    group2 = np.asarray(group2, dtype=np.float64)
+    values = np.vstack([group1, group2])
+    labels = np.arange(len(values)) < len(group1)
+    n_genes = values.shape[1]
+
+    n_jobs = max(1, min(n_jobs or 1, n_genes))
+    blocks = [block for block in np.array_split(np.arange(n_genes), n_jobs) if len(block)]
+    args = (equal_var, max_permutations, batch_size, min_exceedances, seed, min_observations)
+    if len(blocks) > 1:
+        parts = Parallel(n_jobs=len(blocks))(
+            delayed(permutation_counts)(values[:, block], labels, *args) for block in blocks
+        )
+    else:
+        parts = [permutation_counts(values, labels, *args)]
+
+    observed = np.concatenate([part[0] for part in parts]) if parts else np.empty(0)
+    exceed = np.concatenate([part[1] for part in parts]) if parts else np.empty(0, dtype=np.int64)
+    used = np.concatenate([part[2] for part in parts]) if parts else np.empty(0, dtype=np.int64)
+    exact = parts[0][3] if parts else True
+
+    valid = ~np.isnan(observed)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        pvalue = exceed / used if exact else (exceed + 1) / (used + 1)
+    pvalue = np.where(valid, pvalue, np.nan)
+
+    return {
+        't': observed,
+        'pvalue': pvalue,
+        'permutations': used,
+        'exceedances': exceed,
+        'exact': exact,
+        'valid': valid
+    }
@@ -0,0 +1,162 @@
+import json
+
+import numpy as np
+from flask import Response
+from werkzeug.exceptions import NotAcceptable
+
+# orjson serializes numpy arrays natively (and everything else several times
+# faster than the json module); fall back to json without it
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+JSON = 'application/json'
+# Same envelope, with matrices as {"dtype", "shape", "data": flat row-major array}
+# and labels listed once instead of repeated per value
+COMPACT_JSON = 'application/vnd.bioinformatics.compact+json'
+ARROW_STREAM = 'application/vnd.apache.arrow.stream'
+MSGPACK = 'application/msgpack'
+
+LAYOUTS = ('nested', 'compact')
+PRECISIONS = ('float32', 'float64')
+
+
+def available_encodings():
+    """Response mimetypes this process can produce, preferred first"""
+    encodings = [JSON, COMPACT_JSON]
+    try:
+        import pyarrow
+        encodings.append(ARROW_STREAM)
+    except ImportError:
+        pass
+    if msgpack is not None:
+        encodings.extend([MSGPACK, 'application/x-msgpack'])
+    return encodings
+
+
+def negotiate(accept_mimetypes):
+    """Pick the response mimetype from a request's Accept header
+
+    JSON when the header is absent or names nothing this process can
+    produce, so clients that never asked for another encoding keep working.
+    """
+    best = accept_mimetypes.best_match(available_encodings()) if accept_mimetypes else None
+    if best is None:
+        return JSON
+    return MSGPACK if best == 'application/x-msgpack' else best
+
+
+def layout_for(mimetype):
+    """Result layout the analyses should build for a response mimetype"""
+    return 'nested' if mimetype == JSON else 'compact'
+
+
+def _float_cast(array, precision):
+    if array.dtype.kind == 'f' and array.dtype != precision:
+        return array.astype(precision)
+    return array
+
+
+def _array_header(array):
+    return {'dtype': array.dtype.name, 'shape': list(array.shape)}
+
+
+def _walk(value, on_array, path='data'):
+    """Copy the (small) nested dict/list structure, replacing arrays via on_array(array, path)"""
+    if isinstance(value, np.ndarray):
+        return on_array(value, path)
+    if isinstance(value, dict):
+        return {key: _walk(item, on_array, f'{path}.{key}') for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_walk(item, on_array, f'{path}.{i}') for i, item in enumerate(value)]
+    return value
+
+
+def _json_default(value):
+    # Only reached without orjson: numpy values the json module can't encode
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def dumps_json(value):
+    """Encode to JSON bytes: orjson when available (numpy arrays natively), else json"""
+    if orjson is not None:
+        # Sorted keys like Flask's jsonify; NaN/inf become null
+        return orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS)
+    return json.dumps(value, default=_json_default, sort_keys=True).encode('utf-8')
+
+
+def _encode_compact_json(payload, precision):
+    def on_array(array, path):
+        return {**_array_header(array), 'data': np.ascontiguousarray(_float_cast(array, precision)).ravel()}
+    return dumps_json(_walk(payload, on_array))
+
+
+def _encode_arrow(payload, precision):
+    """Encode as a one-row Arrow IPC stream.
+
+    Each array becomes a list column holding its flat values (wrapped
+    without copying). The rest of the payload is JSON in the schema
+    metadata, with {"column", "dtype", "shape"} where each array was.
+    """
+    import pyarrow as pa
+
+    columns = {}
+
+    def on_array(array, path):
+        flat = np.ascontiguousarray(_float_cast(array, precision)).ravel()
+        offsets = pa.array([0, len(flat)], type=pa.int32())
+        columns[path] = pa.ListArray.from_arrays(offsets, pa.array(flat))
+        return {'column': path, **_array_header(array)}
+
+    envelope = _walk(payload, on_array)
+    table = pa.table(columns).replace_schema_metadata({'envelope': dumps_json(envelope)})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _encode_msgpack(payload, precision):
+    def on_array(array, path):
+        flat = np.ascontiguousarray(_float_cast(array, precision))
+        # Raw little-endian buffer; clients view it as a typed array of dtype/shape
+        return {**_array_header(flat), 'data': flat.astype(flat.dtype.newbyteorder('<'), copy=False).tobytes()}
+    return msgpack.packb(_walk(payload, on_array), default=_json_default, use_bin_type=True)
+
+
+def encode(payload, mimetype, precision='float64'):
+    """Encode a response payload whose results may hold numpy arrays.
+
+    Compact JSON, Arrow and msgpack write float arrays in ``precision``
+    (float64 by default, float32 to halve their size); plain JSON keeps
+    full precision.
+    """
+    if precision not in PRECISIONS:
+        raise ValueError("Unsupported precision. Use 'float32' or 'float64'")
+    if mimetype == JSON:
+        return dumps_json(payload)
+    if mimetype == COMPACT_JSON:
+        return _encode_compact_json(payload, precision)
+    if mimetype == ARROW_STREAM:
+        return _encode_arrow(payload, precision)
+    if mimetype == MSGPACK and msgpack is not None:
+        return _encode_msgpack(payload, precision)
+    raise NotAcceptable(f"Unsupported response encoding: {mimetype}")
+
+
+def encoded_response(payload, mimetype, precision='float64', status=200):
+    """A Flask Response with the payload encoded as mimetype"""
+    response = Response(encode(payload, mimetype, precision), status=status, mimetype=mimetype)
+    response.vary.add('Accept')
+    return response
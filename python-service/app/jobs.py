@@ -0,0 +1,328 @@
+import json
+import multiprocessing
+import os
+import shutil
+import signal
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+# Analyses that can run as background jobs, by AnalysisService method name
+JOB_METHODS = ('calculate_basic_stats', 'calculate_correlation', 'differential_analysis', 'clustering_analysis', 'clustering_sweep')
+
+FINISHED_STATES = ('completed', 'failed', 'cancelled', 'timed_out')
+
+
+class QueueFullError(Exception):
+    """Raised when too many jobs are already waiting or running"""
+
+
+# Not Exception subclasses, so analysis code that catches Exception can't swallow them
+class JobTimeout(BaseException):
+    pass
+
+
+class JobCancelled(BaseException):
+    pass
+
+
+def _write_json(path, payload):
+    # Write then rename so readers in other processes never see partial JSON
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(payload, f)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+# ---- worker process side ----
+
+_worker_service = None
+_current_job_dir = None
+
+
+def _init_worker():
+    global _worker_service
+    from app.analysis import AnalysisService
+    _worker_service = AnalysisService()
+    if hasattr(signal, 'SIGUSR1'):
+        signal.signal(signal.SIGUSR1, _on_cancel_signal)
+    if hasattr(signal, 'SIGALRM'):
+        signal.signal(signal.SIGALRM, _on_timeout_signal)
+
+
+def _on_cancel_signal(signum, frame):
+    # The signal may arrive after the job it was meant for has finished
+    if _current_job_dir and os.path.exists(os.path.join(_current_job_dir, 'cancel')):
+        raise JobCancelled()
+
+
+def _on_timeout_signal(signum, frame):
+    raise JobTimeout()
+
+
+_status_lock = threading.Lock()
+
+
+@contextmanager
+def _locked_status(job_dir):
+    """Serialize status.json updates of a job: flock across processes, else within this one"""
+    with _status_lock, open(os.path.join(job_dir, 'status.lock'), 'a+b') as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
+
+
+def _update_status(job_dir, **changes):
+    """Apply changes to a job's status.json and return the status
+
+    The web process (cancel, dead workers) and the pool worker both
+    update it, so the read-modify-write holds the job's lock, and a
+    finished status is final: a worker can't overwrite a cancel with
+    'running' or 'completed'.
+    """
+    status_path = os.path.join(job_dir, 'status.json')
+    with _locked_status(job_dir):
+        status = _read_json(status_path) or {}
+        if status.get('status') in FINISHED_STATES:
+            return status
+        status.update(changes)
+        _write_json(status_path, status)
+    return status
+
+
+def _run_job(job_dir, method_name, input_name, file_name, args, kwargs, timeout):
+    """Run one AnalysisService call inside a pool worker and store its result on disk"""
+    global _current_job_dir
+    if os.path.exists(os.path.join(job_dir, 'cancel')):
+        _update_status(job_dir, status='cancelled', finished_at=time.time())
+        return 'cancelled'
+
+    status = _update_status(job_dir, status='running', phase='loading', progress=0.1, started_at=time.time(), pid=os.getpid())
+    if status['status'] != 'running':
+        # Cancelled from the web process since the check above
+        return status['status']
+    use_alarm = timeout and hasattr(signal, 'setitimer')
+    try:
+        _current_job_dir = job_dir
+        # A cancel that read the status before our pid was in it sent no signal
+        if os.path.exists(os.path.join(job_dir, 'cancel')):
+            raise JobCancelled()
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, timeout)
+
+        input_path = os.path.join(job_dir, input_name)
+        if input_name.endswith('.txt'):
+            with open(input_path, 'r', encoding='utf-8', newline='') as f:
+                file_content = f.read()
+        else:
+            with open(input_path, 'rb') as f:
+                file_content = f.read()
+
+        _update_status(job_dir, phase='computing', progress=0.3)
+        result = getattr(_worker_service, method_name)(file_content, file_name, *args, **kwargs)
+
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+        _update_status(job_dir, phase='writing', progress=0.9)
+        _write_json(os.path.join(job_dir, 'result.json'), result)
+        _update_status(job_dir, status='completed', phase=None, progress=1.0, finished_at=time.time())
+        return 'completed'
+    except JobTimeout:
+        _update_status(job_dir, status='timed_out', error=f'Job exceeded {timeout}s timeout', finished_at=time.time())
+        return 'timed_out'
+    except JobCancelled:
+        _update_status(job_dir, status='cancelled', finished_at=time.time())
+        return 'cancelled'
+    except Exception as e:
+        _update_status(job_dir, status='failed', error=str(e), finished_at=time.time())
+        return 'failed'
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+        _current_job_dir = None
+        try:
+            os.remove(os.path.join(job_dir, input_name))
+        except OSError:
+            pass
+
+
+# ---- web process side ----
+
+class JobManager:
+    """Runs AnalysisService calls in a bounded process pool.
+
+    Job state and results live on local disk (one directory per job), so
+    any web worker process can report status, return results or cancel a
+    job. Finished jobs are removed after ``result_ttl`` seconds.
+
+    The pool and the queue limit belong to this manager, i.e. to one web
+    process: under gunicorn every worker has its own, so the host runs up
+    to workers x max_workers jobs at once and queues up to workers x
+    max_queue. Size JOB_MAX_WORKERS and JOB_MAX_QUEUE per web worker.
+    """
+
+    def __init__(self, jobs_dir, max_workers=2, max_queue=8, timeout=600, result_ttl=3600):
+        self.jobs_dir = jobs_dir
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.result_ttl = result_ttl
+        self._executor = None
+        self._futures = {}
+        self._lock = threading.Lock()
+        os.makedirs(jobs_dir, exist_ok=True)
+
+    def _get_executor(self):
+        if self._executor is None:
+            # spawn avoids forking a multi-threaded web process
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker
+            )
+        return self._executor
+
+    def _job_dir(self, job_id):
+        # Job ids are hex uuids; anything else cannot name a job directory
+        if not job_id or not all(c in '0123456789abcdef' for c in job_id):
+            return None
+        return os.path.join(self.jobs_dir, job_id)
+
+    def submit(self, method_name, file_content, file_name, args=(), kwargs=None, timeout=None):
+        """Queue an analysis and return its job id, or raise QueueFullError"""
+        if method_name not in JOB_METHODS:
+            raise ValueError(f"Unsupported job analysis: {method_name}")
+        self.cleanup()
+
+        with self._lock:
+            self._futures = {job_id: f for job_id, f in self._futures.items() if not f.done()}
+            if len(self._futures) >= self.max_queue:
+                raise QueueFullError(f"Job queue is full ({self.max_queue} jobs pending)")
+
+            job_id = uuid.uuid4().hex
+            job_dir = self._job_dir(job_id)
+            os.makedirs(job_dir)
+
+            # Hand the worker a file instead of pickling the content through a pipe
+            if isinstance(file_content, str):
+                input_name = 'input.txt'
+                with open(os.path.join(job_dir, input_name), 'w', encoding='utf-8', newline='') as f:
+                    f.write(file_content)
+            elif hasattr(file_content, 'save'):
+                # A streamed upload (SpooledBody) is copied over without loading it
+                input_name = 'input.bin'
+                file_content.save(os.path.join(job_dir, input_name))
+            else:
+                input_name = 'input.bin'
+                with open(os.path.join(job_dir, input_name), 'wb') as f:
+                    f.write(file_content)
+
+            _write_json(os.path.join(job_dir, 'status.json'), {
+                'job_id': job_id,
+                'analysis': method_name,
+                'status': 'queued',
+                'phase': None,
+                'progress': 0.0,
+                'submitted_at': time.time()
+            })
+
+            job_args = (_run_job, job_dir, method_name, input_name, file_name,
+                        list(args), dict(kwargs or {}), timeout or self.timeout)
+            try:
+                self._futures[job_id] = self._get_executor().submit(*job_args)
+            except BrokenProcessPool:
+                # A worker died (e.g. out of memory); start a fresh pool
+                self._executor = None
+                self._futures[job_id] = self._get_executor().submit(*job_args)
+        return job_id
+
+    def status(self, job_id):
+        """Return the job's status dict, or None for unknown/expired jobs"""
+        job_dir = self._job_dir(job_id)
+        if job_dir is None:
+            return None
+        status = _read_json(os.path.join(job_dir, 'status.json'))
+        if status is None:
+            return None
+
+        future = self._futures.get(job_id)
+        if status['status'] in ('queued', 'running') and future is not None and future.done():
+            # The worker died before it could record an outcome
+            error = future.exception() if not future.cancelled() else None
+            if error is not None:
+                status = _update_status(job_dir, status='failed', error=str(error), finished_at=time.time())
+        status.pop('pid', None)
+        return status
+
+    def result(self, job_id):
+        """Return the stored result of a completed job, or None"""
+        job_dir = self._job_dir(job_id)
+        if job_dir is None:
+            return None
+        return _read_json(os.path.join(job_dir, 'result.json'))
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job; returns the resulting status or None if unknown"""
+        job_dir = self._job_dir(job_id)
+        if job_dir is None or not os.path.exists(job_dir):
+            return None
+
+        status = _read_json(os.path.join(job_dir, 'status.json')) or {}
+        if status.get('status') in FINISHED_STATES:
+            return self.status(job_id)
+
+        # The marker stops queued jobs from starting in any process
+        open(os.path.join(job_dir, 'cancel'), 'w').close()
+        # The worker may have started it meanwhile: signal the pid it recorded
+        status = _read_json(os.path.join(job_dir, 'status.json')) or status
+
+        future = self._futures.get(job_id)
+        if future is not None and future.cancel():
+            _update_status(job_dir, status='cancelled', finished_at=time.time())
+        elif status.get('status') == 'running' and status.get('pid') and hasattr(signal, 'SIGUSR1'):
+            # Interrupt the worker; it only aborts if it is still on this job
+            try:
+                os.kill(status['pid'], signal.SIGUSR1)
+            except OSError:
+                pass
+        return self.status(job_id)
+
+    def cleanup(self):
+        """Delete finished jobs older than the result TTL"""
+        now = time.time()
+        try:
+            job_ids = os.listdir(self.jobs_dir)
+        except FileNotFoundError:
+            return
+        for job_id in job_ids:
+            job_dir = os.path.join(self.jobs_dir, job_id)
+            status = _read_json(os.path.join(job_dir, 'status.json'))
+            if status is None:
+                continue
+            finished_at = status.get('finished_at')
+            if status.get('status') in FINISHED_STATES and finished_at and now - finished_at > self.result_ttl:
+                shutil.rmtree(job_dir, ignore_errors=True)
+                with self._lock:
+                    self._futures.pop(job_id, None)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
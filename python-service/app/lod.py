@@ -0,0 +1,210 @@
+import glob
+import os
+import re
+import tempfile
+import threading
+import uuid
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+# Point budget of a sampled clustering result and grid size of a density one
+DEFAULT_MAX_POINTS = 5000
+DEFAULT_DENSITY_BINS = 64
+# Every cluster keeps at least this many sampled points (or all of its own)
+MIN_POINTS_PER_CLUSTER = 50
+# Most labels one page request returns
+MAX_PAGE_SIZE = 100000
+
+LOD_MODES = ('sample', 'density')
+
+
+class ClusteringPoints:
+    """Full-resolution labels and PCA points kept for paging after a downsampled response"""
+
+    def __init__(self, labels, pca_data):
+        self.labels = np.ascontiguousarray(labels, dtype=np.int32)
+        # Full precision, as in the clustering response the pages continue
+        self.pca_data = np.ascontiguousarray(pca_data, dtype=np.float64)
+        self.nbytes = int(self.labels.nbytes + self.pca_data.nbytes)
+
+    def page(self, offset, limit):
+        rows = slice(offset, offset + limit)
+        return self.labels[rows], self.pca_data[rows]
+
+
+def _default_directory():
+    # tmpfs keeps the files in RAM; fall back to the temp dir elsewhere
+    base = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return os.path.join(base, 'bioinformatics-results')
+
+
+class ResultStore:
+    """Full-resolution clustering points in files every process on the host can read.
+
+    A result is written by whichever process ran the clustering (a web
+    worker or a background job worker) and paged by any web worker, so it
+    can't live in process memory. Each result is two .npy files named by
+    its id, PCA points first and labels last so the labels file marks the
+    result complete; reads memory-map them. Least recently read results
+    are removed beyond max_bytes, and a page request after that gets a
+    404 and the client re-runs the clustering.
+
+    The directory is created by the first put. Eviction is serialized
+    with flock across processes; where fcntl is not available only
+    within the process.
+    """
+
+    def __init__(self, directory=None, max_bytes=128 * 1024 * 1024):
+        self.directory = directory or _default_directory()
+        self.max_bytes = int(max_bytes)
+        self._lock = threading.Lock()
+
+    def _path(self, result_id, name):
+        return os.path.join(self.directory, f'{result_id}.{name}.npy')
+
+    def put(self, result_id, points):
+        if points.nbytes > self.max_bytes:
+            # Too big to ever fit: pages of it would always 404
+            return False
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = f'.{os.getpid()}.tmp'
+        for name, array in (('pca', points.pca_data), ('labels', points.labels)):
+            with open(self._path(result_id, name) + tmp, 'wb') as f:
+                np.save(f, array)
+            os.replace(self._path(result_id, name) + tmp, self._path(result_id, name))
+        self._make_room()
+        return True
+
+    def get(self, result_id):
+        """The stored ClusteringPoints of result_id, or None when unknown or removed"""
+        if not re.fullmatch(r'[0-9a-f]{32}', str(result_id)):
+            return None
+        try:
+            labels = np.load(self._path(result_id, 'labels'), mmap_mode='r')
+            pca_data = np.load(self._path(result_id, 'pca'), mmap_mode='r')
+            os.utime(self._path(result_id, 'labels'))
+        except (FileNotFoundError, ValueError):
+            return None
+        return ClusteringPoints(labels, pca_data)
+
+    def _entries(self):
+        """(result id, nbytes, last read) of every stored result, least recently read first"""
+        entries = []
+        for path in glob.glob(os.path.join(self.directory, '*.labels.npy')):
+            result_id = os.path.basename(path)[:-len('.labels.npy')]
+            try:
+                nbytes = os.path.getsize(path) + os.path.getsize(self._path(result_id, 'pca'))
+                entries.append((result_id, nbytes, os.path.getmtime(path)))
+            except OSError:
+                continue
+        entries.sort(key=lambda entry: entry[2])
+        return entries
+
+    def _make_room(self):
+        with self._lock, open(os.path.join(self.directory, 'store.lock'), 'a+b') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            entries = self._entries()
+            total = sum(entry[1] for entry in entries)
+            for result_id, nbytes, _ in entries[:-1]:
+                if total <= self.max_bytes:
+                    break
+                # Labels first, so nothing reads a half-removed result; open
+                # memory maps of the files stay valid
+                for name in ('labels', 'pca'):
+                    try:
+                        os.remove(self._path(result_id, name))
+                    except FileNotFoundError:
+                        pass
+                total -= nbytes
+
+    def stats(self):
+        entries = self._entries()
+        return {
+            'directory': self.directory,
+            'entries': len(entries),
+            'bytes': sum(entry[1] for entry in entries),
+            'max_bytes': self.max_bytes
+        }
+
+
+result_store = ResultStore(
+    directory=os.environ.get('RESULT_STORE_DIR') or None,
+    max_bytes=int(os.environ.get('RESULT_CACHE_MAX_MB', 128)) * 1024 * 1024
+)
+
+
+def store_points(labels, pca_data):
+    """Keep full-resolution points in the result store and return their id (None when too big to keep)"""
+    result_id = uuid.uuid4().hex
+    if not result_store.put(result_id, ClusteringPoints(labels, pca_data)):
+        return None
+    return result_id
+
+
+def sample_quotas(sizes, max_points, min_per_cluster=MIN_POINTS_PER_CLUSTER):
+    """Points to keep per cluster, max_points in total
+
+    Every cluster first gets min_per_cluster points (or all of its own),
+    so small clusters stay visible; the rest of the budget is split in
+    proportion to the remaining rows (largest remainder rounding).
+    """
+    sizes = np.asarray(sizes, dtype=np.int64)
+    if sizes.sum() <= max_points:
+        return sizes
+    floor = np.minimum(sizes, min_per_cluster)
+    if floor.sum() >= max_points:
+        # More clusters than the budget has floors for: purely proportional
+        floor = np.zeros_like(sizes)
+    remaining = max_points - floor.sum()
+    share = (sizes - floor) * (remaining / (sizes - floor).sum())
+    quotas = floor + np.floor(share).astype(np.int64)
+    quotas[np.argsort(np.floor(share) - share, kind='stable')[:max_points - quotas.sum()]] += 1
+    return quotas
+
+
+def stratified_sample(labels, n_clusters, max_points, seed=0):
+    """Sorted row indices of a per-cluster random sample of at most max_points rows
+
+    Rows are shuffled once and sorted by cluster, so every cluster's
+    sample is the first quota rows of its run; no per-cluster loop.
+    """
+    labels = np.asarray(labels)
+    sizes = np.bincount(labels, minlength=n_clusters)
+    quotas = sample_quotas(sizes, max_points)
+
+    rng = np.random.default_rng(seed)
+    order = np.lexsort((rng.random(len(labels)), labels))
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    sorted_labels = labels[order]
+    rank = np.arange(len(labels)) - starts[sorted_labels]
+    return np.sort(order[rank < quotas[sorted_labels]])
+
+
+def density_grids(points, labels, n_clusters, bins=DEFAULT_DENSITY_BINS):
+    """Per-cluster 2-D histograms of the PCA points on one shared grid
+
+    Returns (x_edges, y_edges, counts) with counts of shape
+    (n_clusters, bins, bins), indexed [cluster, x bin, y bin], from a
+    single bincount over combined cluster/cell indices.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    edges = []
+    cells = []
+    for axis in range(2):
+        values = points[:, axis]
+        low, high = (float(values.min()), float(values.max())) if len(values) else (0.0, 1.0)
+        if high <= low:
+            high = low + 1.0
+        edges.append(np.linspace(low, high, bins + 1))
+        cells.append(np.clip(((values - low) / (high - low) * bins).astype(np.int64), 0, bins - 1))
+
+    flat = (np.asarray(labels, dtype=np.int64) * bins + cells[0]) * bins + cells[1]
+    counts = np.bincount(flat, minlength=n_clusters * bins * bins).reshape(n_clusters, bins, bins)
+    return edges[0], edges[1], counts.astype(np.int32)
@@ -0,0 +1,327 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import g, request
+
+
+# Latency buckets in seconds and size buckets for rows/columns/bytes
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+COUNT_BUCKETS = (10, 100, 1000, 10000, 100000, 1000000, 10000000)
+BYTE_BUCKETS = (1 << 10, 1 << 16, 1 << 20, 1 << 23, 1 << 26, 1 << 28, 1 << 30, 1 << 32)
+
+PHASES = ('decode', 'parse', 'compute', 'serialize')
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """In-process metric store rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._gauges = {}
+        self._help = {}
+
+    def observe(self, name, value, buckets, help_text, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._help.setdefault(name, ('histogram', help_text))
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def inc(self, name, help_text, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._help.setdefault(name, ('counter', help_text))
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def set_max(self, name, value, help_text, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._help.setdefault(name, ('gauge', help_text))
+            self._gauges[key] = max(self._gauges.get(key, value), value)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for name in sorted(self._help):
+                kind, help_text = self._help[name]
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                if kind == 'histogram':
+                    for (metric, labels), histogram in sorted(self._histograms.items()):
+                        if metric != name:
+                            continue
+                        cumulative = 0
+                        for bound, count in zip(histogram.buckets, histogram.counts):
+                            cumulative += count
+                            lines.append(f'{name}_bucket{_labels(labels, le=_number(bound))} {cumulative}')
+                        lines.append(f'{name}_bucket{_labels(labels, le="+Inf")} {histogram.count}')
+                        lines.append(f'{name}_sum{_labels(labels)} {_number(histogram.sum)}')
+                        lines.append(f'{name}_count{_labels(labels)} {histogram.count}')
+                else:
+                    store = self._counters if kind == 'counter' else self._gauges
+                    for (metric, labels), value in sorted(store.items()):
+                        if metric == name:
+                            lines.append(f'{name}{_labels(labels)} {_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels, **extra):
+    items = list(labels) + list(extra.items())
+    if not items:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in items) + '}'
+
+
+registry = MetricsRegistry()
+
+
+# ---- per-request phase timing ----
+
+_local = threading.local()
+
+
+class RequestTimings:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases = {}
+        self.input = None
+        self.rss_start = None
+        self.rss_peak = None
+        self._children = [0.0]
+
+    def total(self):
+        return time.perf_counter() - self.start
+
+
+@contextmanager
+def phase(name):
+    """Time a phase of the current request; nested phases are excluded from their parent.
+
+    Does nothing outside an instrumented request (e.g. in job workers).
+    """
+    timings = getattr(_local, 'timings', None)
+    if timings is None:
+        yield
+        return
+
+    timings._children.append(0.0)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        children = timings._children.pop()
+        timings._children[-1] += elapsed
+        timings.phases[name] = timings.phases.get(name, 0.0) + elapsed - children
+
+
+def record_input(rows, columns, nbytes):
+    """Attach the size of the dataset being analysed to the current request"""
+    timings = getattr(_local, 'timings', None)
+    if timings is not None:
+        timings.input = (rows, columns, nbytes)
+
+
+def current_rss():
+    """Resident set size of this process in bytes, or None where /proc is not available"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class RssSampler:
+    """Polls this process's RSS while requests run and raises each running request's peak.
+
+    One daemon thread serves every in-flight request and only runs while
+    there are some. The process RSS is shared, so concurrent requests
+    each see the others' memory too; a request that ran alone reports
+    only its own. Without /proc nothing is tracked.
+    """
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self._active = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._thread = None
+
+    def start(self, timings):
+        rss = current_rss()
+        if rss is None:
+            return
+        timings.rss_start = timings.rss_peak = rss
+        with self._lock:
+            self._active.add(timings)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._wake.notify()
+
+    def stop(self, timings):
+        with self._lock:
+            self._active.discard(timings)
+        self._sample([timings])
+
+    def _sample(self, active):
+        rss = current_rss()
+        if rss is None:
+            return
+        for timings in active:
+            if timings.rss_peak is not None:
+                timings.rss_peak = max(timings.rss_peak, rss)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._active:
+                    self._wake.wait()
+                active = list(self._active)
+            self._sample(active)
+            time.sleep(self.interval)
+
+
+rss_sampler = RssSampler()
+
+
+# ---- opt-in sampling profiler ----
+
+class SamplingProfiler:
+    """Samples one thread's Python stack at a fixed interval into folded stacks.
+
+    The output (one 'frame;frame;frame count' line per stack) can be fed to
+    flamegraph.pl or opened in speedscope.
+    """
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})')
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f'{stack} {count}\n')
+
+
+def init_app(app):
+    """Install per-request timing, the Server-Timing header and the opt-in profiler on an app"""
+    app.config.setdefault('PROFILING_ENABLED', False)
+    app.config.setdefault('PROFILE_FOLDER', 'profiles')
+
+    @app.before_request
+    def start_timing():
+        _local.timings = RequestTimings()
+        rss_sampler.start(_local.timings)
+        g.profiler = None
+        if app.config['PROFILING_ENABLED'] and (request.headers.get('X-Profile') == '1' or request.args.get('profile') == '1'):
+            g.profiler = SamplingProfiler(threading.get_ident())
+            g.profiler.start()
+
+    @app.after_request
+    def finish_timing(response):
+        timings = getattr(_local, 'timings', None)
+        if timings is None:
+            return response
+        _local.timings = None
+        rss_sampler.stop(timings)
+
+        endpoint = request.endpoint or 'unknown'
+        total = timings.total()
+        registry.observe('analysis_request_duration_seconds', total, LATENCY_BUCKETS,
+                         'Request latency', endpoint=endpoint)
+        registry.inc('analysis_requests_total', 'Requests handled',
+                     endpoint=endpoint, status=response.status_code)
+
+        for name, seconds in timings.phases.items():
+            registry.observe('analysis_phase_duration_seconds', seconds, LATENCY_BUCKETS,
+                             'Time spent per request phase', endpoint=endpoint, phase=name)
+
+        if timings.input is not None:
+            rows, columns, nbytes = timings.input
+            registry.observe('analysis_input_rows', rows, COUNT_BUCKETS, 'Dataset rows per request', endpoint=endpoint)
+            registry.observe('analysis_input_columns', columns, COUNT_BUCKETS, 'Dataset columns per request', endpoint=endpoint)
+            registry.observe('analysis_input_bytes', nbytes, BYTE_BUCKETS, 'Parsed dataset size per request', endpoint=endpoint)
+
+        if timings.rss_peak is not None:
+            # Peaks sampled while this request ran, not the process high-water mark
+            registry.set_max('analysis_peak_rss_bytes', timings.rss_peak, 'Highest RSS sampled during requests', endpoint=endpoint)
+            registry.observe('analysis_rss_growth_bytes', timings.rss_peak - timings.rss_start, BYTE_BUCKETS,
+                             'Peak RSS sampled during a request above its RSS at start', endpoint=endpoint)
+
+        entries = [f'{name};dur={timings.phases[name] * 1000:.2f}' for name in PHASES if name in timings.phases]
+        entries.append(f'total;dur={total * 1000:.2f}')
+        response.headers['Server-Timing'] = ', '.join(entries)
+
+        profiler = g.get('profiler')
+        if profiler is not None:
+            profiler.stop()
+            os.makedirs(app.config['PROFILE_FOLDER'], exist_ok=True)
+            path = os.path.join(app.config['PROFILE_FOLDER'], f'{endpoint}-{int(time.time() * 1000)}.folded')
+            profiler.write(path)
+            # The file name only: the server's paths stay private
+            response.headers['X-Profile-File'] = os.path.basename(path)
+        return response
+
+    @app.teardown_request
+    def clear_timing(exc):
+        timings = getattr(_local, 'timings', None)
+        if timings is not None:
+            # after_request didn't run (an unhandled error)
+            rss_sampler.stop(timings)
+        _local.timings = None
@@ -1,9 +1,139 @@
-from flask import Blueprint, request, jsonify
-from app.analysis import AnalysisService
+from flask import Blueprint, Response, current_app, request, jsonify
+from app.analysis import AnalysisService, DEFAULT_CHUNK_SIZE
+from app.cache import dataset_cache
+from app.columnar import COLUMNAR_MIMETYPES
+from app.encoding import encoded_response, layout_for, negotiate
+from app.jobs import JobManager, QueueFullError
+from app.lod import DEFAULT_DENSITY_BINS, DEFAULT_MAX_POINTS, MAX_PAGE_SIZE, result_store
+from app import warmup
+from app.metrics import phase, registry
+from app.shared_store import shared_store
+from app.uploads import DecompressedTooLarge, decoded_stream, split_compression, spool_body
+from app.variants import DEFAULT_REGION_LIMIT, DEFAULT_WINDOWS
+from werkzeug.exceptions import HTTPException
+import json
+import os
 import traceback
 
 bp = Blueprint('api', __name__)
 analysis_service = AnalysisService()
+job_manager = None
+
+def _get_job_manager():
+    """Create the background job manager on first use from the app config"""
+    global job_manager
+    if job_manager is None:
+        config = current_app.config
+        job_manager = JobManager(
+            config['JOB_FOLDER'],
+            max_workers=config['JOB_MAX_WORKERS'],
+            max_queue=config['JOB_MAX_QUEUE'],
+            timeout=config['JOB_TIMEOUT'],
+            result_ttl=config['JOB_RESULT_TTL']
+        )
+    return job_manager
+
+# Raw (non-JSON) text bodies and the file name assumed when none is given
+TEXT_MIMETYPES = {
+    'text/csv': 'dataset.csv',
+    'text/tab-separated-values': 'dataset.tsv',
+    'text/plain': 'dataset.txt',
+    'application/gzip': 'dataset.csv.gz',
+    'application/x-gzip': 'dataset.csv.gz',
+    'application/zstd': 'dataset.csv.zst',
+    'application/octet-stream': 'dataset.csv',
+}
+
+def _decoded_params(items):
+    """Query string or form fields, JSON-decoded when possible (e.g. ?nClusters=3)"""
+    params = {}
+    for key, value in items:
+        try:
+            params[key] = json.loads(value)
+        except ValueError:
+            params[key] = value
+    return params
+
+def _content_encodings():
+    encoding = request.headers.get('Content-Encoding', '')
+    return [part.strip().lower() for part in encoding.split(',') if part.strip()]
+
+def _spool_upload(stream, file_name, encodings):
+    """Decode an uploaded table into a SpooledBody; a .gz/.zst name adds that encoding"""
+    file_name, compression = split_compression(file_name)
+    body = spool_body(stream, current_app.config['MAX_DECOMPRESSED_LENGTH'], encodings + [compression])
+    return body, file_name
+
+def _request_payload():
+    """Return (params, file_content, file_name) for a JSON, multipart or raw-body request
+    
+    JSON bodies carry everything in the body. Multipart uploads send the
+    table as a 'file' part with the parameters as other form fields. Raw
+    CSV/TSV and Parquet/Arrow bodies take their parameters from the query
+    string. Form and query values are JSON-decoded when possible.
+    
+    Bodies may be gzip- or zstd-compressed (Content-Encoding, or a .gz/.zst
+    file name). MAX_CONTENT_LENGTH applies to the compressed bytes and
+    MAX_DECOMPRESSED_LENGTH to what they expand to. Uploaded tables are
+    decoded straight from the request stream into a spooled temp file
+    instead of one large string.
+    """
+    encodings = _content_encodings()
+    
+    if request.mimetype == 'multipart/form-data':
+        with phase('decode'):
+            params = _decoded_params(request.form.items(multi=False))
+            upload = request.files.get('file')
+            if upload is None:
+                return params, None, params.get('fileName')
+            file_name = str(params.get('fileName') or upload.filename or 'dataset.csv')
+            body, file_name = _spool_upload(upload.stream, file_name, [])
+        return params, body, file_name
+    
+    fmt = COLUMNAR_MIMETYPES.get(request.mimetype)
+    default_name = TEXT_MIMETYPES.get(request.mimetype)
+    if fmt is None and default_name is None:
+        with phase('decode'):
+            if encodings:
+                raw = decoded_stream(request.stream, current_app.config['MAX_DECOMPRESSED_LENGTH'], encodings).read()
+                data = json.loads(raw)
+            else:
+                data = request.get_json()
+        return data, data.get('fileContent'), data.get('fileName')
+    
+    params = _decoded_params(request.args.items())
+    
+    if default_name is not None:
+        file_name = str(params.get('fileName') or default_name)
+        if request.mimetype in ('application/gzip', 'application/x-gzip') and not split_compression(file_name)[1]:
+            file_name += '.gz'
+        elif request.mimetype == 'application/zstd' and not split_compression(file_name)[1]:
+            file_name += '.zst'
+        with phase('decode'):
+            body, file_name = _spool_upload(request.stream, file_name, encodings)
+        return params, body, file_name
+    
+    # The body format decides how the content is parsed, whatever the name says
+    base_name = os.path.splitext(str(params.get('fileName') or 'dataset'))[0]
+    file_name = base_name + ('.parquet' if fmt == 'parquet' else '.arrow')
+    with phase('decode'):
+        if encodings:
+            body, _ = _spool_upload(request.stream, file_name, encodings)
+        else:
+            body = request.get_data()
+    return params, body, file_name
+
+def _analysis_response(results, message, encoding, data):
+    """Success response in the negotiated encoding
+    
+    Compact JSON, Arrow and msgpack write float arrays as float64 unless the
+    request asks for precision 'float32'.
+    """
+    return encoded_response({
+        'success': True,
+        'data': results,
+        'message': message
+    }, encoding, data.get('precision', 'float64'))
 
 @bp.route('/')  
 def root():
@@ -13,27 +143,50 @@ def root():
         'message': 'Bioinformatics Python Analysis Service',
         'version': '1.0.0',
         'status': 'online',
-        'endpoints': ['/health', '/stats', '/correlation', '/differential', '/clustering']
+        'endpoints': ['/health', '/health/ready', '/stats', '/correlation', '/differential', '/clustering', '/clustering/points/<result_id>', '/clustering/sweep', '/variants/region', '/variants/density', '/variants/aggregate', '/batch', '/convert', '/jobs', '/metrics']
     })
 
 
 @bp.route('/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
+    """Health check endpoint (liveness: 200 whether or not warm-up has finished)"""
     return jsonify({
         'success': True,
         'message': 'Python analysis service is running',
-        'service': 'bioinformatics-python-service'
+        'service': 'bioinformatics-python-service',
+        'ready': warmup.is_ready(),
+        'warmup': warmup.status(),
+        'cache': dataset_cache.stats(),
+        'result_store': result_store.stats(),
+        'shared_store': shared_store.stats() if shared_store is not None else None
     })
 
+@bp.route('/health/ready', methods=['GET'])
+def readiness_check():
+    """Readiness check: 503 until the process has finished warming up"""
+    ready = warmup.is_ready()
+    return jsonify({
+        'success': ready,
+        'message': 'Python analysis service is ready' if ready else 'Python analysis service is warming up',
+        'ready': ready
+    }), 200 if ready else 503
+
+@bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Request latency, phase timing, input size and memory metrics in Prometheus format"""
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
 @bp.route('/stats', methods=['POST'])
 def basic_stats():
     """Calculate basic statistics for dataset"""
     try:
-        data = request.get_json()
-        file_content = data.get('fileContent')  # Changed from filePath
-        file_name = data.get('fileName')        # Added fileName
+        encoding = negotiate(request.accept_mimetypes)
+        data, file_content, file_name = _request_payload()
         columns = data.get('columns', [])
+        streaming = data.get('streaming', False)
+        chunk_size = data.get('chunkSize', DEFAULT_CHUNK_SIZE)
+        sparse = data.get('sparse', False)
+        transpose = data.get('transpose', False)
         
         if not file_content or not file_name:
             return jsonify({
@@ -42,14 +195,19 @@ def basic_stats():
             }), 400
         
         # Perform statistical analysis using file content
-        results = analysis_service.calculate_basic_stats(file_content, file_name, columns)
+        with phase('compute'):
+            results = analysis_service.calculate_basic_stats(
+                file_content, file_name, columns, streaming=streaming, chunk_size=chunk_size,
+                sparse=sparse, transpose=transpose, layout=layout_for(encoding)
+            )
         
-        return jsonify({
-            'success': True,
-            'data': results,
-            'message': 'Statistical analysis completed successfully'
-        })
+        with phase('serialize'):
+            response = _analysis_response(results, 'Statistical analysis completed successfully', encoding, data)
+        return response
         
+    except HTTPException:
+        # 413/415 from the upload decoder keep their status
+        raise
     except Exception as e:
         print(f"Error in basic_stats: {str(e)}")
         print(traceback.format_exc())
@@ -62,10 +220,16 @@ def basic_stats():
 def correlation_analysis():
     """Calculate correlation matrix"""
     try:
-        data = request.get_json()
-        file_content = data.get('fileContent')  # Changed from filePath
-        file_name = data.get('fileName')        # Added fileName
+        encoding = negotiate(request.accept_mimetypes)
+        data, file_content, file_name = _request_payload()
         method = data.get('method', 'pearson')
+        streaming = data.get('streaming', False)
+        chunk_size = data.get('chunkSize', DEFAULT_CHUNK_SIZE)
+        threshold = data.get('threshold')
+        top_k = data.get('topK')
+        dtype = data.get('dtype', 'float64')
+        sparse = data.get('sparse', False)
+        transpose = data.get('transpose', False)
         
         if not file_content or not file_name:
             return jsonify({
@@ -74,14 +238,20 @@ def correlation_analysis():
             }), 400
         
         # Perform correlation analysis using file content
-        results = analysis_service.calculate_correlation(file_content, file_name, method)
+        with phase('compute'):
+            results = analysis_service.calculate_correlation(
+                file_content, file_name, method, streaming=streaming, chunk_size=chunk_size,
+                threshold=threshold, top_k=top_k, dtype=dtype, sparse=sparse, transpose=transpose,
+                layout=layout_for(encoding)
+            )
         
-        return jsonify({
-            'success': True,
-            'data': results,
-            'message': 'Correlation analysis completed successfully'
-        })
+        with phase('serialize'):
+            response = _analysis_response(results, 'Correlation analysis completed successfully', encoding, data)
+        return response
         
+    except HTTPException:
+        # 413/415 from the upload decoder keep their status
+        raise
     except Exception as e:
         print(f"Error in correlation_analysis: {str(e)}")
         print(traceback.format_exc())
@@ -94,30 +264,43 @@ def correlation_analysis():
 def differential_analysis():
     """Perform differential expression analysis"""
     try:
-        data = request.get_json()
-        file_content = data.get('fileContent')  # Changed from filePath
-        file_name = data.get('fileName')        # Added fileName
+        encoding = negotiate(request.accept_mimetypes)
+        data, file_content, file_name = _request_payload()
         condition1 = data.get('condition1')
         condition2 = data.get('condition2')
         p_value_threshold = data.get('pValueThreshold', 0.05)
+        equal_var = data.get('equalVar', True)
+        top_n = data.get('topN', 50)
+        permutation = data.get('permutation', False)
+        max_permutations = data.get('maxPermutations', 10000)
+        seed = data.get('seed', 0)
+        # Multi-group mode: a list of conditions, or neither condition1 nor condition2 for all of them
+        groups = data.get('conditions')
+        multigroup = groups is not None or not (condition1 or condition2)
         
-        if not all([file_content, file_name, condition1, condition2]):
+        if not all([file_content, file_name]) or not (multigroup or all([condition1, condition2])):
             return jsonify({
                 'success': False,
-                'message': 'File content, file name, condition1, and condition2 are required'
+                'message': 'File content, file name, condition1, and condition2 (or conditions) are required'
             }), 400
         
         # Perform differential analysis using file content
-        results = analysis_service.differential_analysis(
-            file_content, file_name, condition1, condition2, p_value_threshold
-        )
+        with phase('compute'):
+            results = analysis_service.differential_analysis(
+                file_content, file_name, condition1, condition2, p_value_threshold,
+                equal_var=equal_var, top_n=top_n, permutation=permutation,
+                max_permutations=max_permutations, seed=seed,
+                condition_column=data.get('conditionColumn'), groups=groups,
+                contrasts=data.get('contrasts', 'all_pairs'), layout=layout_for(encoding)
+            )
         
-        return jsonify({
-            'success': True,
-            'data': results,
-            'message': 'Differential analysis completed successfully'
-        })
+        with phase('serialize'):
+            response = _analysis_response(results, 'Differential analysis completed successfully', encoding, data)
+        return response
         
+    except HTTPException:
+        # 413/415 from the upload decoder keep their status
+        raise
     except Exception as e:
         print(f"Error in differential_analysis: {str(e)}")
         print(traceback.format_exc())
@@ -130,11 +313,20 @@ def differential_analysis():
 def clustering_analysis():
     """Perform clustering analysis"""
     try:
-        data = request.get_json()
-        file_content = data.get('fileContent')  # Changed from filePath
-        file_name = data.get('fileName')        # Added fileName
+        encoding = negotiate(request.accept_mimetypes)
+        data, file_content, file_name = _request_payload()
         n_clusters = data.get('nClusters', 3)
         method = data.get('method', 'kmeans')
+        algorithm = data.get('algorithm', 'auto')
+        batch_size = data.get('batchSize', 1024)
+        pca_solver = data.get('pcaSolver', 'auto')
+        linkage = data.get('linkage', 'average')
+        correlation_method = data.get('correlationMethod', 'pearson')
+        lod = data.get('lod')
+        max_points = data.get('maxPoints', DEFAULT_MAX_POINTS)
+        density_bins = data.get('densityBins', DEFAULT_DENSITY_BINS)
+        sparse = data.get('sparse', False)
+        transpose = data.get('transpose', False)
         
         if not file_content or not file_name:
             return jsonify({
@@ -143,16 +335,466 @@ def clustering_analysis():
             }), 400
         
         # Perform clustering analysis using file content
-        results = analysis_service.clustering_analysis(file_content, file_name, n_clusters, method)
+        with phase('compute'):
+            results = analysis_service.clustering_analysis(
+                file_content, file_name, n_clusters, method,
+                algorithm=algorithm, batch_size=batch_size, pca_solver=pca_solver,
+                linkage=linkage, correlation_method=correlation_method,
+                lod=lod, max_points=max_points, density_bins=density_bins,
+                sparse=sparse, transpose=transpose, layout=layout_for(encoding)
+            )
+        
+        with phase('serialize'):
+            response = _analysis_response(results, 'Clustering analysis completed successfully', encoding, data)
+        return response
+        
+    except HTTPException:
+        # 413/415 from the upload decoder keep their status
+        raise
+    except Exception as e:
+        print(f"Error in clustering_analysis: {str(e)}")
+        print(traceback.format_exc())
+        return jsonify({
+            'success': False,
+            'message': f'Analysis failed: {str(e)}'
+        }), 500
+
+@bp.route('/clustering/points/<result_id>', methods=['GET'])
+def clustering_points(result_id):
+    """Page through the full-resolution labels and PCA points of a downsampled (lod) clustering result"""
+    try:
+        encoding = negotiate(request.accept_mimetypes)
+        data = _decoded_params(request.args.items())
+        
+        try:
+            with phase('compute'):
+                results = analysis_service.clustering_points_page(
+                    result_id, data.get('offset', 0), data.get('limit', MAX_PAGE_SIZE), layout=layout_for(encoding)
+                )
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+        if results is None:
+            return jsonify({
+                'success': False,
+                'message': 'Clustering result not found or expired. Run the clustering again'
+            }), 404
+        
+        with phase('serialize'):
+            response = _analysis_response(results, 'Clustering points retrieved successfully', encoding, data)
+        return response
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error in clustering_points: {str(e)}")
+        print(traceback.format_exc())
+        return jsonify({
+            'success': False,
+            'message': f'Request failed: {str(e)}'
+        }), 500
+
+@bp.route('/variants/region', methods=['POST'])
+def variant_region():
+    """Variants overlapping a genomic region, a page at a time"""
+    try:
+        encoding = negotiate(request.accept_mimetypes)
+        data, file_content, file_name = _request_payload()
+        chromosome = data.get('chromosome')
+        
+        if not all([file_content, file_name, chromosome]):
+            return jsonify({
+                'success': False,
+                'message': 'File content, file name, and chromosome are required'
+            }), 400
+        
+        with phase('compute'):
+            results = analysis_service.variant_region(
+                file_content, file_name, chromosome, data.get('start'), data.get('end'),
+                offset=data.get('offset', 0), limit=data.get('limit', DEFAULT_REGION_LIMIT),
+                layout=layout_for(encoding)
+            )
+        
+        with phase('serialize'):
+            response = _analysis_response(results, 'Region query completed successfully', encoding, data)
+        return response
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error in variant_region: {str(e)}")
+        print(traceback.format_exc())
+        return jsonify({
+            'success': False,
+            'message': f'Analysis failed: {str(e)}'
+        }), 500
+
+@bp.route('/variants/density', methods=['POST'])
+def variant_density():
+    """Windowed variant counts along a chromosome or region"""
+    try:
+        encoding = negotiate(request.accept_mimetypes)
+        data, file_content, file_name = _request_payload()
+        chromosome = data.get('chromosome')
+        
+        if not all([file_content, file_name, chromosome]):
+            return jsonify({
+                'success': False,
+                'message': 'File content, file name, and chromosome are required'
+            }), 400
+        
+        with phase('compute'):
+            results = analysis_service.variant_density(
+                file_content, file_name, chromosome, data.get('start'), data.get('end'),
+                windows=data.get('windows', DEFAULT_WINDOWS), group_by=data.get('groupBy'),
+                layout=layout_for(encoding)
+            )
+        
+        with phase('serialize'):
+            response = _analysis_response(results, 'Variant density completed successfully', encoding, data)
+        return response
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error in variant_density: {str(e)}")
+        print(traceback.format_exc())
+        return jsonify({
+            'success': False,
+            'message': f'Analysis failed: {str(e)}'
+        }), 500
+
+@bp.route('/variants/aggregate', methods=['POST'])
+def variant_aggregate():
+    """Variant counts and mean annotations per gene, clinical significance or other column"""
+    try:
+        encoding = negotiate(request.accept_mimetypes)
+        data, file_content, file_name = _request_payload()
+        
+        if not file_content or not file_name:
+            return jsonify({
+                'success': False,
+                'message': 'File content and file name are required'
+            }), 400
+        
+        with phase('compute'):
+            results = analysis_service.variant_aggregate(
+                file_content, file_name, data.get('groupBy', 'gene_name'),
+                chromosome=data.get('chromosome'), start=data.get('start'), end=data.get('end'),
+                split_by=data.get('splitBy'), top_n=data.get('topN'), layout=layout_for(encoding)
+            )
+        
+        with phase('serialize'):
+            response = _analysis_response(results, 'Variant aggregation completed successfully', encoding, data)
+        return response
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error in variant_aggregate: {str(e)}")
+        print(traceback.format_exc())
+        return jsonify({
+            'success': False,
+            'message': f'Analysis failed: {str(e)}'
+        }), 500
+
+@bp.route('/convert', methods=['POST'])
+def convert_dataset():
+    """Convert a dataset to Arrow IPC or Parquet once so later analyses skip CSV parsing"""
+    try:
+        data, file_content, file_name = _request_payload()
+        fmt = data.get('format', 'arrow')
+        
+        if not file_content or not file_name:
+            return jsonify({
+                'success': False,
+                'message': 'File content and file name are required'
+            }), 400
+        
+        if fmt not in ('arrow', 'parquet'):
+            return jsonify({
+                'success': False,
+                'message': "Unsupported format. Use 'arrow' or 'parquet'"
+            }), 400
+        
+        with phase('compute'):
+            content = analysis_service.convert_to_columnar(file_content, file_name, fmt)
+        mimetype = 'application/vnd.apache.parquet' if fmt == 'parquet' else 'application/vnd.apache.arrow.file'
+        return Response(content, mimetype=mimetype)
+        
+    except HTTPException:
+        # 413/415 from the upload decoder keep their status
+        raise
+    except Exception as e:
+        print(f"Error in convert_dataset: {str(e)}")
+        print(traceback.format_exc())
+        return jsonify({
+            'success': False,
+            'message': f'Conversion failed: {str(e)}'
+        }), 500
+
+def _sweep_kwargs(data):
+    return {
+        'k_min': data.get('kMin', 2),
+        'k_max': data.get('kMax', 10),
+        'algorithm': data.get('algorithm', 'auto'),
+        'batch_size': data.get('batchSize', 1024),
+        'silhouette_sample_size': data.get('silhouetteSampleSize', 5000)
+    }
+
+def _job_call(analysis, data):
+    """Map a job request to (AnalysisService method, args, kwargs) like the synchronous routes"""
+    if analysis == 'stats':
+        return 'calculate_basic_stats', [data.get('columns', [])], {
+            'streaming': data.get('streaming', False),
+            'chunk_size': data.get('chunkSize', DEFAULT_CHUNK_SIZE),
+            'sparse': data.get('sparse', False),
+            'transpose': data.get('transpose', False)
+        }
+    if analysis == 'correlation':
+        return 'calculate_correlation', [data.get('method', 'pearson')], {
+            'streaming': data.get('streaming', False),
+            'chunk_size': data.get('chunkSize', DEFAULT_CHUNK_SIZE),
+            'threshold': data.get('threshold'),
+            'top_k': data.get('topK'),
+            'dtype': data.get('dtype', 'float64'),
+            'sparse': data.get('sparse', False),
+            'transpose': data.get('transpose', False)
+        }
+    if analysis == 'differential':
+        multigroup = data.get('conditions') is not None or not (data.get('condition1') or data.get('condition2'))
+        if not multigroup and (not data.get('condition1') or not data.get('condition2')):
+            raise ValueError('condition1 and condition2 (or conditions) are required')
+        return 'differential_analysis', [
+            data.get('condition1'), data.get('condition2'), data.get('pValueThreshold', 0.05)
+        ], {
+            'equal_var': data.get('equalVar', True),
+            'top_n': data.get('topN', 50),
+            'permutation': data.get('permutation', False),
+            'max_permutations': data.get('maxPermutations', 10000),
+            'seed': data.get('seed', 0),
+            'condition_column': data.get('conditionColumn'),
+            'groups': data.get('conditions'),
+            'contrasts': data.get('contrasts', 'all_pairs')
+        }
+    if analysis == 'clustering':
+        return 'clustering_analysis', [data.get('nClusters', 3), data.get('method', 'kmeans')], {
+            'algorithm': data.get('algorithm', 'auto'),
+            'batch_size': data.get('batchSize', 1024),
+            'pca_solver': data.get('pcaSolver', 'auto'),
+            'linkage': data.get('linkage', 'average'),
+            'correlation_method': data.get('correlationMethod', 'pearson'),
+            'lod': data.get('lod'),
+            'max_points': data.get('maxPoints', DEFAULT_MAX_POINTS),
+            'density_bins': data.get('densityBins', DEFAULT_DENSITY_BINS),
+            'sparse': data.get('sparse', False),
+            'transpose': data.get('transpose', False)
+        }
+    if analysis == 'clustering_sweep':
+        return 'clustering_sweep', [], _sweep_kwargs(data)
+    raise ValueError("Unsupported analysis. Use 'stats', 'correlation', 'differential', 'clustering' or 'clustering_sweep'")
+
+@bp.route('/jobs', methods=['POST'])
+def submit_job():
+    """Queue an analysis to run in the background process pool"""
+    try:
+        data, file_content, file_name = _request_payload()
+        
+        if not file_content or not file_name:
+            return jsonify({
+                'success': False,
+                'message': 'File content and file name are required'
+            }), 400
+        
+        try:
+            method_name, args, kwargs = _job_call(data.get('analysis'), data)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+        
+        job_id = _get_job_manager().submit(
+            method_name, file_content, file_name, args, kwargs, timeout=data.get('timeout')
+        )
         
         return jsonify({
             'success': True,
-            'data': results,
-            'message': 'Clustering analysis completed successfully'
-        })
+            'data': {'job_id': job_id, 'status': 'queued'},
+            'message': 'Analysis job queued'
+        }), 202
         
+    except QueueFullError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 429
+    except HTTPException:
+        # 413/415 from the upload decoder keep their status
+        raise
     except Exception as e:
-        print(f"Error in clustering_analysis: {str(e)}")
+        print(f"Error in submit_job: {str(e)}")
+        print(traceback.format_exc())
+        return jsonify({
+            'success': False,
+            'message': f'Job submission failed: {str(e)}'
+        }), 500
+
+@bp.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Get the status and progress of a background job"""
+    status = _get_job_manager().status(job_id)
+    if status is None:
+        return jsonify({
+            'success': False,
+            'message': 'Job not found'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'data': status
+    })
+
+@bp.route('/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    """Fetch the result of a completed background job"""
+    manager = _get_job_manager()
+    status = manager.status(job_id)
+    if status is None:
+        return jsonify({
+            'success': False,
+            'message': 'Job not found'
+        }), 404
+    
+    if status['status'] in ('queued', 'running'):
+        return jsonify({
+            'success': False,
+            'data': status,
+            'message': 'Job has not finished yet'
+        }), 202
+    
+    if status['status'] != 'completed':
+        return jsonify({
+            'success': False,
+            'data': status,
+            'message': f"Job {status['status']}: {status.get('error', '')}".rstrip(': ')
+        }), 409
+    
+    return jsonify({
+        'success': True,
+        'data': manager.result(job_id),
+        'message': 'Analysis completed successfully'
+    })
+
+@bp.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a queued or running background job"""
+    status = _get_job_manager().cancel(job_id)
+    if status is None:
+        return jsonify({
+            'success': False,
+            'message': 'Job not found'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'data': status,
+        'message': 'Cancellation requested'
+    })
+
+@bp.route('/clustering/sweep', methods=['POST'])
+def clustering_sweep():
+    """Fit k-means over a range of k to help choose the number of clusters"""
+    try:
+        encoding = negotiate(request.accept_mimetypes)
+        data, file_content, file_name = _request_payload()
+        
+        if not file_content or not file_name:
+            return jsonify({
+                'success': False,
+                'message': 'File content and file name are required'
+            }), 400
+        
+        with phase('compute'):
+            results = analysis_service.clustering_sweep(
+                file_content, file_name, layout=layout_for(encoding), **_sweep_kwargs(data)
+            )
+        
+        with phase('serialize'):
+            response = _analysis_response(results, 'Clustering sweep completed successfully', encoding, data)
+        return response
+        
+    except HTTPException:
+        # 413/415 from the upload decoder keep their status
+        raise
+    except Exception as e:
+        print(f"Error in clustering_sweep: {str(e)}")
+        print(traceback.format_exc())
+        return jsonify({
+            'success': False,
+            'message': f'Analysis failed: {str(e)}'
+        }), 500
+
+def _batch_calls(data):
+    """Map the analyses of a batch request to (id, method, args, kwargs)
+    
+    Each entry takes the same fields as a job request, e.g.
+    {"analysis": "correlation", "method": "spearman"}, or just the analysis
+    name. Ids default to the analysis name.
+    """
+    analyses = data.get('analyses')
+    if not analyses or not isinstance(analyses, list):
+        raise ValueError('analyses must be a non-empty list')
+    
+    calls = []
+    for entry in analyses:
+        if isinstance(entry, str):
+            entry = {'analysis': entry}
+        analysis_id = str(entry.get('id') or entry.get('analysis'))
+        if any(analysis_id == call[0] for call in calls):
+            raise ValueError(f'Duplicate analysis id: {analysis_id}')
+        method_name, args, kwargs = _job_call(entry.get('analysis'), entry)
+        calls.append((analysis_id, method_name, args, kwargs))
+    return calls
+
+@bp.route('/batch', methods=['POST'])
+def batch_analysis():
+    """Run several analyses on one dataset with a single parse"""
+    try:
+        encoding = negotiate(request.accept_mimetypes)
+        data, file_content, file_name = _request_payload()
+        
+        if not file_content or not file_name:
+            return jsonify({
+                'success': False,
+                'message': 'File content and file name are required'
+            }), 400
+        
+        try:
+            calls = _batch_calls(data)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+        
+        for _, _, _, kwargs in calls:
+            kwargs['layout'] = layout_for(encoding)
+        
+        with phase('compute'):
+            results = analysis_service.run_batch(file_content, file_name, calls)
+        
+        with phase('serialize'):
+            response = _analysis_response(results, 'Batch analysis completed successfully', encoding, data)
+        return response
+        
+    except HTTPException:
+        # 413/415 from the upload decoder keep their status
+        raise
+    except Exception as e:
+        print(f"Error in batch_analysis: {str(e)}")
         print(traceback.format_exc())
         return jsonify({
             'success': False,
@@ -162,11 +804,29 @@ def clustering_analysis():
 # Error handlers
 @bp.errorhandler(413)
 def too_large(e):
+    if isinstance(e, DecompressedTooLarge):
+        message = f"Decompressed file too large. Maximum size is {current_app.config['MAX_DECOMPRESSED_LENGTH'] // (1024 * 1024)}MB."
+    else:
+        message = f"File too large. Maximum size is {current_app.config['MAX_CONTENT_LENGTH'] // (1024 * 1024)}MB (compressed)."
     return jsonify({
         'success': False,
-        'message': 'File too large. Maximum size is 50MB.'
+        'message': message
     }), 413
 
+@bp.errorhandler(415)
+def unsupported_encoding(e):
+    return jsonify({
+        'success': False,
+        'message': e.description
+    }), 415
+
+@bp.errorhandler(406)
+def not_acceptable(e):
+    return jsonify({
+        'success': False,
+        'message': e.description
+    }), 406
+
 @bp.errorhandler(500)
 def internal_error(e):
     return jsonify({
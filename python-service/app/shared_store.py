@@ -0,0 +1,243 @@
+import glob
+import json
+import os
+import tempfile
+import uuid
+import weakref
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from app.cache import ParsedDataset
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+def _default_directory():
+    # tmpfs keeps the mapped pages in RAM; fall back to the temp dir elsewhere
+    base = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return os.path.join(base, 'bioinformatics-datasets')
+
+
+class SharedDatasetStore:
+    """Parsed datasets in memory-mapped files that every worker process attaches to.
+
+    Each entry is three files named by the dataset key: the numeric matrix
+    as a .npy file, the other (e.g. id and condition) columns as an Arrow
+    IPC file and a JSON schema sidecar, written last so its presence
+    marks the entry complete. Attaching maps the matrix read-only, so all
+    workers share one copy of the pages and the DataFrame columns are
+    views into it.
+
+    Coordination uses flock, which the kernel releases when a process
+    dies: a per-key lock makes one worker parse while the others wait and
+    attach, and every attached dataset holds a shared lock on the key's
+    .ref file until it is garbage collected. Those shared locks are the
+    reference count: eviction (least recently attached first, to stay
+    within max_bytes) skips entries it cannot lock exclusively.
+    """
+
+    def __init__(self, directory=None, max_bytes=1024 * 1024 * 1024, min_bytes=0):
+        self.directory = directory or _default_directory()
+        self.max_bytes = int(max_bytes)
+        self.min_bytes = int(min_bytes)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key, suffix):
+        return os.path.join(self.directory, f'{key}.{suffix}')
+
+    @contextmanager
+    def _locked(self, path):
+        with open(path, 'a+b') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def get_or_load(self, key, loader):
+        """Attach to the stored dataset for key, or parse it with loader() once across processes"""
+        dataset = self.attach(key)
+        if dataset is not None:
+            return dataset
+
+        with self._locked(self._path(key, 'lock')):
+            # Another worker may have published it while we waited
+            dataset = self.attach(key)
+            if dataset is not None:
+                return dataset
+            dataset = loader()
+            if dataset.nbytes < self.min_bytes or not self.publish(key, dataset):
+                return dataset
+        return self.attach(key) or dataset
+
+    def attach(self, key):
+        """Return a ParsedDataset backed by the stored files, or None when key is not stored"""
+        sidecar = self._path(key, 'json')
+        if not os.path.exists(sidecar):
+            return None
+
+        ref = open(self._path(key, 'ref'), 'a+b')
+        fcntl.flock(ref, fcntl.LOCK_SH)
+        try:
+            # Re-read under the lock: an eviction may have removed the entry meanwhile
+            with open(sidecar) as f:
+                schema = json.load(f)
+            values = np.load(self._path(key, 'npy'), mmap_mode='r')
+            df = pd.DataFrame(values, columns=schema['numeric_cols'], copy=False)
+            if schema['other_cols']:
+                import pyarrow as pa
+                other = pa.ipc.open_file(pa.memory_map(self._path(key, 'arrow'))).read_all().to_pandas()
+                # Back in their original positions; inserting doesn't copy the numeric block
+                for name in schema['other_cols']:
+                    df.insert(schema['columns'].index(name), name, other[name].to_numpy())
+            for name in schema.get('int_cols', []):
+                # The matrix holds them as float64; the DataFrame keeps their parsed type (a copy)
+                df[name] = df[name].astype(np.int64)
+        except (FileNotFoundError, ValueError):
+            ref.close()
+            return None
+
+        dataset = ParsedDataset(df, schema['numeric_cols'], numeric_values=values)
+        weakref.finalize(dataset, ref.close)
+        os.utime(sidecar)
+        return dataset
+
+    def publish(self, key, dataset):
+        """Write a parsed dataset to the store; False when it can't be stored within max_bytes"""
+        df = dataset.df
+        numeric_cols = dataset.numeric_cols
+        columns = list(df.columns)
+        if len(set(columns)) != len(columns) or not all(isinstance(name, str) for name in columns):
+            # The sidecar is JSON and columns are looked up by name
+            return False
+
+        numeric = set(numeric_cols)
+        other_cols = [name for name in columns if name not in numeric]
+        nbytes = int(dataset.numeric_values.nbytes)
+        if other_cols:
+            nbytes += int(df[other_cols].memory_usage(deep=True, index=False).sum())
+        if nbytes > self.max_bytes:
+            return False
+
+        with self._locked(os.path.join(self.directory, 'store.lock')):
+            if not self._make_room(nbytes):
+                return False
+
+            tmp = f'.{os.getpid()}.{uuid.uuid4().hex}.tmp'
+            written = []
+            try:
+                with open(self._path(key, 'npy') + tmp, 'wb') as f:
+                    np.save(f, np.ascontiguousarray(dataset.numeric_values))
+                written.append('npy')
+                if other_cols:
+                    import pyarrow as pa
+                    table = pa.Table.from_pandas(df[other_cols], preserve_index=False)
+                    with pa.OSFile(self._path(key, 'arrow') + tmp, 'wb') as sink:
+                        with pa.ipc.new_file(sink, table.schema) as writer:
+                            writer.write_table(table)
+                    written.append('arrow')
+                schema = {
+                    'columns': columns,
+                    'numeric_cols': numeric_cols,
+                    'other_cols': other_cols,
+                    'int_cols': [name for name in numeric_cols if df[name].dtype.kind in 'iu'],
+                    'shape': list(dataset.numeric_values.shape),
+                    'dtype': dataset.numeric_values.dtype.str,
+                    'nbytes': nbytes
+                }
+                with open(self._path(key, 'json') + tmp, 'w') as f:
+                    json.dump(schema, f)
+                written.append('json')
+            except Exception:
+                for suffix in written + ['npy', 'arrow', 'json']:
+                    self._remove(self._path(key, suffix) + tmp)
+                raise
+
+            for suffix in written:
+                os.replace(self._path(key, suffix) + tmp, self._path(key, suffix))
+        return True
+
+    def _entries(self):
+        """(key, nbytes, last attached) of every stored dataset, least recently used first"""
+        entries = []
+        for sidecar in glob.glob(os.path.join(self.directory, '*.json')):
+            try:
+                with open(sidecar) as f:
+                    nbytes = json.load(f)['nbytes']
+                entries.append((os.path.basename(sidecar)[:-len('.json')], nbytes, os.path.getmtime(sidecar)))
+            except (OSError, ValueError, KeyError):
+                continue
+        entries.sort(key=lambda entry: entry[2])
+        return entries
+
+    def _make_room(self, nbytes):
+        # Called with the store lock held
+        entries = self._entries()
+        total = sum(entry[1] for entry in entries)
+        for key, size, _ in entries:
+            if total + nbytes <= self.max_bytes:
+                break
+            if self._evict(key):
+                total -= size
+        return total + nbytes <= self.max_bytes
+
+    def _evict(self, key):
+        """Remove an entry no process is attached to; False when it is in use"""
+        with open(self._path(key, 'ref'), 'a+b') as ref:
+            try:
+                fcntl.flock(ref, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False
+            # Sidecar first, so nothing attaches to a half-removed entry
+            for suffix in ('json', 'npy', 'arrow', 'ref', 'lock'):
+                self._remove(self._path(key, suffix))
+        return True
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def in_use(self, key):
+        """Whether any process is attached to key"""
+        with open(self._path(key, 'ref'), 'a+b') as ref:
+            try:
+                fcntl.flock(ref, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return True
+            fcntl.flock(ref, fcntl.LOCK_UN)
+            return False
+
+    def clear(self):
+        """Evict every entry not in use"""
+        with self._locked(os.path.join(self.directory, 'store.lock')):
+            for key, _, _ in self._entries():
+                self._evict(key)
+
+    def stats(self):
+        entries = self._entries()
+        return {
+            'directory': self.directory,
+            'entries': len(entries),
+            'bytes': sum(entry[1] for entry in entries),
+            'max_bytes': self.max_bytes,
+            'in_use': sum(self.in_use(key) for key, _, _ in entries)
+        }
+
+
+# Process-independent store, enabled with SHARED_DATASET_STORE=1 (gunicorn.conf.py does).
+# Its locking and reference counting need flock; without fcntl every
+# process keeps its own parsed datasets
+shared_store = None
+if os.environ.get('SHARED_DATASET_STORE', '0') == '1' and fcntl is not None:
+    shared_store = SharedDatasetStore(
+        directory=os.environ.get('SHARED_STORE_DIR') or None,
+        max_bytes=int(os.environ.get('SHARED_STORE_MAX_MB', 1024)) * 1024 * 1024,
+        min_bytes=int(os.environ.get('SHARED_STORE_MIN_MB', 1)) * 1024 * 1024
+    )
@@ -0,0 +1,323 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from app.stats_engine import QUANTILES
+
+
+class SparseDataset:
+    """A CSR matrix (rows = samples/cells, columns = features/genes) plus labels.
+
+    The sparse counterpart of ParsedDataset: entries are shared between
+    requests through the dataset cache and must be treated as read-only.
+    Memory is proportional to the number of nonzeros.
+    """
+
+    def __init__(self, matrix, row_names, feature_names):
+        matrix = sp.csr_matrix(matrix, dtype=np.float64)
+        matrix.sum_duplicates()
+        matrix.eliminate_zeros()
+        self.matrix = matrix
+        self.row_names = list(row_names)
+        self.numeric_cols = list(feature_names)
+        self._csc = None
+        self.nbytes = _matrix_nbytes(matrix)
+
+    @property
+    def shape(self):
+        return self.matrix.shape
+
+    @property
+    def csc(self):
+        """Column-major copy, built on first use (column statistics walk columns)"""
+        if self._csc is None:
+            csc = self.matrix.tocsc()
+            csc.sort_indices()
+            self._csc = csc
+        return self._csc
+
+
+def _matrix_nbytes(matrix):
+    return int(matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes)
+
+
+def read_matrix_market(source, transpose=False):
+    """Read a Matrix Market coordinate file into a SparseDataset.
+
+    Rows are samples and columns features unless ``transpose`` is set
+    (10x Genomics matrix.mtx files are genes x cells and need it).
+    """
+    import scipy.io
+
+    matrix = scipy.io.mmread(source)
+    if not sp.issparse(matrix):
+        matrix = sp.coo_matrix(matrix)
+    if transpose:
+        matrix = matrix.T
+    n_rows, n_cols = matrix.shape
+    return SparseDataset(matrix.tocsr(), [f'row_{i + 1}' for i in range(n_rows)],
+                         [f'feature_{j + 1}' for j in range(n_cols)])
+
+
+def read_triplets(source, sep=',', transpose=False):
+    """Read a (row, column, value) triplet table into a SparseDataset.
+
+    The first three columns are used, e.g. cell,gene,count with one line per
+    nonzero. Row and column labels may be names or indices; they are
+    sorted to give the matrix order. A header line is skipped when its
+    third field is not a number.
+    """
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    table = pd.read_csv(source, sep=sep, header=None, usecols=[0, 1, 2], dtype={0: str, 1: str}, skip_blank_lines=True)
+    if len(table) and pd.isna(pd.to_numeric(table.iloc[0, 2], errors='coerce')):
+        table = table.iloc[1:]
+
+    values = pd.to_numeric(table.iloc[:, 2], errors='coerce').to_numpy(dtype=np.float64)
+    if np.isnan(values).any():
+        raise ValueError("Triplet values must be numeric")
+    row_codes, row_names = pd.factorize(table.iloc[:, 0], sort=True)
+    col_codes, col_names = pd.factorize(table.iloc[:, 1], sort=True)
+    if transpose:
+        row_codes, col_codes, row_names, col_names = col_codes, row_codes, col_names, row_names
+
+    matrix = sp.coo_matrix((values, (row_codes, col_codes)), shape=(len(row_names), len(col_names)))
+    return SparseDataset(matrix.tocsr(), row_names.tolist(), col_names.tolist())
+
+
+def read_sparse(source, options, transpose=False):
+    """Parse a Matrix Market file ({'format': 'mtx'}) or a delimited triplet table"""
+    if options.get('format') == 'mtx':
+        return read_matrix_market(source, transpose)
+    return read_triplets(source, options.get('sep', ','), transpose)
+
+
+def _column_index(csc):
+    return np.repeat(np.arange(csc.shape[1]), np.diff(csc.indptr))
+
+
+def _implicit_zeros(csc):
+    """The matrix with stored zeros dropped, so every zero is an implicit one"""
+    if (csc.data == 0).any():
+        csc = csc.copy()
+        csc.eliminate_zeros()
+    return csc
+
+
+def sparse_column_statistics(csc):
+    """Summary statistics for every column of a sparse matrix, zeros included.
+
+    Returns the same dict of 1-D arrays as ``column_statistics``. Moments
+    are exact central moments from the nonzeros plus a zero term per
+    column; quantiles come from one sort of the nonzeros, with the zeros
+    of each column slotted between its negative and positive values.
+    """
+    csc = _implicit_zeros(csc)
+    n_rows, n_cols = csc.shape
+    nnz = np.diff(csc.indptr)
+    zeros = n_rows - nnz
+    cols = _column_index(csc)
+    n = float(n_rows)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.bincount(cols, weights=csc.data, minlength=n_cols) / n
+        centered = csc.data - mean[cols]
+        squared = centered * centered
+
+        # Sum of (x - mean)^k over nonzeros plus the zeros' (0 - mean)^k
+        m2 = (np.bincount(cols, weights=squared, minlength=n_cols) + zeros * mean ** 2) / n
+        m3 = (np.bincount(cols, weights=squared * centered, minlength=n_cols) - zeros * mean ** 3) / n
+        m4 = (np.bincount(cols, weights=squared * squared, minlength=n_cols) + zeros * mean ** 4) / n
+
+        std = np.sqrt(m2 * n / (n - 1))
+        constant = m2 <= (np.finfo(np.float64).resolution * mean) ** 2
+        skewness = np.where(constant, np.nan, m3 / m2 ** 1.5)
+        kurtosis = np.where(constant, np.nan, m4 / (m2 * m2) - 3.0)
+    del centered, squared
+
+    stats = {
+        'count': np.full(n_cols, n_rows, dtype=np.int64),
+        'missing': np.zeros(n_cols, dtype=np.int64),
+        'mean': mean,
+        'std': std,
+        'skewness': skewness,
+        'kurtosis': kurtosis
+    }
+
+    # Sort values within each column (columns stay grouped)
+    order = np.lexsort((csc.data, cols))
+    sorted_values = csc.data[order]
+    negatives = np.bincount(cols, weights=(csc.data < 0), minlength=n_cols).astype(np.int64)
+
+    def order_statistic(k):
+        # k-th smallest per column: negatives, then the zeros, then positives
+        in_zeros = (k >= negatives) & (k < negatives + zeros)
+        offset = np.where(k < negatives, k, k - zeros)
+        index = np.clip(csc.indptr[:-1] + offset, 0, max(len(sorted_values) - 1, 0))
+        picked = sorted_values[index] if len(sorted_values) else np.zeros(n_cols)
+        return np.where(in_zeros, 0.0, picked)
+
+    stats['min'] = order_statistic(np.zeros(n_cols, dtype=np.int64))
+    stats['max'] = order_statistic(np.full(n_cols, n_rows - 1, dtype=np.int64))
+    for name, q in zip(('q25', 'median', 'q75'), QUANTILES):
+        position = q * (n_rows - 1)
+        lo, hi = int(np.floor(position)), int(np.ceil(position))
+        low = order_statistic(np.full(n_cols, lo, dtype=np.int64))
+        high = order_statistic(np.full(n_cols, hi, dtype=np.int64))
+        stats[name] = low + (high - low) * (position - lo)
+
+    if n_rows == 0:
+        for name in ('min', 'max', 'q25', 'median', 'q75'):
+            stats[name] = np.full(n_cols, np.nan)
+    return stats
+
+
+def sparse_rank_columns(csc):
+    """Average ranks of each column, shifted so that zeros keep rank 0.
+
+    Every zero of a column shares one average rank; subtracting it keeps
+    the matrix sparse and leaves Pearson correlation of the ranks, i.e.
+    Spearman correlation, unchanged.
+    """
+    csc = _implicit_zeros(csc)
+    n_rows, n_cols = csc.shape
+    nnz = np.diff(csc.indptr)
+    zeros = n_rows - nnz
+    cols = _column_index(csc)
+    negatives = np.bincount(cols, weights=(csc.data < 0), minlength=n_cols).astype(np.int64)
+
+    order = np.lexsort((csc.data, cols))
+    sorted_values = csc.data[order]
+    sorted_cols = cols[order]
+    # 0-based position of each nonzero within its column's sorted nonzeros
+    position = np.arange(len(order)) - csc.indptr[:-1][sorted_cols]
+    # Its rank among all values of the column, zeros included (1-based)
+    rank = position + 1 + np.where(position >= negatives[sorted_cols], zeros[sorted_cols], 0)
+
+    # Ties get the average rank of their run
+    new_run = np.ones(len(order), dtype=bool)
+    new_run[1:] = (sorted_values[1:] != sorted_values[:-1]) | (sorted_cols[1:] != sorted_cols[:-1])
+    run_id = np.cumsum(new_run) - 1
+    run_first = np.minimum.reduceat(rank, np.flatnonzero(new_run)) if len(rank) else rank
+    run_last = np.maximum.reduceat(rank, np.flatnonzero(new_run)) if len(rank) else rank
+    average = (run_first[run_id] + run_last[run_id]) / 2.0
+
+    zero_rank = negatives + (zeros + 1) / 2.0
+    ranked = np.empty(len(order))
+    ranked[order] = average - zero_rank[sorted_cols]
+    return sp.csc_matrix((ranked, csc.indices.copy(), csc.indptr.copy()), shape=csc.shape)
+
+
+def iter_sparse_correlation_tiles(csc, method='pearson', dtype=np.float64, block_size=1024):
+    """Yield (row_start, col_start, tile) like ``iter_correlation_tiles`` for a sparse matrix.
+
+    Each tile is X[:, I]ᵀ X[:, J] as a sparse product, corrected for the
+    column means afterwards, so the matrix is never centered (densified).
+    """
+    if method == 'spearman':
+        csc = sparse_rank_columns(csc)
+    elif method != 'pearson':
+        raise ValueError("Unsupported correlation method. Use 'pearson' or 'spearman'")
+
+    n_rows, n_cols = csc.shape
+    sums = np.asarray(csc.sum(axis=0)).ravel()
+    mean = sums / n_rows
+    squares = np.asarray(csc.multiply(csc).sum(axis=0)).ravel()
+    norms = np.sqrt(np.maximum(squares - n_rows * mean * mean, 0.0))
+    transposed = csc.T.tocsr()
+
+    for i0 in range(0, n_cols, block_size):
+        rows = slice(i0, i0 + block_size)
+        left = transposed[rows]
+        for j0 in range(i0, n_cols, block_size):
+            cols = slice(j0, j0 + block_size)
+            cross = (left @ csc[:, cols]).toarray()
+            with np.errstate(invalid='ignore', divide='ignore'):
+                tile = (cross - n_rows * np.outer(mean[rows], mean[cols])) / np.outer(norms[rows], norms[cols])
+            tile[(norms[rows] == 0)[:, None] | (norms[cols] == 0)[None, :]] = np.nan
+            tile = tile.astype(dtype, copy=False)
+            yield i0, j0, np.clip(tile, -1.0, 1.0, out=tile)
+
+
+def column_scale(csc):
+    """(mean, scale) per column like StandardScaler: scale is the ddof=0 std, 1 for constant columns"""
+    n_rows = csc.shape[0]
+    mean = np.asarray(csc.sum(axis=0)).ravel() / n_rows
+    squares = np.asarray(csc.multiply(csc).sum(axis=0)).ravel()
+    var = np.maximum(squares / n_rows - mean * mean, 0.0)
+    scale = np.sqrt(var)
+    scale[scale < 10 * np.finfo(np.float64).eps * np.maximum(np.abs(mean), 1.0)] = 1.0
+    return mean, scale
+
+
+def scale_columns(matrix, scale):
+    """matrix / scale per column, staying sparse (no centering)"""
+    return sp.csr_matrix(matrix @ sp.diags(1.0 / scale))
+
+
+def sparse_pca(matrix, mean, scale, n_components=2, seed=42):
+    """PCA of the standardized matrix without densifying it.
+
+    The centered, scaled matrix A = (X - 1 meanᵀ) / scale is only applied
+    through a LinearOperator, so svds works on the sparse X directly.
+    Returns (projections, explained variance ratio).
+    """
+    from scipy.sparse.linalg import LinearOperator, svds
+
+    matrix = sp.csr_matrix(matrix)
+    n_rows, n_cols = matrix.shape
+    inv_scale = 1.0 / scale
+    shift = mean * inv_scale
+    matrix_t = matrix.T.tocsr()
+
+    def matvec(v):
+        v = np.ravel(v)
+        return matrix @ (inv_scale * v) - shift @ v
+
+    def rmatvec(u):
+        u = np.ravel(u)
+        return inv_scale * (matrix_t @ u) - shift * u.sum()
+
+    def matmat(v):
+        return matrix @ (inv_scale[:, None] * v) - np.outer(np.ones(n_rows), shift @ v)
+
+    operator = LinearOperator((n_rows, n_cols), matvec=matvec, rmatvec=rmatvec, matmat=matmat, dtype=np.float64)
+
+    n_components = min(n_components, n_rows, n_cols)
+    if min(n_rows, n_cols) <= n_components:
+        # svds needs k < min(shape); a matrix this small is cheap to densify
+        dense = (matrix.toarray() - mean) * inv_scale
+        u, s, vt = np.linalg.svd(dense, full_matrices=False)
+        u, s, vt = u[:, :n_components], s[:n_components], vt[:n_components]
+    else:
+        v0 = np.random.default_rng(seed).uniform(-1, 1, min(n_rows, n_cols))
+        u, s, vt = svds(operator, k=n_components, v0=v0)
+        order = np.argsort(s)[::-1]
+        u, s, vt = u[:, order], s[order], vt[order]
+
+    # Deterministic signs: the largest loading of each component is positive
+    signs = np.sign(vt[np.arange(len(s)), np.argmax(np.abs(vt), axis=1)])
+    signs[signs == 0] = 1.0
+    projections = u * s * signs
+
+    total_variance = _scaled_var(matrix, mean, scale).sum()
+    ratio = (s ** 2 / max(n_rows - 1, 1)) / total_variance if total_variance > 0 else np.zeros(len(s))
+    return projections, ratio
+
+
+def _scaled_var(matrix, mean, scale):
+    """ddof=1 variance of each standardized column"""
+    n_rows = matrix.shape[0]
+    squares = np.asarray(matrix.multiply(matrix).sum(axis=0)).ravel()
+    centered_ss = np.maximum(squares - n_rows * mean * mean, 0.0)
+    return centered_ss / (scale * scale) / max(n_rows - 1, 1)
+
+
+def sparse_cluster_means(matrix, labels, n_clusters):
+    """(sizes, per-cluster column means) from one sparse indicator product"""
+    n_rows = matrix.shape[0]
+    indicator = sp.csr_matrix((np.ones(n_rows), (labels, np.arange(n_rows))), shape=(n_clusters, n_rows))
+    sizes = np.bincount(labels, minlength=n_clusters)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = np.asarray((indicator @ matrix).todense()) / sizes[:, None]
+    return sizes, means
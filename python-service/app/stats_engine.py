@@ -0,0 +1,103 @@
+import numpy as np
+
+
+QUANTILES = (0.25, 0.5, 0.75)
+
+
+def column_statistics(values, block_size=4096, moments=None):
+    """Compute NaN-aware summary statistics for every column of a 2-D array.
+
+    Moments are taken along axis 0 and all quantiles (plus min/max) come from
+    a single ``np.partition`` pass per block of columns. Returns a dict of
+    1-D arrays keyed like the per-column stats of ``calculate_basic_stats``;
+    std uses ddof=1, skewness/kurtosis match ``scipy.stats`` defaults
+    (biased, Fisher) and quantiles use linear interpolation like pandas.
+    ``moments`` is an optional precomputed (count, mean, var) triple from
+    ``group_moments`` whose mean and variance are reused.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim != 2:
+        raise ValueError("Expected a 2-D array of values")
+
+    n_cols = values.shape[1]
+    names = ('count', 'missing', 'mean', 'median', 'std', 'min', 'max',
+             'q25', 'q75', 'skewness', 'kurtosis')
+    out = {name: np.full(n_cols, np.nan) for name in names}
+
+    # Work on column blocks so temporaries stay bounded on very wide matrices
+    for start in range(0, n_cols, block_size):
+        stop = min(start + block_size, n_cols)
+        block_moments = None if moments is None else tuple(m[start:stop] for m in moments)
+        block = _block_statistics(values[:, start:stop], block_moments)
+        for name in names:
+            out[name][start:stop] = block[name]
+
+    out['count'] = out['count'].astype(np.int64)
+    out['missing'] = out['missing'].astype(np.int64)
+    return out
+
+
+def _block_statistics(block, moments=None):
+    present = ~np.isnan(block)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if moments is None:
+            count = present.sum(axis=0)
+            mean = np.where(present, block, 0.0).sum(axis=0) / count
+        else:
+            count, mean, var = moments
+        centered = np.where(present, block - mean, 0.0)
+        squared = centered * centered
+        if moments is None:
+            m2 = squared.sum(axis=0) / count
+        else:
+            m2 = np.where(count == 1, 0.0, var * (count - 1) / count)
+        m3 = (squared * centered).sum(axis=0) / count
+        m4 = (squared * squared).sum(axis=0) / count
+
+        std = np.sqrt(m2 * count / (count - 1))
+        # Same near-constant guard scipy.stats.skew/kurtosis use
+        constant = m2 <= (np.finfo(np.float64).resolution * mean) ** 2
+        skewness = np.where(constant, np.nan, m3 / m2 ** 1.5)
+        kurtosis = np.where(constant, np.nan, m4 / (m2 * m2) - 3.0)
+    del centered, squared
+
+    stats = {
+        'count': count,
+        'missing': block.shape[0] - count,
+        'mean': mean,
+        'std': std,
+        'skewness': skewness,
+        'kurtosis': kurtosis
+    }
+    stats.update(_block_quantiles(block, present, count))
+    return stats
+
+
+def _block_quantiles(block, present, count):
+    """Order statistics for a block via one partition per distinct count"""
+    n_cols = block.shape[1]
+    result = {name: np.full(n_cols, np.nan) for name in ('min', 'max', 'q25', 'median', 'q75')}
+
+    # Missing values sort past every real value, so for a column with c
+    # observations its order statistics live in rows [0, c)
+    filled = np.where(present, block, np.inf)
+
+    for c in np.unique(count):
+        if c == 0:
+            continue
+        cols = np.flatnonzero(count == c)
+        positions = [q * (c - 1) for q in QUANTILES]
+        kth = sorted({0, int(c - 1)} | {int(np.floor(p)) for p in positions} | {int(np.ceil(p)) for p in positions})
+
+        sub = filled[:, cols] if len(cols) < n_cols else filled
+        part = np.partition(sub, kth, axis=0)
+
+        result['min'][cols] = part[0]
+        result['max'][cols] = part[c - 1]
+        for name, pos in zip(('q25', 'median', 'q75'), positions):
+            lo, hi = int(np.floor(pos)), int(np.ceil(pos))
+            frac = pos - lo
+            result[name][cols] = part[lo] + (part[hi] - part[lo]) * frac
+
+    return result
@@ -0,0 +1,252 @@
+import numpy as np
+
+
+class MomentAccumulator:
+    """Mergeable per-column count, mean, central moments (up to 4th) and min/max.
+
+    Chunks are reduced to their own moments and combined with the pairwise
+    (Chan/Pebay) update formulas, the batched form of Welford's algorithm.
+    Missing values (NaN) are skipped per column.
+    """
+
+    def __init__(self, n_cols):
+        self.count = np.zeros(n_cols)
+        self.mean = np.zeros(n_cols)
+        self.m2 = np.zeros(n_cols)
+        self.m3 = np.zeros(n_cols)
+        self.m4 = np.zeros(n_cols)
+        self.min = np.full(n_cols, np.inf)
+        self.max = np.full(n_cols, -np.inf)
+        self.rows = 0
+
+    def update(self, block):
+        block = np.asarray(block, dtype=np.float64)
+        present = ~np.isnan(block)
+        other = MomentAccumulator(block.shape[1])
+        other.rows = block.shape[0]
+        other.count = present.sum(axis=0).astype(np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            other.mean = np.where(other.count > 0, np.where(present, block, 0.0).sum(axis=0) / other.count, 0.0)
+        centered = np.where(present, block - other.mean, 0.0)
+        squared = centered * centered
+        other.m2 = squared.sum(axis=0)
+        other.m3 = (squared * centered).sum(axis=0)
+        other.m4 = (squared * squared).sum(axis=0)
+        other.min = np.where(present, block, np.inf).min(axis=0, initial=np.inf)
+        other.max = np.where(present, block, -np.inf).max(axis=0, initial=-np.inf)
+        self.merge(other)
+
+    def merge(self, other):
+        na, nb = self.count, other.count
+        n = na + nb
+        delta = other.mean - self.mean
+        with np.errstate(invalid='ignore', divide='ignore'):
+            n_safe = np.where(n > 0, n, 1.0)
+            mean = self.mean + delta * nb / n_safe
+            m2 = self.m2 + other.m2 + delta ** 2 * na * nb / n_safe
+            m3 = (self.m3 + other.m3
+                  + delta ** 3 * na * nb * (na - nb) / n_safe ** 2
+                  + 3.0 * delta * (na * other.m2 - nb * self.m2) / n_safe)
+            m4 = (self.m4 + other.m4
+                  + delta ** 4 * na * nb * (na * na - na * nb + nb * nb) / n_safe ** 3
+                  + 6.0 * delta ** 2 * (na * na * other.m2 + nb * nb * self.m2) / n_safe ** 2
+                  + 4.0 * delta * (na * other.m3 - nb * self.m3) / n_safe)
+        self.count, self.mean, self.m2, self.m3, self.m4 = n, mean, m2, m3, m4
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+        self.rows += other.rows
+
+    def finalize(self):
+        """Return count, mean, std (ddof=1), skewness and kurtosis (biased, Fisher)"""
+        n = self.count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(n > 0, self.mean, np.nan)
+            std = np.where(n > 1, np.sqrt(self.m2 / (n - 1)), np.nan)
+            var = self.m2 / n
+            constant = var <= (np.finfo(np.float64).resolution * mean) ** 2
+            skewness = np.where(constant, np.nan, (self.m3 / n) / var ** 1.5)
+            kurtosis = np.where(constant, np.nan, (self.m4 / n) / (var * var) - 3.0)
+        return {
+            'count': n.astype(np.int64),
+            'missing': (self.rows - n).astype(np.int64),
+            'mean': mean,
+            'std': std,
+            'min': np.where(n > 0, self.min, np.nan),
+            'max': np.where(n > 0, self.max, np.nan),
+            'skewness': skewness,
+            'kurtosis': kurtosis
+        }
+
+
+class QuantileSketch:
+    """Mergeable per-column quantile sketch built from a stack of compactors.
+
+    Level ``h`` holds items of weight ``2**h``. When a level reaches ``2k``
+    rows it is sorted per column and every other item is promoted to the
+    next level. Each compaction at level ``h`` shifts any rank by at most
+    ``2**h``, so ``rank_error`` (the sum over all compactions) is a
+    deterministic bound on the absolute rank error of every query. Memory
+    is O(k log(n / k)) rows regardless of how many rows are streamed.
+    """
+
+    def __init__(self, n_cols, k=256):
+        self.n_cols = n_cols
+        self.k = k
+        self.levels = []
+        self.rank_error = 0.0
+        self._parity = []
+
+    def update(self, block):
+        block = np.asarray(block, dtype=np.float64)
+        # Missing values rank above every observation, so quantile ranks
+        # computed from the non-missing count are unaffected by them
+        self._add(0, np.where(np.isnan(block), np.inf, block))
+
+    def merge(self, other):
+        for level, rows in enumerate(other.levels):
+            self._add(level, rows)
+        self.rank_error += other.rank_error
+
+    def _add(self, level, rows):
+        while len(self.levels) <= level:
+            self.levels.append(np.empty((0, self.n_cols)))
+            self._parity.append(0)
+
+        buffer = np.concatenate([self.levels[level], rows]) if len(self.levels[level]) else rows
+        if len(buffer) < 2 * self.k:
+            self.levels[level] = buffer
+            return
+
+        buffer = np.sort(buffer, axis=0)
+        # Keep an odd leftover at this level and promote every other item
+        even = len(buffer) - len(buffer) % 2
+        promoted = buffer[self._parity[level]:even:2]
+        self.levels[level] = buffer[even:]
+        self._parity[level] ^= 1
+        self.rank_error += 2.0 ** level
+        self._add(level + 1, promoted)
+
+    def query(self, quantiles, counts, lower=None, upper=None):
+        """Linear-interpolated quantiles over ``counts`` non-missing values per column"""
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(rows), 2.0 ** level) for level, rows in enumerate(self.levels)])
+
+        order = np.argsort(values, axis=0)
+        sorted_values = np.take_along_axis(values, order, axis=0)
+        cumulative = np.cumsum(weights[order], axis=0)
+        last = len(values) - 1
+
+        result = {}
+        for q in quantiles:
+            pos = q * (counts - 1)
+            lo, hi = np.floor(pos), np.ceil(pos)
+            idx_lo = np.minimum((cumulative <= lo).sum(axis=0), last)
+            idx_hi = np.minimum((cumulative <= hi).sum(axis=0), last)
+            v_lo = np.take_along_axis(sorted_values, idx_lo[None, :], axis=0)[0]
+            v_hi = np.take_along_axis(sorted_values, idx_hi[None, :], axis=0)[0]
+            with np.errstate(invalid='ignore'):
+                estimate = v_lo + (v_hi - v_lo) * (pos - lo)
+            if lower is not None:
+                estimate = np.clip(estimate, lower, upper)
+            result[q] = np.where(counts > 0, estimate, np.nan)
+        return result
+
+
+class CorrelationAccumulator:
+    """Running sums for Pearson correlation over pairwise-complete rows.
+
+    Keeps XᵀX and column sums of the (shifted) data. While no value is
+    missing those are enough; once a NaN shows up the per-pair counts and
+    sums are materialized so results match ``DataFrame.corr`` pairwise
+    deletion.
+    """
+
+    def __init__(self, n_cols):
+        self.n_cols = n_cols
+        self.shift = None
+        self.rows = 0.0
+        self.col_sum = np.zeros(n_cols)
+        self.col_sumsq = np.zeros(n_cols)
+        self.cross = np.zeros((n_cols, n_cols))
+        # Pairwise statistics, only allocated once data has missing values
+        self.pair_count = None
+        self.pair_sum = None
+        self.pair_sumsq = None
+
+    def update(self, block):
+        block = np.asarray(block, dtype=np.float64)
+        if self.shift is None:
+            # Shift by the first chunk's means to avoid catastrophic cancellation
+            with np.errstate(invalid='ignore'):
+                self.shift = np.nan_to_num(np.nanmean(block, axis=0)) if len(block) else np.zeros(self.n_cols)
+
+        x = block - self.shift
+        present = ~np.isnan(x)
+        if self.pair_count is None and not present.all():
+            self._materialize_pairs()
+
+        x0 = np.where(present, x, 0.0)
+        self.cross += x0.T @ x0
+        if self.pair_count is None:
+            self.rows += len(x0)
+            self.col_sum += x0.sum(axis=0)
+            self.col_sumsq += (x0 * x0).sum(axis=0)
+        else:
+            mask = present.astype(np.float64)
+            self.pair_count += mask.T @ mask
+            self.pair_sum += x0.T @ mask
+            self.pair_sumsq += (x0 * x0).T @ mask
+
+    def _materialize_pairs(self):
+        self.pair_count = np.full((self.n_cols, self.n_cols), self.rows)
+        self.pair_sum = np.repeat(self.col_sum[:, None], self.n_cols, axis=1)
+        self.pair_sumsq = np.repeat(self.col_sumsq[:, None], self.n_cols, axis=1)
+
+    def correlation(self):
+        """Return the Pearson correlation matrix (NaN where undefined)"""
+        if self.pair_count is None:
+            n = self.rows
+            sx = self.col_sum[:, None]
+            sy = self.col_sum[None, :]
+            sxx = self.col_sumsq[:, None]
+            syy = self.col_sumsq[None, :]
+        else:
+            n = self.pair_count
+            sx = self.pair_sum
+            sy = self.pair_sum.T
+            sxx = self.pair_sumsq
+            syy = self.pair_sumsq.T
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cov = self.cross - sx * sy / n
+            var_x = sxx - sx * sx / n
+            var_y = syy - sy * sy / n
+            corr = cov / np.sqrt(var_x * var_y)
+        corr[(var_x <= 0) | (var_y <= 0)] = np.nan
+        return np.clip(corr, -1.0, 1.0)
+
+
+def streaming_column_statistics(blocks, n_cols, sketch_size=256):
+    """Summary statistics like ``column_statistics`` from an iterable of row blocks.
+
+    Adds ``quantile_rank_error``: the sketch's worst-case rank error for
+    median/q25/q75 as a fraction of each column's non-missing count.
+    """
+    moments = MomentAccumulator(n_cols)
+    sketch = QuantileSketch(n_cols, k=sketch_size)
+    for block in blocks:
+        moments.update(block)
+        sketch.update(block)
+
+    out = moments.finalize()
+    if moments.rows == 0:
+        raise ValueError("No numeric data found for analysis")
+
+    counts = out['count']
+    quantiles = sketch.query((0.25, 0.5, 0.75), counts, lower=out['min'], upper=out['max'])
+    out['q25'] = quantiles[0.25]
+    out['median'] = quantiles[0.5]
+    out['q75'] = quantiles[0.75]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out['quantile_rank_error'] = np.where(counts > 0, sketch.rank_error / counts, np.nan)
+    return out
@@ -0,0 +1,133 @@
+import gzip
+import io
+import os
+import shutil
+import tempfile
+
+from werkzeug.exceptions import RequestEntityTooLarge, UnsupportedMediaType
+
+from app.cache import DatasetCache
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# Spooled bodies stay in memory up to this size, then move to a temp file
+SPOOL_MEMORY_SIZE = 8 * 1024 * 1024
+
+READ_SIZE = 1024 * 1024
+
+COMPRESSED_SUFFIXES = {'.gz': 'gzip', '.gzip': 'gzip', '.zst': 'zstd'}
+
+
+class DecompressedTooLarge(RequestEntityTooLarge):
+    description = 'Decompressed body exceeds the maximum allowed size.'
+
+
+class _LimitedReader(io.RawIOBase):
+    """Raises DecompressedTooLarge once more than max_bytes have been read"""
+
+    def __init__(self, inner, max_bytes):
+        self.inner = inner
+        self.max_bytes = max_bytes
+        self.total = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.inner.read(len(buffer))
+        self.total += len(data)
+        if self.max_bytes is not None and self.total > self.max_bytes:
+            raise DecompressedTooLarge()
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def split_compression(file_name):
+    """Return (file name without a .gz/.zst suffix, encoding or None)"""
+    base, suffix = os.path.splitext(file_name)
+    encoding = COMPRESSED_SUFFIXES.get(suffix.lower())
+    return (base, encoding) if encoding else (file_name, None)
+
+
+def decoded_stream(stream, max_bytes, encodings=()):
+    """Wrap a binary stream so reads return the decoded bytes.
+
+    encodings are applied in order (e.g. the Content-Encoding, then a .gz
+    file name). The decoded size is capped at max_bytes (the app's
+    MAX_DECOMPRESSED_LENGTH for request bodies, a decompression bomb
+    guard; None for the server's own files).
+    """
+    for encoding in encodings:
+        if encoding in (None, '', 'identity'):
+            continue
+        if encoding in ('gzip', 'x-gzip'):
+            stream = gzip.GzipFile(fileobj=stream, mode='rb')
+        elif encoding == 'zstd':
+            if zstandard is None:
+                raise UnsupportedMediaType("zstd bodies require the 'zstandard' package")
+            stream = zstandard.ZstdDecompressor().stream_reader(stream)
+        else:
+            raise UnsupportedMediaType(f"Unsupported content encoding: {encoding}. Use gzip or zstd")
+    return io.BufferedReader(_LimitedReader(stream, max_bytes), READ_SIZE)
+
+
+class SpooledBody:
+    """A decoded upload held in a spooled temp file, plus the digest of its content.
+
+    Analyses parse it straight from the file, and the digest gives the
+    same cache key as sending the content as a string.
+    """
+
+    def __init__(self, file, digest, size):
+        self.file = file
+        self.digest = digest
+        self.size = size
+
+    def __bool__(self):
+        return self.size > 0
+
+    def rewind(self):
+        """Return the file positioned at the start"""
+        self.file.seek(0)
+        return self.file
+
+    def first_line(self):
+        line = self.rewind().readline()
+        self.rewind()
+        return line.decode('utf-8', 'replace')
+
+    def cache_key(self, **options):
+        return DatasetCache.finish_key(self.digest, **options)
+
+    def save(self, path):
+        """Copy the decoded content to path"""
+        with open(path, 'wb') as f:
+            shutil.copyfileobj(self.rewind(), f, READ_SIZE)
+
+    def close(self):
+        self.file.close()
+
+
+def spool_body(stream, max_bytes, encodings=()):
+    """Decode a binary stream into a SpooledBody one block at a time"""
+    reader = decoded_stream(stream, max_bytes, encodings)
+    spooled = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_SIZE)
+    digest = DatasetCache.content_digest()
+    size = 0
+    try:
+        while True:
+            chunk = reader.read(READ_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            spooled.write(chunk)
+            size += len(chunk)
+    except Exception:
+        spooled.close()
+        raise
+    spooled.seek(0)
+    return SpooledBody(spooled, digest, size)
@@ -0,0 +1,205 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+
+# Columns of a variant table (see sample-data/sample.csv); positions are
+# 1-based and a variant covers [position, end_position]
+CHROMOSOME_COLUMN = 'chromosome'
+START_COLUMN = 'position'
+END_COLUMN = 'end_position'
+# Columns whose group codes are computed with the index, for density and aggregation requests
+GROUP_COLUMNS = ('gene_name', 'clinical_significance', 'variant_type')
+
+# Default and largest number of windows of a density request
+DEFAULT_WINDOWS = 200
+MAX_WINDOWS = 10000
+# Default and largest number of variants one region request returns
+DEFAULT_REGION_LIMIT = 1000
+MAX_REGION_LIMIT = 100000
+
+
+def chromosome_sort_key(name):
+    """Sort chromosomes naturally: chr2 before chr10, numbered before X/Y/M"""
+    match = re.fullmatch(r'(?:chr)?(\d+)', name, flags=re.IGNORECASE)
+    return (0, int(match.group(1)), '') if match else (1, 0, name)
+
+
+def factorize_groups(values):
+    """(int32 codes, sorted labels) of a column; missing values get a last None label"""
+    codes, labels = pd.factorize(values, sort=True)
+    labels = labels.tolist()
+    if (codes < 0).any():
+        codes = np.where(codes < 0, len(labels), codes)
+        labels.append(None)
+    return codes.astype(np.int32), labels
+
+
+class VariantIndex:
+    """Per-chromosome interval index of a variant table.
+
+    Variants are sorted by chromosome, then start, into flat arrays, with
+    each chromosome a contiguous slice. Alongside the starts and ends it
+    keeps the running maximum of the ends within each chromosome: it is
+    non-decreasing, so the first variant that can reach a query start is
+    a binary search away, as is the last one starting before the query
+    end. An overlap query is two searches plus a vectorized filter of
+    the variants between them. Rows without a chromosome or start are
+    left out; a missing end means a single-base variant.
+
+    The index keeps the table itself in the same order as an Arrow table
+    (strings take far less memory than in the DataFrame) plus the group
+    codes of GROUP_COLUMNS, so queries don't need the parsed dataset,
+    which for millions of variants may not stay cached.
+    """
+
+    def __init__(self, df, numeric_cols=()):
+        missing = [name for name in (CHROMOSOME_COLUMN, START_COLUMN) if name not in df.columns]
+        if missing:
+            raise ValueError(f"Variant tables need {CHROMOSOME_COLUMN} and {START_COLUMN} columns (missing: {', '.join(missing)})")
+
+        starts = pd.to_numeric(df[START_COLUMN], errors='coerce').to_numpy(dtype=np.float64)
+        if END_COLUMN in df.columns:
+            ends = pd.to_numeric(df[END_COLUMN], errors='coerce').to_numpy(dtype=np.float64)
+            ends = np.where(np.isnan(ends), starts, np.maximum(ends, starts))
+        else:
+            ends = starts
+        codes, names = pd.factorize(df[CHROMOSOME_COLUMN].astype('string'))
+        keep = (codes >= 0) & ~np.isnan(starts)
+
+        rows = np.flatnonzero(keep)
+        codes = codes[rows]
+        starts = starts[rows].astype(np.int64)
+        ends = ends[rows].astype(np.int64)
+        order = np.lexsort((starts, codes))
+        self.rows = rows[order]
+        self.starts = starts[order]
+        self.ends = ends[order]
+        codes = codes[order]
+
+        # Offsetting every chromosome above the previous one's ends lets one
+        # accumulate compute the running maximum of all of them
+        offset = codes * (int(self.ends.max()) + 1 if len(self.ends) else 1)
+        self.max_ends = np.maximum.accumulate(self.ends + offset) - offset
+
+        bounds = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(names)))])
+        self.chromosomes = {
+            str(name): (int(bounds[i]), int(bounds[i + 1]))
+            for i, name in enumerate(names) if bounds[i + 1] > bounds[i]
+        }
+        self.groups = {
+            column: factorize_groups(df[column].to_numpy()[self.rows])
+            for column in GROUP_COLUMNS if column in df.columns
+        }
+
+        self.table = _integral_columns(df, self.rows)
+        self.numeric_cols = [col for col in numeric_cols if col not in (START_COLUMN, END_COLUMN)]
+        self.nbytes = int(self.rows.nbytes + self.starts.nbytes + self.ends.nbytes + self.max_ends.nbytes)
+        self.nbytes += sum(int(codes.nbytes) for codes, _ in self.groups.values()) + int(self.table.nbytes)
+
+    def chromosome_names(self):
+        return sorted(self.chromosomes, key=chromosome_sort_key)
+
+    def resolve(self, chromosome):
+        """The indexed name of a chromosome, accepting it with or without a 'chr' prefix"""
+        chromosome = str(chromosome)
+        bare = chromosome[3:] if chromosome.lower().startswith('chr') else chromosome
+        for name in (chromosome, bare, f'chr{bare}'):
+            if name in self.chromosomes:
+                return name
+        raise ValueError(f"Chromosome not found: {chromosome}")
+
+    def span(self, chromosome):
+        """(first start, last end) of a chromosome's variants"""
+        lo, hi = self.chromosomes[self.resolve(chromosome)]
+        return int(self.starts[lo]), int(self.max_ends[hi - 1])
+
+    def overlapping(self, chromosome, start=None, end=None):
+        """Positions (into the sorted arrays, in start order) of the variants overlapping [start, end]"""
+        lo, hi = self.chromosomes[self.resolve(chromosome)]
+        if start is None and end is None:
+            return np.arange(lo, hi)
+        if end is not None:
+            hi = lo + int(np.searchsorted(self.starts[lo:hi], end, side='right'))
+        if start is None:
+            return np.arange(lo, hi)
+        lo += int(np.searchsorted(self.max_ends[lo:hi], start, side='left'))
+        return lo + np.flatnonzero(self.ends[lo:hi] >= start)
+
+    def variants(self, positions):
+        """Arrow table of the variants at positions"""
+        return self.table.take(positions)
+
+    def group_codes(self, column, positions):
+        """(codes, labels) of a column for the variants at positions"""
+        if column in self.groups:
+            codes, labels = self.groups[column]
+            return codes[positions], labels
+        if column not in self.table.column_names:
+            raise ValueError(f"Column not found: {column}")
+        return factorize_groups(self.table.column(column).take(positions).to_numpy())
+
+    def annotations(self, positions):
+        """(variants x numeric columns) float64 matrix of the variants at positions, NaN when missing"""
+        values = np.empty((len(positions), len(self.numeric_cols)))
+        for j, column in enumerate(self.numeric_cols):
+            values[:, j] = self.table.column(column).take(positions).to_numpy().astype(np.float64)
+        return values
+
+    def chromosome_counts(self):
+        return {name: hi - lo for name, (lo, hi) in self.chromosomes.items()}
+
+
+def _integral_columns(df, rows):
+    """Arrow table of the rows of df, with coordinates and whole-number float columns as int64
+
+    Columns that parsed as floats only because of missing values (or
+    that were cast, e.g. by the numeric matrix) come back as integers
+    with nulls, so region rows show position 12345 rather than 12345.0.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    table = pa.Table.from_pandas(df, preserve_index=False).take(pa.array(rows))
+    for i, field in enumerate(table.schema):
+        if not pa.types.is_floating(field.type):
+            continue
+        column = table.column(i)
+        finite = pc.drop_null(column)
+        if field.name in (START_COLUMN, END_COLUMN) or pc.all(pc.equal(pc.floor(finite), finite)).as_py() is not False:
+            table = table.set_column(i, pa.field(field.name, pa.int64()), pc.floor(column).cast(pa.int64()))
+    return table
+
+
+def window_counts(starts, ends, region_start, width, windows, codes=None, n_groups=1):
+    """Variants overlapping each of ``windows`` windows of ``width`` bases from region_start.
+
+    Each variant adds one at its first window and removes it after its
+    last, and a cumulative sum turns those difference counts into
+    per-window counts: one bincount for all variants and windows, per
+    group too when ``codes`` are given (shape (n_groups, windows)).
+    """
+    first = np.clip((starts - region_start) // width, 0, windows - 1)
+    last = np.clip((ends - region_start) // width, 0, windows - 1)
+    codes = np.zeros(len(starts), dtype=np.int64) if codes is None else np.asarray(codes, dtype=np.int64)
+    size = windows + 1
+    delta = (
+        np.bincount(codes * size + first, minlength=n_groups * size)
+        - np.bincount(codes * size + last + 1, minlength=n_groups * size)
+    )
+    return np.cumsum(delta.reshape(n_groups, size), axis=1)[:, :windows]
+
+
+def group_aggregates(codes, n_groups, values):
+    """Per-group counts and NaN-aware means of the columns of ``values`` (variants x columns)"""
+    counts = np.bincount(codes, minlength=n_groups)
+    means = np.full((n_groups, values.shape[1]), np.nan)
+    for j in range(values.shape[1]):
+        column = values[:, j]
+        present = ~np.isnan(column)
+        n = np.bincount(codes[present], minlength=n_groups)
+        total = np.bincount(codes[present], weights=column[present], minlength=n_groups)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means[:, j] = np.where(n > 0, total / n, np.nan)
+    return counts, means
@@ -0,0 +1,130 @@
+import gc
+import threading
+import time
+
+import numpy as np
+
+
+# Readiness of this process: /api/health/ready reports 503 until warm_up() has run
+_state = {'ready': False, 'status': 'cold', 'seconds': None, 'steps': {}, 'error': None}
+_lock = threading.Lock()
+_run_lock = threading.Lock()
+
+WARMUP_MODES = ('background', 'sync', 'hook', 'off')
+
+
+def is_ready():
+    with _lock:
+        return _state['ready']
+
+
+def status():
+    with _lock:
+        return {**_state, 'steps': dict(_state['steps'])}
+
+
+def _set(**values):
+    with _lock:
+        _state.update(values)
+
+
+def warmup_content(rows=60, features=8, seed=0):
+    """A tiny expression-like CSV (id, condition, numeric features) for warm-up runs"""
+    rng = np.random.default_rng(seed)
+    values = rng.normal(size=(rows, features))
+    values[::7, 1] = np.nan
+    header = ['sample_id', 'condition'] + [f'gene_{j}' for j in range(features)]
+    lines = [','.join(header)]
+    for i in range(rows):
+        condition = 'control' if i % 2 == 0 else 'treatment'
+        lines.append(','.join([f'S{i}', condition] + ['' if np.isnan(v) else f'{v:.4f}' for v in values[i]]))
+    return '\n'.join(lines) + '\n'
+
+
+def warm_up(app=None, service=None):
+    """Import the lazily loaded modules and run every analysis once on a tiny dataset.
+
+    This loads sklearn, pyarrow's CSV reader and BLAS/joblib thread pools and
+    touches each numeric code path, so the first real request does not pay
+    for it. Under gunicorn with preload_app this runs in the master before
+    workers fork, and they share the result copy-on-write (see freeze()).
+    Marks the process ready when done (also when a step fails, which is
+    logged).
+    """
+    with _run_lock:
+        if is_ready():
+            return status()
+
+        from app.analysis import AnalysisService
+
+        service = service or AnalysisService()
+        content = warmup_content()
+        name = 'warmup.csv'
+        steps = [
+            ('stats', lambda: service.calculate_basic_stats(content, name, [])),
+            ('stats_streaming', lambda: service.calculate_basic_stats(content, name, [], streaming=True, chunk_size=16)),
+            ('correlation', lambda: service.calculate_correlation(content, name, 'pearson')),
+            ('correlation_spearman', lambda: service.calculate_correlation(content, name, 'spearman', top_k=5)),
+            ('differential', lambda: service.differential_analysis(content, name, 'control', 'treatment', 0.05)),
+            ('differential_permutation', lambda: service.differential_analysis(
+                content, name, 'control', 'treatment', 0.05, permutation=True, max_permutations=200, n_jobs=1)),
+            ('differential_multigroup', lambda: service.differential_analysis(content, name)),
+            ('clustering', lambda: service.clustering_analysis(content, name, 2, 'kmeans')),
+            ('clustering_hierarchical', lambda: service.clustering_analysis(content, name, 2, 'hierarchical')),
+            ('clustering_sweep', lambda: service.clustering_sweep(content, name, k_min=2, k_max=3, n_jobs=1)),
+        ]
+
+        _set(status='warming_up')
+        start = time.perf_counter()
+        timings = {}
+        error = None
+        for step, run in steps:
+            step_start = time.perf_counter()
+            try:
+                result = run()
+                if app is not None:
+                    # The JSON provider is part of every response
+                    with app.app_context():
+                        app.json.dumps(result)
+            except Exception as e:
+                print(f"Warm-up step {step} failed: {str(e)}")
+                error = f'{step}: {str(e)}'
+            timings[step] = round(time.perf_counter() - step_start, 4)
+
+        seconds = round(time.perf_counter() - start, 4)
+        _set(ready=True, status='ready', seconds=seconds, steps=timings, error=error)
+        print(f"🔥 Warm-up finished in {seconds:.2f}s")
+        return status()
+
+
+def freeze():
+    """Collect warm-up garbage, then move everything that survived into the permanent generation
+
+    Later collections skip it, so they neither pause the first requests
+    nor write to pages shared with forked workers. Only for a pre-fork
+    master after warm_up() has returned: frozen objects are never
+    collected, so freezing while other threads still allocate would pin
+    whatever they hold.
+    """
+    gc.collect()
+    gc.freeze()
+
+
+def init_app(app):
+    """Start warm-up according to app.config['WARMUP']
+
+    'off' (the default, e.g. for run.py) is ready immediately without
+    warming up, 'background' warms up in a thread (/api/health/ready
+    answers 503 meanwhile), 'sync' before create_app returns and 'hook'
+    leaves it to the server (see gunicorn.conf.py).
+    """
+    mode = app.config.setdefault('WARMUP', 'off')
+    if mode not in WARMUP_MODES:
+        raise ValueError(f"Unsupported WARMUP mode: {mode}. Use {', '.join(WARMUP_MODES)}")
+
+    if mode == 'off':
+        _set(ready=True, status='ready')
+    elif mode == 'sync':
+        warm_up(app)
+    elif mode == 'background':
+        threading.Thread(target=warm_up, args=(app,), daemon=True, name='warm-up').start()
@@ -0,0 +1,74 @@
+"""Compare peak memory and wall time of the blocked correlation engine against
+the previous DataFrame.corr() + dict-of-dicts implementation.
+
+Usage (from python-service/):
+    python benchmarks/bench_correlation.py --samples 200 --features 4000
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.correlation import collect_matrix, collect_pairs, collect_top_k, iter_correlation_tiles
+
+
+def legacy_correlation(values, columns, method):
+    """The implementation calculate_correlation used before the tiled engine"""
+    corr_matrix = pd.DataFrame(values, columns=columns).corr(method=method)
+    results = {}
+    for col1 in corr_matrix.columns:
+        results[col1] = {}
+        for col2 in corr_matrix.columns:
+            corr_val = corr_matrix.loc[col1, col2]
+            results[col1][col2] = float(corr_val) if not pd.isna(corr_val) else 0.0
+    return results
+
+
+def measure(label, func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<34} {elapsed:>9.3f} s {peak / 1024 / 1024:>10.1f} MB")
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--samples', type=int, default=200)
+    parser.add_argument('--features', type=int, default=2000)
+    parser.add_argument('--method', default='pearson', choices=['pearson', 'spearman'])
+    parser.add_argument('--block-size', type=int, default=1024)
+    parser.add_argument('--threshold', type=float, default=0.8)
+    parser.add_argument('--top-k', type=int, default=10)
+    parser.add_argument('--skip-legacy', action='store_true', help='Skip the old implementation (slow on wide matrices)')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=(args.samples, args.features))
+    columns = [f'gene_{i}' for i in range(args.features)]
+    n = args.features
+
+    def tiles(dtype):
+        return iter_correlation_tiles(values, args.method, dtype, args.block_size)
+
+    print(f"{args.samples} samples x {args.features} features, method={args.method}, block={args.block_size}")
+    print(f"{'variant':<34} {'wall':>11} {'peak':>13}")
+    if not args.skip_legacy:
+        measure('legacy corr() + dict', lambda: legacy_correlation(values, columns, args.method))
+    measure('blocked full matrix float64', lambda: collect_matrix(tiles(np.float64), n, np.float64))
+    measure('blocked full matrix float32', lambda: collect_matrix(tiles(np.float32), n, np.float32))
+    measure(f'blocked |r| >= {args.threshold} float32', lambda: collect_pairs(tiles(np.float32), args.threshold))
+    measure(f'blocked top-{args.top_k} float32', lambda: collect_top_k(tiles(np.float32), n, args.top_k))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""Measure the service's cold start: import time, warm-up time and the
+latency of the first request to each route, each in a fresh interpreter.
+
+Usage (from python-service/):
+    python benchmarks/cold_start.py --repeat 5 --output cold_start.json
+
+For every route the first request is timed twice: in a process that did
+not warm up (WARMUP=off, what a worker without the gunicorn preload pays)
+and in one that warmed up first (WARMUP=sync, what the preloaded workers
+see). --importtime also lists the slowest imports under app.routes from
+python -X importtime.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+
+ROUTES = {
+    '/api/stats': {},
+    '/api/correlation': {'method': 'pearson'},
+    '/api/differential': {'condition1': 'control', 'condition2': 'treatment'},
+    '/api/clustering': {'nClusters': 3},
+    '/api/clustering/sweep': {'kMin': 2, 'kMax': 4},
+}
+
+IMPORT_CODE = (
+    'import time; start = time.perf_counter(); import app.routes; '
+    'print(time.perf_counter() - start)'
+)
+
+
+def child(route, warmup, sample):
+    """Runs in the fresh interpreter: time app creation and the first request"""
+    os.environ['WARMUP'] = warmup
+    start = time.perf_counter()
+    from app import create_app
+    imported = time.perf_counter()
+    app = create_app()
+    created = time.perf_counter()
+
+    with open(sample) as f:
+        content = f.read()
+    body = dict(ROUTES[route], fileContent=content, fileName=os.path.basename(sample))
+    client = app.test_client()
+    request_start = time.perf_counter()
+    response = client.post(route, json=body)
+    first = time.perf_counter() - request_start
+    request_start = time.perf_counter()
+    client.post(route, json=body)
+    second = time.perf_counter() - request_start
+
+    print(json.dumps({
+        'status': response.status_code,
+        'import_seconds': imported - start,
+        'create_app_seconds': created - imported,
+        'first_request_seconds': first,
+        'second_request_seconds': second
+    }))
+
+
+def run_child(route, warmup, sample):
+    output = subprocess.check_output(
+        [sys.executable, os.path.abspath(__file__), '--child', route, '--warmup', warmup, '--sample', sample],
+        cwd=SERVICE_DIR, text=True
+    )
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def import_seconds(repeat):
+    timings = []
+    for _ in range(repeat):
+        output = subprocess.check_output([sys.executable, '-c', IMPORT_CODE], cwd=SERVICE_DIR, text=True)
+        timings.append(float(output.strip().splitlines()[-1]))
+    return float(np.median(timings))
+
+
+def slowest_imports(limit):
+    """(module, cumulative seconds) for the slowest imports under app.routes"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app.routes'],
+                            cwd=SERVICE_DIR, capture_output=True, text=True, check=True)
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # The modules app.routes pulls in and what they import directly
+        depth = (len(name) - len(name.lstrip())) // 2
+        if 1 <= depth <= 2:
+            entries.append((name.strip(), int(cumulative) / 1e6))
+    entries.sort(key=lambda entry: entry[1], reverse=True)
+    return entries[:limit]
+
+
+def median_record(records):
+    keys = [key for key in records[0] if key.endswith('_seconds')]
+    return {key: round(float(np.median([r[key] for r in records])), 4) for key in keys}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--sample', default=os.path.join(SERVICE_DIR, 'sample-data', 'gene_expression.csv'))
+    parser.add_argument('--routes', default='', help='Comma-separated routes to time (default: all)')
+    parser.add_argument('--importtime', type=int, default=0, help='Also list the N slowest imports')
+    parser.add_argument('--output', default='cold_start.json')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--warmup', default='off', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.warmup, args.sample)
+        return
+
+    imports = import_seconds(args.repeat)
+    print(f'import app.routes: {imports:.3f}s')
+    output = {
+        'meta': {
+            'timestamp': time.time(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'args': vars(args)
+        },
+        'import_seconds': round(imports, 4),
+        'routes': {}
+    }
+
+    if args.importtime:
+        output['slowest_imports'] = slowest_imports(args.importtime)
+        for name, seconds in output['slowest_imports']:
+            print(f'  {name:<40} {seconds:.3f}s')
+
+    routes = [r for r in args.routes.split(',') if r] or list(ROUTES)
+    for route in routes:
+        output['routes'][route] = {}
+        for warmup in ('off', 'sync'):
+            record = median_record([run_child(route, warmup, args.sample) for _ in range(args.repeat)])
+            output['routes'][route][f'warmup_{warmup}'] = record
+            print(f"{route:<24} warmup={warmup:<4} create_app {record['create_app_seconds']:.3f}s"
+                  f"  first {record['first_request_seconds']:.3f}s  second {record['second_request_seconds']:.3f}s")
+
+    with open(args.output, 'w') as f:
+        json.dump(output, f, indent=2)
+    print(f'Results written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,278 @@
+"""Time and memory-profile every AnalysisService method and /api/* route on
+synthetic datasets, and compare the results against a stored baseline.
+
+Usage (from python-service/):
+    python benchmarks/run_benchmarks.py --kinds expression,microbiome \\
+        --samples 200,2000 --features 500 --missing-rates 0,0.05 \\
+        --output bench_results.json
+
+    # later, on another commit
+    python benchmarks/run_benchmarks.py ... --output new.json \\
+        --compare bench_results.json --threshold 1.25
+
+Each measurement is split into parse (CSV -> ParsedDataset, cold cache),
+compute (the analysis with the dataset already cached) and serialize
+(JSON encoding of the result). Routes are measured through the Flask test
+client cold and warm; their phases come from the cold response's
+Server-Timing header (decode is folded into parse). Wall times are
+medians over --repeat runs and memory is the tracemalloc peak.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import generate, to_csv_content
+
+
+def _conditions(n_conditions):
+    if n_conditions == 2:
+        return 'control', 'treatment'
+    return 'group_1', 'group_2'
+
+
+def service_calls(n_conditions):
+    """(name, AnalysisService method, extra positional args, route, route payload)"""
+    condition1, condition2 = _conditions(n_conditions)
+    return [
+        ('calculate_basic_stats', [[]], '/api/stats', {}),
+        ('calculate_correlation', ['pearson'], '/api/correlation', {'method': 'pearson'}),
+        ('differential_analysis', [condition1, condition2, 0.05], '/api/differential',
+         {'condition1': condition1, 'condition2': condition2}),
+        ('clustering_analysis', [3, 'kmeans'], '/api/clustering', {'nClusters': 3}),
+        ('clustering_sweep', [2, 5], '/api/clustering/sweep', {'kMin': 2, 'kMax': 5}),
+    ]
+
+
+def measure(func, repeat):
+    """Run func repeat times; return (result, median seconds, peak MB over runs)"""
+    timings, peaks, result = [], [], None
+    for _ in range(repeat):
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return result, float(np.median(timings)), max(peaks) / 1024 / 1024
+
+
+def phase(seconds, peak_mb=None):
+    entry = {'seconds': round(seconds, 6)}
+    if peak_mb is not None:
+        entry['peak_mb'] = round(peak_mb, 3)
+    return entry
+
+
+def server_timing(response):
+    """Parse a Server-Timing header into {name: seconds}"""
+    timings = {}
+    for entry in response.headers.get('Server-Timing', '').split(','):
+        name, _, params = entry.strip().partition(';')
+        if params.startswith('dur='):
+            timings[name] = float(params[4:]) / 1000
+    return timings
+
+
+def bench_dataset(app, service, cache, label, content, n_conditions, methods, repeat, routes):
+    file_name = f'{label}.csv'
+    client = app.test_client()
+    records = []
+
+    def parse():
+        cache.clear()
+        return service.load_parsed_dataset(content, file_name)
+
+    _, parse_seconds, parse_peak = measure(parse, repeat)
+
+    for name, args, route, payload in service_calls(n_conditions):
+        if methods and name not in methods:
+            continue
+        method = getattr(service, name)
+        try:
+            service.load_parsed_dataset(content, file_name)
+            result, compute_seconds, compute_peak = measure(lambda: method(content, file_name, *args), repeat)
+            encoded, serialize_seconds, serialize_peak = measure(lambda: app.json.dumps(result), repeat)
+        except Exception as e:
+            records.append({'dataset': label, 'target': f'service:{name}', 'error': str(e)})
+            continue
+
+        records.append({
+            'dataset': label,
+            'target': f'service:{name}',
+            'phases': {
+                'parse': phase(parse_seconds, parse_peak),
+                'compute': phase(compute_seconds, compute_peak),
+                'serialize': phase(serialize_seconds, serialize_peak)
+            },
+            'total_seconds': round(parse_seconds + compute_seconds + serialize_seconds, 6),
+            'response_bytes': len(encoded)
+        })
+
+        if not routes:
+            continue
+
+        body = dict(payload, fileContent=content, fileName=file_name)
+
+        def cold():
+            cache.clear()
+            return client.post(route, json=body)
+
+        response, cold_seconds, cold_peak = measure(cold, repeat)
+        if response.status_code != 200:
+            records.append({'dataset': label, 'target': f'route:{route}',
+                            'error': f'HTTP {response.status_code}: {response.get_json().get("message")}'})
+            continue
+        _, warm_seconds, warm_peak = measure(lambda: client.post(route, json=body), repeat)
+        timings = server_timing(response)
+
+        records.append({
+            'dataset': label,
+            'target': f'route:{route}',
+            'phases': {
+                'parse': phase(timings.get('decode', 0.0) + timings.get('parse', 0.0)),
+                'compute': phase(timings.get('compute', 0.0), warm_peak),
+                'serialize': phase(timings.get('serialize', 0.0))
+            },
+            'warm_seconds': round(warm_seconds, 6),
+            'total_seconds': round(cold_seconds, 6),
+            'peak_mb': round(cold_peak, 3),
+            'response_bytes': len(response.data)
+        })
+
+    return records
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold, min_seconds):
+    """Return a list of regressions where a phase got slower than threshold x baseline"""
+    previous = {}
+    for record in baseline.get('results', []):
+        for phase_name, values in record.get('phases', {}).items():
+            previous[(record['dataset'], record['target'], phase_name)] = values['seconds']
+
+    regressions = []
+    for record in results:
+        for phase_name, values in record.get('phases', {}).items():
+            key = (record['dataset'], record['target'], phase_name)
+            before = previous.get(key)
+            after = values['seconds']
+            # Ignore phases too short to time reliably
+            if before is None or max(before, after) < min_seconds:
+                continue
+            ratio = after / before if before > 0 else float('inf')
+            if ratio > threshold:
+                regressions.append({'dataset': key[0], 'target': key[1], 'phase': key[2],
+                                    'baseline_seconds': before, 'seconds': after, 'ratio': round(ratio, 3)})
+    return regressions
+
+
+def _int_list(value):
+    return [int(v) for v in value.split(',') if v]
+
+
+def _float_list(value):
+    return [float(v) for v in value.split(',') if v]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--kinds', default='expression,microbiome,variants')
+    parser.add_argument('--samples', type=_int_list, default=[200])
+    parser.add_argument('--features', type=_int_list, default=[500])
+    parser.add_argument('--missing-rates', type=_float_list, default=[0.0])
+    parser.add_argument('--conditions', type=_int_list, default=[2])
+    parser.add_argument('--methods', default='', help='Comma-separated AnalysisService methods to run (default: all)')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--skip-routes', action='store_true')
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--compare', help='Baseline results JSON to check for regressions')
+    parser.add_argument('--threshold', type=float, default=1.25, help='Allowed slowdown ratio before failing')
+    parser.add_argument('--min-seconds', type=float, default=0.01, help='Ignore phases faster than this')
+    args = parser.parse_args()
+
+    from app import create_app
+    from app.cache import dataset_cache
+    from app.routes import analysis_service
+
+    # Warm up before measuring rather than in a thread competing with it
+    os.environ.setdefault('WARMUP', 'sync')
+    app = create_app()
+    dataset_cache.clear()
+    methods = {m for m in args.methods.split(',') if m}
+    results = []
+
+    for kind in args.kinds.split(','):
+        for samples in args.samples:
+            for features in args.features:
+                for missing_rate in args.missing_rates:
+                    for n_conditions in args.conditions:
+                        df = generate(kind, samples, features, missing_rate, n_conditions, args.seed)
+                        content = to_csv_content(df)
+                        label = f'{kind}_{samples}x{features}_m{missing_rate:g}_c{n_conditions}'
+                        print(f'{label}: {df.shape[0]} rows x {df.shape[1]} columns, {len(content) / 1024 / 1024:.1f} MB CSV')
+                        records = bench_dataset(app, analysis_service, dataset_cache, label, content,
+                                                n_conditions, methods, args.repeat, not args.skip_routes)
+                        for record in records:
+                            if 'error' in record:
+                                print(f"  {record['target']:<36} error: {record['error']}")
+                            else:
+                                p = record['phases']
+                                print(f"  {record['target']:<36} parse {p['parse']['seconds']:.4f}s"
+                                      f"  compute {p['compute']['seconds']:.4f}s"
+                                      f"  serialize {p['serialize']['seconds']:.4f}s"
+                                      f"  {record['response_bytes'] / 1024:.0f} KB")
+                        results.extend(records)
+
+    output = {
+        'meta': {
+            'timestamp': time.time(),
+            'git_commit': git_commit(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'args': vars(args)
+        },
+        'results': results
+    }
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold, args.min_seconds)
+        output['regressions'] = regressions
+
+    with open(args.output, 'w') as f:
+        json.dump(output, f, indent=2)
+    print(f'Results written to {args.output}')
+
+    if args.compare:
+        if regressions:
+            print(f'{len(regressions)} regression(s) over {args.threshold}x baseline:')
+            for r in regressions:
+                print(f"  {r['dataset']} {r['target']} {r['phase']}: "
+                      f"{r['baseline_seconds']:.4f}s -> {r['seconds']:.4f}s ({r['ratio']}x)")
+            sys.exit(1)
+        print('No regressions against baseline')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""Synthetic dataset generators shaped like the files in sample-data/.
+
+Every generator returns a DataFrame whose layout matches what the service
+sees in practice: an identifier column, optionally a condition column, then
+the feature columns.
+"""
+import numpy as np
+import pandas as pd
+
+
+CHROMOSOMES = [f'chr{i}' for i in range(1, 23)] + ['chrX', 'chrY']
+GENES = ['BRCA1', 'BRCA2', 'TP53', 'EGFR', 'KRAS', 'BRAF', 'PTEN', 'MYC', 'AKT1', 'PIK3CA',
+         'CDK4', 'APC', 'ATM', 'MLH1', 'RB1', 'VHL', 'NF1', 'ERBB2', 'ALK', 'RET']
+SIGNIFICANCE = ['Benign', 'Likely_Benign', 'VUS', 'Likely_Pathogenic', 'Pathogenic']
+BASES = np.array(list('ACGT'))
+
+
+def _conditions(samples, n_conditions):
+    names = ['control', 'treatment'] if n_conditions == 2 else [f'group_{i + 1}' for i in range(n_conditions)]
+    return np.array(names)[np.arange(samples) % n_conditions]
+
+
+def _apply_missing(values, missing_rate, rng):
+    if missing_rate > 0:
+        values[rng.random(values.shape) < missing_rate] = np.nan
+    return values
+
+
+def generate_expression(samples=100, features=1000, missing_rate=0.0, n_conditions=2, seed=0):
+    """Log-scale expression matrix with a condition shift on ~10% of genes"""
+    rng = np.random.default_rng(seed)
+    conditions = _conditions(samples, n_conditions)
+    baseline = rng.uniform(4, 14, size=features)
+    values = baseline + rng.normal(0, 1.0, size=(samples, features))
+
+    # Make some genes differentially expressed between conditions
+    shifted = rng.random(features) < 0.1
+    codes = np.unique(conditions, return_inverse=True)[1]
+    effects = rng.normal(0, 1.5, size=(n_conditions, features)) * shifted
+    values += effects[codes]
+    values = _apply_missing(np.round(values, 3), missing_rate, rng)
+
+    df = pd.DataFrame(values, columns=[f'GENE_{i + 1}' for i in range(features)])
+    df.insert(0, 'condition', conditions)
+    df.insert(0, 'sample_id', [f'sample_{i + 1:06d}' for i in range(samples)])
+    return df
+
+
+def generate_microbiome(samples=100, features=200, missing_rate=0.0, n_conditions=2, seed=0):
+    """Sparse relative-abundance table (percent per sample) with many zeros"""
+    rng = np.random.default_rng(seed)
+    conditions = _conditions(samples, n_conditions)
+    codes = np.unique(conditions, return_inverse=True)[1]
+
+    alpha = rng.gamma(0.3, 1.0, size=(n_conditions, features)) + 1e-3
+    counts = rng.gamma(alpha[codes], 1.0)
+    counts[rng.random(counts.shape) < 0.6] = 0.0
+    totals = counts.sum(axis=1, keepdims=True)
+    totals[totals == 0] = 1.0
+    values = _apply_missing(np.round(counts / totals * 100, 4), missing_rate, rng)
+
+    df = pd.DataFrame(values, columns=[f'Taxon_{i + 1}' for i in range(features)])
+    df.insert(0, 'condition', conditions)
+    df.insert(0, 'sample_id', [f'sample_mb_{i + 1:06d}' for i in range(samples)])
+    return df
+
+
+def generate_variants(samples=1000, features=0, missing_rate=0.0, n_conditions=0, seed=0):
+    """Variant table with the same columns as sample-data/sample.csv (one row per variant).
+
+    ``features`` and ``n_conditions`` are accepted for a uniform signature
+    and ignored; ``missing_rate`` blanks numeric annotations.
+    """
+    rng = np.random.default_rng(seed)
+    n = samples
+    variant_type = rng.choice(['SNP', 'INDEL', 'CNV'], size=n, p=[0.8, 0.17, 0.03])
+    position = rng.integers(10000, 250000000, size=n)
+    length = np.where(variant_type == 'SNP', 0, rng.integers(1, 50, size=n))
+    length = np.where(variant_type == 'CNV', rng.integers(1000, 100000, size=n), length)
+
+    ref = BASES[rng.integers(0, 4, size=n)]
+    alt = BASES[(np.searchsorted(BASES, ref) + rng.integers(1, 4, size=n)) % 4]
+
+    df = pd.DataFrame({
+        'sample_id': [f'SAMPLE_{i + 1:07d}' for i in range(n)],
+        'chromosome': rng.choice(CHROMOSOMES, size=n),
+        'position': position,
+        'end_position': position + length,
+        'gene_name': rng.choice(GENES, size=n),
+        'variant_type': variant_type,
+        'quality_score': np.round(rng.uniform(20, 99.9, size=n), 1),
+        'coverage_depth': rng.integers(10, 200, size=n).astype(np.float64),
+        'ref_allele': ref,
+        'alt_allele': alt,
+        'population_freq': np.round(rng.beta(0.5, 5, size=n), 4),
+        'clinical_significance': rng.choice(SIGNIFICANCE, size=n),
+    })
+    for column in ('quality_score', 'coverage_depth', 'population_freq'):
+        df[column] = _apply_missing(df[column].to_numpy(dtype=np.float64), missing_rate, rng)
+    return df
+
+
+GENERATORS = {
+    'expression': generate_expression,
+    'microbiome': generate_microbiome,
+    'variants': generate_variants,
+}
+
+
+def generate(kind, samples, features, missing_rate=0.0, n_conditions=2, seed=0):
+    """Build a synthetic dataset of the given kind"""
+    if kind not in GENERATORS:
+        raise ValueError(f"Unknown dataset kind: {kind}. Use one of {sorted(GENERATORS)}")
+    return GENERATORS[kind](samples, features, missing_rate, n_conditions, seed)
+
+
+def to_csv_content(df):
+    """Serialize a generated dataset the way the backend sends it (CSV text)"""
+    return df.to_csv(index=False)
@@ -0,0 +1,55 @@
+"""Production start mode: gunicorn -c gunicorn.conf.py run:app
+
+The app is imported and warmed up once in the master (preload_app), then
+workers are forked from it and share the imported modules and warm state
+copy-on-write instead of each paying the cold start. /api/health/ready
+answers 503 until warm-up has finished; /api/health is the liveness probe.
+
+Workers also share parsed datasets through the memory-mapped store in
+app/shared_store.py: a table is parsed by one worker and attached by the
+others instead of every worker holding its own copy (SHARED_DATASET_STORE,
+with SHARED_STORE_DIR, SHARED_STORE_MAX_MB and SHARED_STORE_MIN_MB).
+
+Settings come from the environment: PORT, WEB_CONCURRENCY (workers),
+GUNICORN_THREADS, GUNICORN_TIMEOUT and PRELOAD_APP ('0' to load the app in
+each worker instead, which then warms up on its own).
+"""
+import multiprocessing
+import os
+import time
+
+# The server hooks below run warm-up, not create_app
+os.environ.setdefault('WARMUP', 'hook')
+os.environ.setdefault('SHARED_DATASET_STORE', '1')
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5001)}"
+# The analyses are CPU-bound numpy work: one worker per core, threads for I/O-bound requests
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+graceful_timeout = 30
+keepalive = 5
+preload_app = os.environ.get('PRELOAD_APP', '1') == '1'
+accesslog = '-'
+
+
+def when_ready(server):
+    """Warm up in the master after the preloaded app is imported, before workers fork"""
+    if not server.cfg.preload_app:
+        return
+    from app import warmup
+    start = time.perf_counter()
+    warmup.warm_up(server.app.wsgi())
+    # Only here, in the master with warm-up done and no threads left running
+    warmup.freeze()
+    server.log.info("Warm-up in master took %.2fs", time.perf_counter() - start)
+
+
+def post_worker_init(worker):
+    """Without preload_app each worker loads the app itself, so it warms up itself"""
+    from app import warmup
+    if not warmup.is_ready():
+        start = time.perf_counter()
+        warmup.warm_up(worker.wsgi)
+        worker.log.info("Warm-up in worker %s took %.2fs", worker.pid, time.perf_counter() - start)
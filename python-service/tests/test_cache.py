@@ -0,0 +1,83 @@
+import threading
+import time
+
+import pytest
+
+from app.cache import DatasetCache
+
+
+class Entry:
+    def __init__(self, nbytes):
+        self.nbytes = nbytes
+
+
+def load_concurrently(cache, key, loader, n_threads=6):
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load(key, loader))) for _ in range(n_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def slow_loader(calls, nbytes):
+    def loader():
+        calls.append(1)
+        time.sleep(0.1)
+        return Entry(nbytes)
+    return loader
+
+
+def test_concurrent_requests_load_once():
+    cache = DatasetCache(max_bytes=100)
+    calls = []
+    results = load_concurrently(cache, 'k', slow_loader(calls, 10))
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert cache.stats()['entries'] == 1
+
+
+def test_entry_too_big_to_cache_is_loaded_once_for_waiting_requests():
+    cache = DatasetCache(max_bytes=100)
+    calls = []
+    results = load_concurrently(cache, 'k', slow_loader(calls, 1000))
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert cache.stats()['entries'] == 0
+    # Nothing is kept once the requests are done: the next one loads again
+    assert cache._loading == {}
+    cache.get_or_load('k', slow_loader(calls, 1000))
+    assert len(calls) == 2
+
+
+def test_failed_load_releases_the_key():
+    cache = DatasetCache(max_bytes=100)
+
+    def failing():
+        raise ValueError('bad file')
+
+    with pytest.raises(ValueError):
+        cache.get_or_load('k', failing)
+    assert cache._loading == {}
+    assert cache.get_or_load('k', lambda: Entry(1)).nbytes == 1
+
+
+def test_peek_does_not_count():
+    cache = DatasetCache(max_bytes=100)
+    assert cache.peek('k') is None
+    entry = cache.get_or_load('k', lambda: Entry(1))
+    assert cache.peek('k') is entry
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses']) == (0, 1)
+
+
+def test_evicts_least_recently_used():
+    cache = DatasetCache(max_bytes=25)
+    for key in 'abc':
+        cache.put(key, Entry(10))
+    assert cache.peek('a') is None
+    cache.get('b')
+    cache.put('d', Entry(10))
+    assert cache.peek('b') is not None and cache.peek('c') is None
+    assert cache.stats()['evictions'] == 2
@@ -0,0 +1,94 @@
+from itertools import product
+
+import numpy as np
+import pytest
+from scipy.cluster.hierarchy import fcluster, leaves_list, linkage, optimal_leaf_ordering
+from scipy.spatial.distance import pdist, squareform
+
+from app.clustering import greedy_leaf_order, hierarchical_tree, optimal_leaf_order
+from app.correlation import collect_condensed, iter_correlation_tiles
+
+
+def make_distances(n, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(4, 5)) * 3
+    points = centers[rng.integers(0, 4, size=n)] + rng.normal(size=(n, 5))
+    return pdist(points)
+
+
+def path_cost(condensed, order):
+    dist = squareform(condensed)
+    return dist[order[:-1], order[1:]].sum()
+
+
+def same_tree(a, b):
+    """Same merges and heights, whatever the child order"""
+    return (np.array_equal(np.sort(a[:, :2], axis=1), np.sort(b[:, :2], axis=1))
+            and np.array_equal(a[:, 2:], b[:, 2:]))
+
+
+def brute_force_cost(tree, condensed):
+    """Cheapest leaf path over every combination of child swaps"""
+    best = np.inf
+    for flips in product([False, True], repeat=len(tree)):
+        swapped = tree.copy()
+        swapped[np.array(flips), :2] = swapped[np.array(flips), 1::-1]
+        best = min(best, path_cost(condensed, leaves_list(swapped)))
+    return best
+
+
+@pytest.mark.parametrize('method', ['average', 'complete', 'single', 'weighted'])
+@pytest.mark.parametrize('n', [2, 3, 8, 11])
+def test_optimal_leaf_order_is_optimal(method, n):
+    condensed = make_distances(n, seed=n)
+    tree = linkage(condensed, method=method)
+    ordered = optimal_leaf_order(tree, condensed)
+    assert same_tree(ordered, tree)
+    np.testing.assert_allclose(path_cost(condensed, leaves_list(ordered)), brute_force_cost(tree, condensed), rtol=1e-12)
+
+
+@pytest.mark.parametrize('method', ['average', 'complete'])
+def test_optimal_leaf_order_no_worse_than_scipy(method):
+    condensed = make_distances(60, seed=4)
+    tree = linkage(condensed, method=method)
+    ordered = optimal_leaf_order(tree, condensed)
+    assert same_tree(ordered, tree)
+    # scipy's optimal_leaf_ordering is not always optimal, so only an upper bound
+    scipy_cost = path_cost(condensed, leaves_list(optimal_leaf_ordering(tree, condensed)))
+    assert path_cost(condensed, leaves_list(ordered)) <= scipy_cost + 1e-9
+
+
+def test_greedy_leaf_order_keeps_the_tree():
+    condensed = make_distances(80, seed=1)
+    tree = linkage(condensed, method='average')
+    ordered = greedy_leaf_order(tree, condensed)
+    assert same_tree(ordered, tree)
+    # Same clusters; fcluster numbers them in leaf order
+    pairs = set(zip(fcluster(ordered, 4, 'maxclust'), fcluster(tree, 4, 'maxclust')))
+    assert len(pairs) == len({a for a, _ in pairs}) == len({b for _, b in pairs})
+    optimal = leaves_list(optimal_leaf_order(tree, condensed))
+    assert path_cost(condensed, leaves_list(ordered)) >= path_cost(condensed, optimal) - 1e-9
+    assert sorted(leaves_list(ordered)) == list(range(80))
+
+
+def test_hierarchical_tree_switches_to_greedy():
+    condensed = make_distances(30, seed=2)
+    _, order, ordering = hierarchical_tree(condensed, 'average')
+    assert ordering == 'optimal' and sorted(order) == list(range(30))
+    _, order, ordering = hierarchical_tree(condensed, 'average', optimal_max_leaves=10)
+    assert ordering == 'greedy' and sorted(order) == list(range(30))
+    with pytest.raises(ValueError):
+        hierarchical_tree(condensed, 'ward')
+
+
+def test_collect_condensed_matches_correlation_distance():
+    rng = np.random.default_rng(3)
+    values = rng.normal(size=(40, 13))
+    values[:, 4] = 2.0  # constant: no correlation
+    tiles = iter_correlation_tiles(values, 'pearson', np.float64, 5)
+    condensed = collect_condensed(tiles, values.shape[1])
+    assert condensed.dtype == np.float64
+    with np.errstate(invalid='ignore', divide='ignore'):
+        expected = pdist(values.T, 'correlation')
+    expected = np.nan_to_num(expected, nan=1.0)
+    np.testing.assert_allclose(condensed, expected, rtol=1e-9, atol=1e-12)
@@ -0,0 +1,173 @@
+from itertools import combinations
+
+import numpy as np
+import pytest
+from scipy import stats
+
+from app.differential import (
+    batched_anova, batched_kruskal, batched_ttest, benjamini_hochberg, contrast_design, contrast_ttests,
+    group_sums, permutation_ttest
+)
+
+
+def make_groups(n1, n2, genes, seed=0, missing_rate=0.1):
+    rng = np.random.default_rng(seed)
+    group1 = rng.normal(loc=5.0, scale=1.0, size=(n1, genes))
+    group2 = rng.normal(loc=5.3, scale=1.5, size=(n2, genes))
+    group1[rng.random(group1.shape) < missing_rate] = np.nan
+    group2[rng.random(group2.shape) < missing_rate] = np.nan
+    return group1, group2
+
+
+@pytest.mark.parametrize('equal_var', [True, False])
+def test_ttest_matches_scipy(equal_var):
+    group1, group2 = make_groups(12, 9, 50)
+    result = batched_ttest(group1, group2, equal_var=equal_var)
+    expected = stats.ttest_ind(group1, group2, equal_var=equal_var, nan_policy='omit')
+    assert result['valid'].all()
+    np.testing.assert_allclose(result['t'], np.asarray(expected.statistic), rtol=1e-10)
+    np.testing.assert_allclose(result['pvalue'], np.asarray(expected.pvalue), rtol=1e-10)
+
+
+def test_ttest_masks_genes_with_too_few_values():
+    group1, group2 = make_groups(6, 6, 5, seed=1, missing_rate=0)
+    group1[1:, 2] = np.nan
+    group2[:, 4] = np.nan
+    result = batched_ttest(group1, group2, min_observations=2)
+    np.testing.assert_array_equal(result['valid'], [True, True, False, True, False])
+    assert np.isnan(result['t'][[2, 4]]).all()
+    assert np.isnan(result['pvalue'][[2, 4]]).all()
+
+
+def test_benjamini_hochberg_matches_scipy():
+    pvalues = np.random.default_rng(2).random(200) ** 3
+    np.testing.assert_allclose(benjamini_hochberg(pvalues), stats.false_discovery_control(pvalues), rtol=1e-12)
+
+
+def test_benjamini_hochberg_ignores_nan():
+    pvalues = np.array([0.01, np.nan, 0.04, 0.03, np.nan])
+    adjusted = benjamini_hochberg(pvalues)
+    assert np.isnan(adjusted[[1, 4]]).all()
+    np.testing.assert_allclose(adjusted[[0, 2, 3]], stats.false_discovery_control([0.01, 0.04, 0.03]))
+
+
+def reference_exact_pvalues(group1, group2, equal_var):
+    """Share of all relabelings whose |t| reaches the observed one, one scipy t-test each"""
+    values = np.vstack([group1, group2])
+    observed = np.abs(stats.ttest_ind(group1, group2, equal_var=equal_var).statistic)
+    exceed = np.zeros(values.shape[1])
+    relabelings = list(combinations(range(len(values)), len(group1)))
+    for members in relabelings:
+        labels = np.zeros(len(values), dtype=bool)
+        labels[list(members)] = True
+        t_stat = stats.ttest_ind(values[labels], values[~labels], equal_var=equal_var).statistic
+        exceed += np.abs(t_stat) >= observed * (1 - 1e-9)
+    return exceed / len(relabelings)
+
+
+@pytest.mark.parametrize('equal_var', [True, False])
+def test_exact_permutation_test_matches_enumeration(equal_var):
+    group1, group2 = make_groups(5, 4, 8, seed=3, missing_rate=0)
+    result = permutation_ttest(group1, group2, equal_var=equal_var, max_permutations=1000, batch_size=32)
+    assert result['exact']
+    np.testing.assert_array_equal(result['permutations'], 126)
+    np.testing.assert_allclose(result['pvalue'], reference_exact_pvalues(group1, group2, equal_var))
+
+
+def test_sampled_permutation_test_is_reproducible_and_independent_of_n_jobs():
+    group1, group2 = make_groups(15, 15, 40, seed=4)
+    group2[:, :5] += 3.0  # a few clearly different genes
+    kwargs = dict(max_permutations=2000, batch_size=128, seed=7)
+    serial = permutation_ttest(group1, group2, n_jobs=1, **kwargs)
+    parallel = permutation_ttest(group1, group2, n_jobs=3, **kwargs)
+    assert not serial['exact']
+    # Blocks of genes differ only in rounding of the matrix products
+    np.testing.assert_allclose(serial['t'], parallel['t'], rtol=1e-12)
+    for name in ('pvalue', 'permutations', 'exceedances'):
+        np.testing.assert_array_equal(serial[name], parallel[name])
+    # Besag-Clifford: unremarkable genes stop early, the different ones use every permutation
+    np.testing.assert_array_equal(serial['permutations'][:5], 2000)
+    assert (serial['permutations'][5:] < 2000).any()
+    assert (serial['pvalue'][:5] == 1 / 2001).all()
+    assert ((serial['pvalue'] > 0) & (serial['pvalue'] <= 1)).all()
+
+
+def make_multigroup(sizes, genes, seed=5, missing_rate=0.1, decimals=None):
+    rng = np.random.default_rng(seed)
+    codes = np.repeat(np.arange(len(sizes)), sizes)
+    rng.shuffle(codes)
+    values = rng.normal(loc=10.0 + codes[:, None] * 0.4, scale=1.0, size=(len(codes), genes))
+    if decimals is not None:
+        values = np.round(values, decimals)  # ties for Kruskal-Wallis
+    values[rng.random(values.shape) < missing_rate] = np.nan
+    return values, codes
+
+
+def per_gene(values, codes, n_groups, test):
+    """scipy test of every column, on its non-missing values per group"""
+    results = []
+    for column in values.T:
+        groups = [column[(codes == g) & ~np.isnan(column)] for g in range(n_groups)]
+        results.append(test(*[group for group in groups if len(group)]))
+    return np.array([r.statistic for r in results]), np.array([r.pvalue for r in results])
+
+
+def test_anova_matches_scipy():
+    values, codes = make_multigroup([8, 11, 6, 9], 30)
+    count, sums, sumsq, _ = group_sums(values, codes, 4)
+    f_stat, pvalue, valid = batched_anova(count, sums, sumsq)
+    expected_f, expected_p = per_gene(values, codes, 4, stats.f_oneway)
+    assert valid.all()
+    np.testing.assert_allclose(f_stat, expected_f, rtol=1e-9)
+    np.testing.assert_allclose(pvalue, expected_p, rtol=1e-9)
+
+
+def test_anova_ignores_groups_without_values():
+    values, codes = make_multigroup([6, 6, 6], 4, missing_rate=0)
+    values[codes == 2, 1] = np.nan
+    values[codes != 0, 3] = np.nan
+    count, sums, sumsq, _ = group_sums(values, codes, 3)
+    f_stat, pvalue, valid = batched_anova(count, sums, sumsq)
+    np.testing.assert_array_equal(valid, [True, True, True, False])
+    expected_f, expected_p = per_gene(values[:, :3], codes, 3, stats.f_oneway)
+    np.testing.assert_allclose(f_stat[:3], expected_f, rtol=1e-9)
+    assert np.isnan(pvalue[3])
+
+
+@pytest.mark.parametrize('decimals', [None, 0])
+def test_kruskal_matches_scipy(decimals):
+    values, codes = make_multigroup([7, 10, 5], 25, seed=6, decimals=decimals)
+    h_stat, pvalue, valid = batched_kruskal(values, codes, 3)
+    expected_h, expected_p = per_gene(values, codes, 3, stats.kruskal)
+    assert valid.all()
+    np.testing.assert_allclose(h_stat, expected_h, rtol=1e-9)
+    np.testing.assert_allclose(pvalue, expected_p, rtol=1e-9)
+
+
+def test_kruskal_all_tied_gene_is_invalid():
+    values, codes = make_multigroup([4, 4], 2, missing_rate=0)
+    values[:, 1] = 3.0
+    _, pvalue, valid = batched_kruskal(values, codes, 2)
+    np.testing.assert_array_equal(valid, [True, False])
+    assert np.isnan(pvalue[1])
+
+
+@pytest.mark.parametrize('mode', ['all_pairs', 'one_vs_rest'])
+@pytest.mark.parametrize('equal_var', [True, False])
+def test_contrasts_match_pairwise_ttests(mode, equal_var):
+    values, codes = make_multigroup([8, 11, 6, 9], 20, seed=7)
+    count, sums, sumsq, center = group_sums(values, codes, 4)
+    pairs, first, second = contrast_design(4, mode)
+    result = contrast_ttests(count, sums, sumsq, center, first, second, equal_var=equal_var)
+    for row, (a, b) in enumerate(pairs):
+        side1 = values[codes != b] if a == -1 else values[codes == a]
+        expected = batched_ttest(side1, values[codes == b], equal_var=equal_var)
+        np.testing.assert_allclose(result['t'][row], expected['t'], rtol=1e-9)
+        np.testing.assert_allclose(result['pvalue'][row], expected['pvalue'], rtol=1e-9)
+        np.testing.assert_allclose(result['mean1'][row], expected['mean1'], rtol=1e-12)
+
+
+def test_contrast_design_rejects_unknown_mode():
+    assert len(contrast_design(4, 'all_pairs')[0]) == 6
+    with pytest.raises(ValueError):
+        contrast_design(3, 'one_vs_one')
@@ -0,0 +1,132 @@
+import json
+
+import numpy as np
+import pytest
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.exceptions import NotAcceptable
+from werkzeug.http import parse_accept_header
+
+from app import encoding
+from app.encoding import ARROW_STREAM, COMPACT_JSON, JSON, MSGPACK, encode, layout_for, negotiate
+
+
+def accept(header):
+    return parse_accept_header(header, MIMEAccept)
+
+
+def make_payload():
+    rng = np.random.default_rng(0)
+    return {
+        'success': True,
+        'results': {
+            'matrix': rng.normal(size=(3, 4)),
+            'counts': np.arange(5, dtype=np.int64),
+            'labels': ['a', 'b', 'c'],
+            'nested': [{'values': rng.normal(size=2)}]
+        }
+    }
+
+
+def test_negotiate():
+    assert negotiate(None) == JSON
+    assert negotiate(accept('')) == JSON
+    assert negotiate(accept('*/*')) == JSON
+    assert negotiate(accept(COMPACT_JSON)) == COMPACT_JSON
+    assert negotiate(accept(f'{JSON};q=0.5, {COMPACT_JSON}')) == COMPACT_JSON
+
+
+def test_negotiate_falls_back_to_json():
+    assert negotiate(accept('text/html')) == JSON
+    assert negotiate(accept('image/png, text/plain;q=0.5')) == JSON
+
+
+def test_negotiate_arrow():
+    pytest.importorskip('pyarrow')
+    assert negotiate(accept(ARROW_STREAM)) == ARROW_STREAM
+
+
+def test_negotiate_msgpack():
+    if encoding.msgpack is None:
+        assert negotiate(accept(MSGPACK)) == JSON
+    else:
+        assert negotiate(accept(MSGPACK)) == MSGPACK
+        assert negotiate(accept('application/x-msgpack')) == MSGPACK
+
+
+def test_layout_for():
+    assert layout_for(JSON) == 'nested'
+    assert layout_for(COMPACT_JSON) == 'compact'
+    assert layout_for(ARROW_STREAM) == 'compact'
+
+
+def test_plain_json():
+    payload = make_payload()
+    decoded = json.loads(encode(payload, JSON))
+    np.testing.assert_array_equal(decoded['results']['matrix'], payload['results']['matrix'])
+    assert decoded['results']['labels'] == ['a', 'b', 'c']
+
+
+def test_plain_json_nan_is_null():
+    assert json.loads(encode({'value': np.array([1.0, np.nan])}, JSON)) == {'value': [1.0, None]}
+
+
+@pytest.mark.parametrize('precision', ['float64', 'float32'])
+def test_compact_json(precision):
+    payload = make_payload()
+    matrix = payload['results']['matrix']
+    decoded = json.loads(encode(payload, COMPACT_JSON, precision))
+    encoded = decoded['results']['matrix']
+    assert encoded['dtype'] == 'float64'
+    assert encoded['shape'] == [3, 4]
+    values = np.array(encoded['data']).reshape(encoded['shape'])
+    if precision == 'float64':
+        np.testing.assert_array_equal(values, matrix)
+    else:
+        # Written as the shortest repr of each float32
+        np.testing.assert_array_equal(values.astype(np.float32), matrix.astype(np.float32))
+    counts = decoded['results']['counts']
+    assert counts['dtype'] == 'int64'
+    assert counts['data'] == list(range(5))
+    assert decoded['results']['nested'][0]['values']['shape'] == [2]
+
+
+def test_compact_json_defaults_to_float64():
+    payload = make_payload()
+    assert encode(payload, COMPACT_JSON) == encode(payload, COMPACT_JSON, 'float64')
+
+
+def test_arrow_round_trip():
+    pa = pytest.importorskip('pyarrow')
+    payload = make_payload()
+    table = pa.ipc.open_stream(encode(payload, ARROW_STREAM)).read_all()
+    envelope = json.loads(table.schema.metadata[b'envelope'])
+    assert envelope['success'] is True
+    assert envelope['results']['labels'] == ['a', 'b', 'c']
+    ref = envelope['results']['matrix']
+    assert ref['shape'] == [3, 4]
+    values = np.array(table.column(ref['column'])[0].as_py()).reshape(ref['shape'])
+    np.testing.assert_array_equal(values, payload['results']['matrix'])
+    ref = envelope['results']['nested'][0]['values']
+    np.testing.assert_array_equal(table.column(ref['column'])[0].as_py(), payload['results']['nested'][0]['values'])
+
+
+def test_arrow_float32():
+    pa = pytest.importorskip('pyarrow')
+    table = pa.ipc.open_stream(encode(make_payload(), ARROW_STREAM, 'float32')).read_all()
+    assert table.schema.field('data.results.matrix').type == pa.list_(pa.float32())
+
+
+def test_msgpack_round_trip():
+    msgpack = pytest.importorskip('msgpack')
+    payload = make_payload()
+    decoded = msgpack.unpackb(encode(payload, MSGPACK))
+    encoded = decoded['results']['matrix']
+    values = np.frombuffer(encoded['data'], dtype='<f8').reshape(encoded['shape'])
+    np.testing.assert_array_equal(values, payload['results']['matrix'])
+
+
+def test_rejects_unknown_precision_and_mimetype():
+    with pytest.raises(ValueError):
+        encode(make_payload(), COMPACT_JSON, 'float16')
+    with pytest.raises(NotAcceptable):
+        encode(make_payload(), 'text/html')
@@ -0,0 +1,60 @@
+import os
+import re
+import time
+
+import numpy as np
+import pytest
+from flask import Flask
+
+from app import metrics
+
+
+pytestmark = pytest.mark.skipif(metrics.current_rss() is None, reason='needs /proc/self/statm')
+
+
+def make_app(**config):
+    app = Flask(__name__)
+    app.config.update(config)
+    metrics.init_app(app)
+
+    @app.route('/large')
+    def large():
+        block = np.ones(200 * 1024 * 1024 // 8)
+        time.sleep(0.2)  # a few sampler intervals while the block is resident
+        return {'sum': float(block.sum())}
+
+    @app.route('/small')
+    def small():
+        return {'ok': True}
+
+    return app
+
+
+def growth_sum(endpoint):
+    match = re.search(rf'^analysis_rss_growth_bytes_sum{{endpoint="{endpoint}"}} (\S+)$', metrics.registry.render(), re.M)
+    return float(match.group(1))
+
+
+def test_small_request_after_large_one_reports_its_own_growth(monkeypatch):
+    monkeypatch.setattr(metrics, 'registry', metrics.MetricsRegistry())
+    client = make_app().test_client()
+
+    assert client.get('/large').status_code == 200
+    assert client.get('/small').status_code == 200
+
+    assert growth_sum('large') > 100 * 1024 * 1024
+    assert growth_sum('small') < 20 * 1024 * 1024
+
+
+def test_label_values_are_escaped():
+    registry = metrics.MetricsRegistry()
+    registry.inc('requests_total', 'Requests', endpoint='a"b\\c\nd')
+    assert 'requests_total{endpoint="a\\"b\\\\c\\nd"} 1' in registry.render()
+
+
+def test_profile_header_is_the_file_name(tmp_path):
+    client = make_app(PROFILING_ENABLED=True, PROFILE_FOLDER=str(tmp_path)).test_client()
+    response = client.get('/small?profile=1')
+    name = response.headers['X-Profile-File']
+    assert os.path.basename(name) == name
+    assert (tmp_path / name).exists()
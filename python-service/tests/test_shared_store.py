@@ -0,0 +1,96 @@
+import gc
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('fcntl')
+
+from app.cache import ParsedDataset
+from app.shared_store import SharedDatasetStore
+
+
+def make_dataset(rows=50, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'gene_id': [f'GENE{i}' for i in range(rows)],
+        'sample_a': rng.normal(size=rows),
+        'reads': rng.integers(0, 1000, size=rows),
+        'condition': rng.choice(['control', 'treated'], size=rows),
+        'sample_b': rng.normal(size=rows),
+    })
+    return ParsedDataset(df, ['sample_a', 'reads', 'sample_b'])
+
+
+def loader_of(dataset):
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return dataset
+    return loader, calls
+
+
+def test_round_trip(tmp_path):
+    store = SharedDatasetStore(directory=str(tmp_path))
+    original = make_dataset()
+    loader, calls = loader_of(original)
+
+    first = store.get_or_load('key', loader)
+    second = store.get_or_load('key', loader)
+    assert len(calls) == 1
+    for dataset in (first, second):
+        pd.testing.assert_frame_equal(dataset.df, original.df)
+        assert dataset.df['reads'].dtype == np.int64
+        assert dataset.numeric_cols == original.numeric_cols
+        np.testing.assert_array_equal(dataset.numeric_values, original.numeric_values)
+        assert not dataset.numeric_values.flags.writeable
+
+
+def test_attach_missing_key(tmp_path):
+    assert SharedDatasetStore(directory=str(tmp_path)).attach('missing') is None
+
+
+def test_small_datasets_are_not_stored(tmp_path):
+    store = SharedDatasetStore(directory=str(tmp_path), min_bytes=1024 * 1024)
+    dataset = make_dataset()
+    loader, calls = loader_of(dataset)
+    assert store.get_or_load('key', loader) is dataset
+    assert store.attach('key') is None
+    assert store.stats()['entries'] == 0
+
+
+def test_eviction_skips_entries_in_use(tmp_path):
+    dataset = make_dataset(rows=200)
+    store = SharedDatasetStore(directory=str(tmp_path))
+    assert store.publish('first', dataset)
+    size = store.stats()['bytes']
+    # Room for one entry only
+    store.max_bytes = size + size // 2
+
+    attached = store.attach('first')
+    assert store.in_use('first')
+    assert not store.publish('second', dataset)
+    assert store.attach('first') is not None
+
+    del attached
+    gc.collect()
+    assert not store.in_use('first')
+    assert store.publish('second', dataset)
+    assert store.attach('first') is None
+    assert store.attach('second') is not None
+
+
+def test_clear_keeps_entries_in_use(tmp_path):
+    store = SharedDatasetStore(directory=str(tmp_path))
+    dataset = make_dataset()
+    store.publish('kept', dataset)
+    store.publish('removed', dataset)
+    attached = store.attach('kept')
+
+    store.clear()
+    stats = store.stats()
+    assert stats['entries'] == 1
+    assert stats['in_use'] == 1
+    assert store.attach('removed') is None
+    pd.testing.assert_frame_equal(attached.df, dataset.df)
@@ -0,0 +1,100 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+import scipy.sparse as sp
+
+from app.correlation import collect_matrix
+from app.sparse import (
+    column_scale, iter_sparse_correlation_tiles, read_matrix_market, read_triplets, sparse_cluster_means,
+    sparse_column_statistics, sparse_pca
+)
+from app.stats_engine import column_statistics
+
+
+def make_counts(rows, cols, seed=0, density=0.2):
+    rng = np.random.default_rng(seed)
+    dense = rng.poisson(3.0, size=(rows, cols)).astype(np.float64)
+    dense[rng.random((rows, cols)) > density] = 0.0
+    dense[:, 1] -= 2.0 * (dense[:, 1] > 0)  # some negatives
+    dense[:, 2] = 0.0                        # all zero
+    dense[0, 3] = 5.0
+    return dense
+
+
+def test_column_statistics_match_dense():
+    dense = make_counts(60, 8)
+    csc = sp.csc_matrix(dense)
+    result = sparse_column_statistics(csc)
+    expected = column_statistics(dense)
+    for name in ('count', 'missing', 'mean', 'std', 'min', 'max', 'q25', 'median', 'q75', 'skewness', 'kurtosis'):
+        np.testing.assert_allclose(result[name], expected[name], rtol=1e-9, atol=1e-12, equal_nan=True, err_msg=name)
+
+
+def test_column_statistics_ignore_stored_zeros():
+    dense = make_counts(40, 5, seed=1)
+    csc = sp.csc_matrix(dense)
+    csc.data[::3] = 0.0  # explicit zeros left in the structure
+    expected = column_statistics(csc.toarray())
+    result = sparse_column_statistics(csc)
+    for name in ('mean', 'std', 'min', 'q25', 'median', 'q75'):
+        np.testing.assert_allclose(result[name], expected[name], rtol=1e-9, atol=1e-12, equal_nan=True, err_msg=name)
+
+
+@pytest.mark.parametrize('method', ['pearson', 'spearman'])
+def test_correlation_tiles_match_pandas(method):
+    dense = make_counts(80, 11, seed=2)
+    tiles = iter_sparse_correlation_tiles(sp.csc_matrix(dense), method, block_size=4)
+    result = collect_matrix(tiles, dense.shape[1])
+    expected = pd.DataFrame(dense).corr(method=method).to_numpy()
+    # The all-zero column has no correlation, diagonal included
+    assert np.isnan(result[2]).all() and np.isnan(result[:, 2]).all()
+    np.testing.assert_allclose(result, expected, rtol=1e-9, atol=1e-12, equal_nan=True)
+
+
+def test_pca_matches_dense_svd():
+    dense = make_counts(50, 9, seed=3)
+    matrix = sp.csr_matrix(dense)
+    mean, scale = column_scale(sp.csc_matrix(dense))
+    projections, ratio = sparse_pca(matrix, mean, scale)
+
+    standardized = (dense - mean) / scale
+    u, s, vt = np.linalg.svd(standardized, full_matrices=False)
+    expected = u[:, :2] * s[:2]
+    # Components are only defined up to sign
+    np.testing.assert_allclose(np.abs(projections), np.abs(expected), rtol=1e-6, atol=1e-8)
+    total = standardized.var(axis=0, ddof=1).sum()
+    np.testing.assert_allclose(ratio, s[:2] ** 2 / (len(dense) - 1) / total, rtol=1e-6)
+
+
+def test_cluster_means():
+    dense = make_counts(30, 4, seed=4)
+    labels = np.arange(30) % 3
+    sizes, means = sparse_cluster_means(sp.csr_matrix(dense), labels, 3)
+    np.testing.assert_array_equal(sizes, [10, 10, 10])
+    np.testing.assert_allclose(means, [dense[labels == k].mean(axis=0) for k in range(3)])
+
+
+def test_read_triplets_with_header_and_transpose():
+    text = 'cell,gene,count\nc2,g1,3\nc1,g2,1\nc1,g1,2\nc2,g2,0\n'
+    dataset = read_triplets(io.StringIO(text))
+    assert dataset.row_names == ['c1', 'c2'] and dataset.numeric_cols == ['g1', 'g2']
+    np.testing.assert_array_equal(dataset.matrix.toarray(), [[2, 1], [3, 0]])
+    assert dataset.matrix.nnz == 3
+
+    transposed = read_triplets(io.StringIO(text), transpose=True)
+    assert transposed.row_names == ['g1', 'g2']
+    np.testing.assert_array_equal(transposed.matrix.toarray(), [[2, 3], [1, 0]])
+
+
+def test_read_triplets_rejects_non_numeric_values():
+    with pytest.raises(ValueError):
+        read_triplets(io.StringIO('c1,g1,2\nc1,g2,x\n'))
+
+
+def test_read_matrix_market_transposes_genes_by_cells():
+    text = '%%MatrixMarket matrix coordinate integer general\n3 2 3\n1 1 5\n3 1 1\n2 2 7\n'
+    dataset = read_matrix_market(io.BytesIO(text.encode()), transpose=True)
+    assert dataset.shape == (2, 3)
+    np.testing.assert_array_equal(dataset.matrix.toarray(), [[5, 0, 1], [0, 7, 0]])
@@ -0,0 +1,119 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from app.differential import group_moments
+from app.stats_engine import column_statistics
+
+
+STAT_NAMES = ('mean', 'median', 'std', 'min', 'max', 'count', 'missing', 'q25', 'q75', 'skewness', 'kurtosis')
+
+
+def reference_statistics(values):
+    """The per-column pandas/scipy loop calculate_basic_stats used before column_statistics"""
+    numeric_df = pd.DataFrame(values)
+    results = {}
+    for column in numeric_df.columns:
+        col_data = numeric_df[column].dropna()
+        if len(col_data) == 0:
+            continue
+        with warnings.catch_warnings():
+            # scipy warns on constant and single-value columns and returns NaN
+            warnings.simplefilter('ignore', RuntimeWarning)
+            results[column] = {
+                'mean': float(col_data.mean()),
+                'median': float(col_data.median()),
+                'std': float(col_data.std()),
+                'min': float(col_data.min()),
+                'max': float(col_data.max()),
+                'count': int(len(col_data)),
+                'missing': int(numeric_df[column].isna().sum()),
+                'q25': float(col_data.quantile(0.25)),
+                'q75': float(col_data.quantile(0.75)),
+                'skewness': float(stats.skew(col_data)),
+                'kurtosis': float(stats.kurtosis(col_data))
+            }
+    return results
+
+
+def assert_matches_reference(values, **kwargs):
+    result = column_statistics(values, **kwargs)
+    expected = reference_statistics(values)
+    for column in range(values.shape[1]):
+        if column not in expected:
+            # All-NaN columns: the old loop skipped them
+            assert result['count'][column] == 0
+            assert result['missing'][column] == values.shape[0]
+            for name in STAT_NAMES:
+                if name not in ('count', 'missing'):
+                    assert np.isnan(result[name][column])
+            continue
+        for name in STAT_NAMES:
+            np.testing.assert_allclose(
+                result[name][column], expected[column][name], rtol=1e-10, atol=1e-12,
+                equal_nan=True, err_msg=f'{name} of column {column}'
+            )
+
+
+def make_values(rows, cols, seed=0, missing_rate=0.1):
+    rng = np.random.default_rng(seed)
+    values = rng.normal(loc=5.0, scale=2.0, size=(rows, cols))
+    values[:, 1] = rng.exponential(size=rows)  # skewed
+    values[rng.random((rows, cols)) < missing_rate] = np.nan
+    return values
+
+
+def test_matches_reference_with_missing_values():
+    assert_matches_reference(make_values(200, 40))
+
+
+def test_matches_reference_with_ties():
+    values = np.round(make_values(101, 20, seed=1), 0)
+    assert_matches_reference(values)
+
+
+def test_constant_columns():
+    values = make_values(50, 6, seed=2)
+    values[:, 0] = 3.0
+    values[:, 1] = 0.0
+    values[::2, 2] = np.nan
+    values[1::2, 2] = -7.5
+    result = column_statistics(values)
+    assert np.all(np.isnan(result['skewness'][:3]))
+    assert np.all(np.isnan(result['kurtosis'][:3]))
+    np.testing.assert_array_equal(result['std'][:3], 0.0)
+    assert_matches_reference(values)
+
+
+def test_all_nan_columns():
+    values = make_values(30, 5, seed=3)
+    values[:, 2] = np.nan
+    values[:, 4] = np.nan
+    assert_matches_reference(values)
+
+
+def test_single_row():
+    assert_matches_reference(np.array([[1.5, -2.0, np.nan, 0.0]]))
+
+
+def test_single_value_in_column():
+    values = np.full((10, 3), np.nan)
+    values[4, 0] = 2.0
+    values[:, 1] = np.arange(10.0)
+    assert_matches_reference(values)
+
+
+def test_blocks_and_precomputed_moments():
+    values = make_values(120, 37, seed=4)
+    values[:, 5] = np.nan
+    values[:, 9] = 1.0
+    assert_matches_reference(values, block_size=8)
+    assert_matches_reference(values, block_size=8, moments=group_moments(values))
+
+
+def test_rejects_non_matrix():
+    with pytest.raises(ValueError):
+        column_statistics(np.arange(5.0))
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.stats_engine import column_statistics
+from app.streaming import CorrelationAccumulator, MomentAccumulator, QuantileSketch, streaming_column_statistics
+
+
+def make_values(rows, cols, seed=0, missing_rate=0.1):
+    rng = np.random.default_rng(seed)
+    values = rng.normal(loc=1000.0, scale=3.0, size=(rows, cols))  # offset mean tests cancellation
+    values[:, 1] = rng.exponential(size=rows)
+    values[rng.random((rows, cols)) < missing_rate] = np.nan
+    return values
+
+
+def blocks(values, size):
+    return [values[i:i + size] for i in range(0, len(values), size)]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 64, 1000])
+def test_moments_match_exact_statistics(chunk_size):
+    values = make_values(500, 12)
+    values[:, 3] = np.nan
+    accumulator = MomentAccumulator(values.shape[1])
+    for block in blocks(values, chunk_size):
+        accumulator.update(block)
+    result = accumulator.finalize()
+    expected = column_statistics(values)
+    for name in ('count', 'missing', 'mean', 'std', 'min', 'max', 'skewness', 'kurtosis'):
+        np.testing.assert_allclose(result[name], expected[name], rtol=1e-9, equal_nan=True, err_msg=name)
+
+
+def test_quantiles_are_exact_without_compaction():
+    values = make_values(300, 5, seed=1)
+    out = streaming_column_statistics(blocks(values, 50), values.shape[1], sketch_size=256)
+    np.testing.assert_array_equal(out['quantile_rank_error'], 0.0)
+    for name, q in (('q25', 0.25), ('median', 0.5), ('q75', 0.75)):
+        np.testing.assert_allclose(out[name], np.nanquantile(values, q, axis=0), rtol=1e-12)
+
+
+@pytest.mark.parametrize('k', [16, 64])
+def test_quantile_rank_error_is_bounded(k):
+    values = make_values(20000, 4, seed=2)
+    sketch = QuantileSketch(values.shape[1], k=k)
+    for block in blocks(values, 1000):
+        sketch.update(block)
+    counts = (~np.isnan(values)).sum(axis=0)
+    assert sketch.rank_error > 0
+    for q, estimate in sketch.query((0.1, 0.5, 0.9), counts).items():
+        for column in range(values.shape[1]):
+            present = np.sort(values[~np.isnan(values[:, column]), column])
+            # The estimate lies between the values at ranks target +/- rank_error
+            target = q * (counts[column] - 1)
+            lo = present[max(int(np.floor(target - sketch.rank_error)), 0)]
+            hi = present[min(int(np.ceil(target + sketch.rank_error)), counts[column] - 1)]
+            assert lo <= estimate[column] <= hi
+
+
+def test_merged_sketches_keep_the_bound():
+    values = make_values(8000, 2, seed=3, missing_rate=0)
+    left, right = QuantileSketch(2, k=32), QuantileSketch(2, k=32)
+    left.update(values[:5000])
+    right.update(values[5000:])
+    left.merge(right)
+    counts = np.full(2, len(values))
+    median = left.query((0.5,), counts)[0.5]
+    ranks = (values < median).sum(axis=0)
+    assert (np.abs(ranks - 0.5 * (len(values) - 1)) <= left.rank_error + 1).all()
+
+
+@pytest.mark.parametrize('missing_rate', [0.0, 0.15])
+def test_correlation_matches_pairwise_complete_pandas(missing_rate):
+    values = make_values(400, 8, seed=4, missing_rate=missing_rate)
+    values[:, 5] = 0.5 * values[:, 0] + np.random.default_rng(5).normal(size=400)
+    accumulator = CorrelationAccumulator(values.shape[1])
+    for block in blocks(values, 37):
+        accumulator.update(block)
+    expected = pd.DataFrame(values).corr().to_numpy()
+    np.testing.assert_allclose(accumulator.correlation(), expected, rtol=1e-9, atol=1e-12)
+
+
+def test_correlation_switches_to_pairwise_counts_mid_stream():
+    values = make_values(200, 4, seed=6, missing_rate=0)
+    values[150:, 2] = np.nan  # the first blocks are complete
+    accumulator = CorrelationAccumulator(values.shape[1])
+    for block in blocks(values, 50):
+        accumulator.update(block)
+    np.testing.assert_allclose(accumulator.correlation(), pd.DataFrame(values).corr().to_numpy(), rtol=1e-9)
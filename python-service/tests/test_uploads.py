@@ -0,0 +1,81 @@
+import gzip
+import io
+
+import pytest
+from werkzeug.exceptions import UnsupportedMediaType
+
+from app.cache import DatasetCache
+from app.uploads import DecompressedTooLarge, decoded_stream, split_compression, spool_body
+
+
+CONTENT = ''.join(f'GENE{i},{i * 0.5},{i % 7}\n' for i in range(20000)).encode('utf-8')
+
+
+def test_split_compression():
+    assert split_compression('data.csv.gz') == ('data.csv', 'gzip')
+    assert split_compression('data.csv.GZIP') == ('data.csv', 'gzip')
+    assert split_compression('data.tsv.zst') == ('data.tsv', 'zstd')
+    assert split_compression('data.csv') == ('data.csv', None)
+
+
+@pytest.mark.parametrize('encodings', [(), (None,), ('identity',)])
+def test_identity(encodings):
+    assert decoded_stream(io.BytesIO(CONTENT), None, encodings).read() == CONTENT
+
+
+def test_gzip():
+    body = io.BytesIO(gzip.compress(CONTENT))
+    assert decoded_stream(body, None, ['gzip']).read() == CONTENT
+
+
+def test_stacked_encodings():
+    # A gzip Content-Encoding over a .gz file
+    body = io.BytesIO(gzip.compress(gzip.compress(CONTENT)))
+    assert decoded_stream(body, None, ['x-gzip', 'gzip']).read() == CONTENT
+
+
+def test_zstd():
+    zstandard = pytest.importorskip('zstandard')
+    body = io.BytesIO(zstandard.ZstdCompressor().compress(CONTENT))
+    assert decoded_stream(body, None, ['zstd']).read() == CONTENT
+
+
+def test_unsupported_encoding():
+    with pytest.raises(UnsupportedMediaType):
+        decoded_stream(io.BytesIO(CONTENT), None, ['br'])
+
+
+def test_decompressed_size_limit():
+    body = io.BytesIO(gzip.compress(CONTENT))
+    # The compressed body is far smaller than the limit, the decoded content isn't
+    assert len(body.getvalue()) < len(CONTENT) // 2
+    with pytest.raises(DecompressedTooLarge):
+        decoded_stream(body, len(CONTENT) // 2, ['gzip']).read()
+    assert decoded_stream(io.BytesIO(gzip.compress(CONTENT)), len(CONTENT), ['gzip']).read() == CONTENT
+
+
+def test_spool_body():
+    body = spool_body(io.BytesIO(gzip.compress(CONTENT)), None, ['gzip'])
+    try:
+        assert body
+        assert body.size == len(CONTENT)
+        assert body.first_line() == 'GENE0,0.0,0\n'
+        assert body.rewind().read() == CONTENT
+        # Same cache key as sending the content as a string
+        assert body.cache_key(sep=',') == DatasetCache.make_key(CONTENT.decode('utf-8'), sep=',')
+    finally:
+        body.close()
+
+
+def test_spool_body_save(tmp_path):
+    body = spool_body(io.BytesIO(CONTENT), None)
+    path = tmp_path / 'data.csv'
+    body.save(str(path))
+    body.close()
+    assert path.read_bytes() == CONTENT
+
+
+def test_spool_empty_body():
+    body = spool_body(io.BytesIO(b''), None)
+    assert not body
+    body.close()
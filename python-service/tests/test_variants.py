@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.variants import VariantIndex, chromosome_sort_key, group_aggregates, window_counts
+
+
+def make_variants(n=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    starts = rng.integers(1, 100000, size=n)
+    lengths = np.where(rng.random(n) < 0.2, rng.integers(1, 5000, size=n), 0)
+    df = pd.DataFrame({
+        'variant_id': [f'v{i}' for i in range(n)],
+        'chromosome': rng.choice(['chr1', 'chr2', 'chr10', 'chrX'], size=n),
+        'position': starts,
+        'end_position': (starts + lengths).astype(np.float64),
+        'gene_name': rng.choice(['BRCA1', 'TP53', 'EGFR'], size=n),
+        'quality_score': rng.normal(50.0, 10.0, size=n),
+        'coverage_depth': rng.integers(10, 100, size=n).astype(np.float64),
+    })
+    df.loc[rng.random(n) < 0.1, 'end_position'] = np.nan  # single-base variants
+    df.loc[rng.random(n) < 0.05, 'coverage_depth'] = np.nan
+    return df
+
+
+def brute_force_overlaps(df, chromosome, start, end):
+    ends = df['end_position'].fillna(df['position'])
+    hits = (df['chromosome'] == chromosome) & (df['position'] <= end) & (ends >= start)
+    return set(df.loc[hits, 'variant_id'])
+
+
+@pytest.mark.parametrize('start,end', [(1, 100000), (5000, 5100), (40000, 60000), (99990, 200000), (1, 1)])
+def test_overlapping_matches_brute_force(start, end):
+    df = make_variants()
+    index = VariantIndex(df, ['quality_score', 'coverage_depth'])
+    for chromosome in ('chr1', 'chr10', 'chrX'):
+        positions = index.overlapping(chromosome, start, end)
+        found = index.variants(positions).column('variant_id').to_pylist()
+        assert len(found) == len(set(found))
+        assert set(found) == brute_force_overlaps(df, chromosome, start, end)
+        # In start order
+        assert np.all(np.diff(index.starts[positions]) >= 0)
+
+
+def test_long_variant_found_from_inside():
+    df = pd.DataFrame({
+        'chromosome': ['1', '1', '1'],
+        'position': [100, 200, 300],
+        'end_position': [10000, 250, 310],
+    })
+    index = VariantIndex(df)
+    np.testing.assert_array_equal(index.rows[index.overlapping('chr1', 5000, 6000)], [0])
+    np.testing.assert_array_equal(index.rows[index.overlapping('1', 240, 305)], [0, 1, 2])
+
+
+def test_resolve_and_errors():
+    index = VariantIndex(make_variants(50))
+    assert index.resolve('1') == 'chr1'
+    assert index.resolve('chrX') == 'chrX'
+    with pytest.raises(ValueError):
+        index.resolve('chr7')
+    with pytest.raises(ValueError):
+        VariantIndex(pd.DataFrame({'chromosome': ['1'], 'pos': [5]}))
+
+
+def test_rows_without_chromosome_or_start_are_left_out():
+    df = pd.DataFrame({'chromosome': ['1', None, '1'], 'position': [5.0, 6.0, np.nan]})
+    index = VariantIndex(df)
+    np.testing.assert_array_equal(index.rows, [0])
+
+
+def test_table_keeps_integer_coordinates():
+    index = VariantIndex(make_variants(100), ['quality_score', 'coverage_depth'])
+    row = index.variants(index.overlapping('chr1')[:1]).to_pylist()[0]
+    assert isinstance(row['position'], int)
+    assert isinstance(row['end_position'], int) or row['end_position'] is None
+    assert row['coverage_depth'] is None or isinstance(row['coverage_depth'], int)
+    assert isinstance(row['quality_score'], float)
+
+
+def test_chromosome_sort_key():
+    names = ['chrX', 'chr10', 'chr2', 'chrM', 'chr1']
+    assert sorted(names, key=chromosome_sort_key) == ['chr1', 'chr2', 'chr10', 'chrM', 'chrX']
+
+
+def test_window_counts_match_brute_force():
+    rng = np.random.default_rng(1)
+    starts = rng.integers(0, 1000, size=300)
+    ends = starts + rng.integers(0, 200, size=300)
+    codes = rng.integers(0, 3, size=300)
+    region_start, width, windows = 100, 50, 16
+    # Like variant_density: only variants overlapping the region
+    inside = (starts < region_start + width * windows) & (ends >= region_start)
+    starts, ends, codes = starts[inside], ends[inside], codes[inside]
+    counts = window_counts(starts, ends, region_start, width, windows, codes, 3)
+    for group in range(3):
+        for w in range(windows):
+            lo, hi = region_start + w * width, region_start + (w + 1) * width - 1
+            assert counts[group, w] == ((codes == group) & (starts <= hi) & (ends >= lo)).sum()
+    np.testing.assert_array_equal(window_counts(starts, ends, region_start, width, windows)[0], counts.sum(axis=0))
+
+
+def test_group_aggregates():
+    codes = np.array([0, 1, 0, 2, 0])
+    values = np.array([[1.0, np.nan], [2.0, 4.0], [3.0, 6.0], [np.nan, np.nan], [5.0, np.nan]])
+    counts, means = group_aggregates(codes, 4, values)
+    np.testing.assert_array_equal(counts, [3, 1, 1, 0])
+    np.testing.assert_allclose(means, [[3.0, 6.0], [2.0, 4.0], [np.nan, np.nan], [np.nan, np.nan]])